@@ -0,0 +1,307 @@
+"""Benchmark `NotesApi` against a local `MockNotesServer`.
+
+Run from the repository root, results are written as JSON:
+
+    python -m benchmarks.run --sizes 1000 10000 100000 --output results.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from statistics import mean, median
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Optional
+
+import nextcloud_notes_api
+from nextcloud_notes_api import AsyncNotesApi, Note, NotesApi
+
+from .server import MockNotesServer
+
+_OPERATIONS = 100
+"""Number of operations per round of the single note benchmarks."""
+
+
+@dataclass
+class BenchmarkResult:
+    """Timings of one benchmark at one note count."""
+
+    name: str
+    notes: int
+    operations: int
+    rounds: int
+    min: float
+    median: float
+    mean: float
+    max: float
+
+    @property
+    def ops_per_second(self) -> float:
+        return self.operations / self.median if self.median else 0.0
+
+
+def _measure(
+    name: str,
+    notes: int,
+    run: Callable[[], object],
+    *,
+    rounds: int,
+    operations: int = 1,
+    setup: Optional[Callable[[], object]] = None,
+) -> BenchmarkResult:
+    """Time `rounds` calls of `run`, after one untimed warmup call."""
+    if setup:
+        setup()
+    run()
+
+    timings = []
+    for _ in range(rounds):
+        if setup:
+            setup()
+        started = perf_counter()
+        run()
+        timings.append(perf_counter() - started)
+
+    return BenchmarkResult(
+        name,
+        notes,
+        operations,
+        rounds,
+        min(timings),
+        median(timings),
+        mean(timings),
+        max(timings),
+    )
+
+
+def _note_ids(server: MockNotesServer) -> List[int]:
+    return list(server.store.notes)[:_OPERATIONS]
+
+
+def benchmark_note_list(
+    server: MockNotesServer, rounds: int
+) -> Iterable[BenchmarkResult]:
+    notes = server.note_count
+    uncached = NotesApi('bench', 'bench', server.url, etag_caching=False)
+    cached = NotesApi('bench', 'bench', server.url)
+
+    yield _measure(
+        'get_all_notes', notes, lambda: list(uncached.get_all_notes()), rounds=rounds
+    )
+    yield _measure(
+        'get_all_notes_etag_hit',
+        notes,
+        lambda: list(cached.get_all_notes()),
+        rounds=rounds,
+    )
+    yield _measure(
+        'get_all_notes_chunked',
+        notes,
+        lambda: list(uncached.get_all_notes(chunk_size=1000)),
+        rounds=rounds,
+    )
+    yield _measure(
+        'get_all_notes_stream',
+        notes,
+        lambda: deque(uncached.get_all_notes(stream=True), maxlen=0),
+        rounds=rounds,
+    )
+    yield _measure(
+        'get_all_notes_exclude_content',
+        notes,
+        lambda: list(uncached.get_all_notes(exclude=('content',))),
+        rounds=rounds,
+    )
+    yield _measure(
+        'get_all_notes_collection',
+        notes,
+        lambda: cached.get_all_notes(as_collection=True).filter(favorite=True),
+        rounds=rounds,
+    )
+
+
+def benchmark_single_notes(
+    server: MockNotesServer, rounds: int
+) -> Iterable[BenchmarkResult]:
+    notes = server.note_count
+    note_ids = _note_ids(server)
+    uncached = NotesApi('bench', 'bench', server.url, etag_caching=False)
+    cached = NotesApi('bench', 'bench', server.url, note_cache_size=_OPERATIONS)
+
+    def get_notes(api: NotesApi) -> None:
+        for note_id in note_ids:
+            api.get_single_note(note_id)
+
+    yield _measure(
+        'get_single_note',
+        notes,
+        lambda: get_notes(uncached),
+        rounds=rounds,
+        operations=len(note_ids),
+    )
+    yield _measure(
+        'get_single_note_etag_hit',
+        notes,
+        lambda: get_notes(cached),
+        rounds=rounds,
+        operations=len(note_ids),
+    )
+
+    originals = [server.store.notes[note_id] for note_id in note_ids]
+    to_update = [Note.from_dict(note) for note in originals]
+    yield _measure(
+        'update_note',
+        notes,
+        lambda: [uncached.update_note(note) for note in to_update],
+        rounds=rounds,
+        operations=len(to_update),
+    )
+    yield _measure(
+        'update_notes_batch',
+        notes,
+        lambda: uncached.update_notes(to_update, max_workers=10).wait(),
+        rounds=rounds,
+        operations=len(to_update),
+    )
+
+    created: List[Note] = []
+    yield _measure(
+        'create_note',
+        notes,
+        lambda: created.extend(
+            uncached.create_note(Note('Benchmark', 'x')) for _ in range(_OPERATIONS)
+        ),
+        rounds=rounds,
+        operations=_OPERATIONS,
+    )
+    # Keep the number of notes stable for the following benchmarks
+    for note in created:
+        server.store.delete(note.id)
+
+    yield _measure(
+        'delete_notes_batch',
+        notes,
+        lambda: uncached.delete_notes(
+            [note.id for note in created[:_OPERATIONS]], max_workers=10
+        ).wait(),
+        rounds=rounds,
+        operations=_OPERATIONS,
+        setup=lambda: created.__setitem__(
+            slice(None),
+            [uncached.create_note(Note('Benchmark', 'x')) for _ in range(_OPERATIONS)],
+        ),
+    )
+
+
+def benchmark_async(server: MockNotesServer, rounds: int) -> Iterable[BenchmarkResult]:
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        return
+
+    notes = server.note_count
+    note_ids = _note_ids(server)
+
+    async def get_notes() -> None:
+        async with AsyncNotesApi(
+            'bench', 'bench', server.url, etag_caching=False, max_concurrency=10
+        ) as api:
+            await asyncio.gather(*(api.get_single_note(i) for i in note_ids))
+
+    yield _measure(
+        'async_get_single_note',
+        notes,
+        lambda: asyncio.run(get_notes()),
+        rounds=rounds,
+        operations=len(note_ids),
+    )
+
+
+_SUITES = {
+    'list': benchmark_note_list,
+    'single': benchmark_single_notes,
+    'async': benchmark_async,
+}
+
+
+def run(
+    sizes: Iterable[int],
+    *,
+    suites: Iterable[str] = tuple(_SUITES),
+    rounds: int = 5,
+    content_size: int = 256,
+    latency: float = 0.0,
+) -> Dict[str, object]:
+    """Run the benchmark `suites` against servers with each of `sizes` notes.
+
+    Returns:
+        Dict[str, object]: Environment and results, JSON serializable.
+    """
+    results: List[BenchmarkResult] = []
+    for size in sizes:
+        with MockNotesServer(
+            size, content_size=content_size, latency=latency
+        ) as server:
+            for suite in suites:
+                for result in _SUITES[suite](server, rounds):
+                    results.append(result)
+                    print(
+                        f'{result.name:32} {result.notes:>7} notes '
+                        f'{result.median * 1000:10.2f} ms '
+                        f'{result.ops_per_second:10.1f} ops/s',
+                        file=sys.stderr,
+                    )
+
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'library': nextcloud_notes_api.__version__,
+            'rounds': rounds,
+            'content_size': content_size,
+            'latency': latency,
+        },
+        'results': [
+            {**asdict(result), 'ops_per_second': result.ops_per_second}
+            for result in results
+        ],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10_000, 100_000])
+    parser.add_argument(
+        '--suites', nargs='+', choices=list(_SUITES), default=list(_SUITES)
+    )
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--content-size', type=int, default=256)
+    parser.add_argument(
+        '--latency', type=float, default=0.0, help='server latency in seconds'
+    )
+    parser.add_argument('--output', help='JSON file, defaults to stdout')
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.sizes,
+        suites=args.suites,
+        rounds=args.rounds,
+        content_size=args.content_size,
+        latency=args.latency,
+    )
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+"""Local stand-in for the Nextcloud Notes API, for benchmarking `NotesApi`."""
+
+from __future__ import annotations
+
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from time import sleep, time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+NOTES_PATH = '/index.php/apps/notes/api/v1/notes'
+CAPABILITIES_PATH = '/ocs/v2.php/cloud/capabilities'
+
+
+class NotesStore:
+    """In-memory notes of a `MockNotesServer`, safe for concurrent requests."""
+
+    def __init__(self, note_count: int, content_size: int):
+        """
+        Args:
+            note_count (int): Number of notes to generate.
+            content_size (int): Size of the content of every generated note.
+        """
+        self._lock = Lock()
+        self._version = 0
+        self._list_body: Optional[bytes] = None
+        self._next_id = note_count + 1
+
+        now = int(time())
+        self.notes: Dict[int, Dict[str, Any]] = {
+            note_id: {
+                'id': note_id,
+                'title': f'Note {note_id}',
+                'content': 'x' * content_size,
+                'category': f'Category {note_id % 10}',
+                'favorite': note_id % 7 == 0,
+                # Spread modification times over the last days
+                'modified': now - (note_count - note_id) * 60,
+                'etag': f'{note_id}-0',
+            }
+            for note_id in range(1, note_count + 1)
+        }
+
+    @property
+    def etag(self) -> str:
+        """`str`: ETag of the note list, changes on every write."""
+        return f'"list-{self._version}"'
+
+    def list_body(self) -> bytes:
+        """The full note list as JSON, cached until the next write."""
+        with self._lock:
+            if self._list_body is None:
+                self._list_body = json.dumps(list(self.notes.values())).encode()
+            return self._list_body
+
+    def listing(
+        self,
+        exclude: Tuple[str, ...],
+        prune_before: Optional[int],
+        chunk_size: Optional[int],
+        cursor: int,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Notes for a parameterized list request and the next chunk cursor."""
+        with self._lock:
+            notes = list(self.notes.values())
+
+        if chunk_size:
+            chunk = notes[cursor : cursor + chunk_size]
+            next_cursor: Optional[int] = cursor + chunk_size
+            if next_cursor >= len(notes):
+                next_cursor = None
+        else:
+            chunk, next_cursor = notes, None
+
+        listed = []
+        for note in chunk:
+            if prune_before is not None and note['modified'] < prune_before:
+                listed.append({'id': note['id']})
+            else:
+                listed.append(
+                    {key: val for key, val in note.items() if key not in exclude}
+                )
+        return listed, next_cursor
+
+    def get(self, note_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.notes.get(note_id)
+
+    def save(self, note_id: Optional[int], fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a note if `note_id` is None, otherwise update it.
+
+        Raises:
+            KeyError: There is no note with ID `note_id`.
+        """
+        with self._lock:
+            if note_id is None:
+                note_id = self._next_id
+                self._next_id += 1
+                note = {
+                    'id': note_id,
+                    'title': '',
+                    'content': '',
+                    'category': '',
+                    'favorite': False,
+                    'etag': f'{note_id}-0',
+                }
+            else:
+                note = dict(self.notes[note_id])
+                revision = int(note['etag'].rsplit('-', 1)[1]) + 1
+                note['etag'] = f'{note_id}-{revision}'
+
+            for key in ('title', 'content', 'category'):
+                if key in fields:
+                    note[key] = fields[key]
+            if 'favorite' in fields:
+                note['favorite'] = fields['favorite'] in ('True', 'true', '1')
+            note['modified'] = int(time())
+
+            self.notes[note_id] = note
+            self._written()
+            return note
+
+    def delete(self, note_id: int) -> bool:
+        with self._lock:
+            if self.notes.pop(note_id, None) is None:
+                return False
+            self._written()
+            return True
+
+    def _written(self) -> None:
+        self._version += 1
+        self._list_body = None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep connections alive, like Nextcloud does
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, which stalls on delayed ACKs
+    disable_nagle_algorithm = True
+    server: MockNotesServer
+
+    def log_message(self, *_: Any) -> None:
+        pass
+
+    def _send(
+        self,
+        status: int,
+        body: bytes = b'',
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, val in (headers or {}).items():
+            self.send_header(key, val)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, note: Dict[str, Any]) -> None:
+        self._send(200, json.dumps(note).encode(), {'ETag': f'"{note["etag"]}"'})
+
+    def _read_form(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode(), keep_blank_values=True)
+        return {key: values[-1] for key, values in form.items()}
+
+    def _note_id(self, path: str) -> Optional[int]:
+        note_id = path[len(NOTES_PATH) + 1 :]
+        return int(note_id) if note_id.isdigit() else None
+
+    def _route(self, method: str) -> None:
+        sleep(self.server.latency)
+        url = urlsplit(self.path)
+        store = self.server.store
+
+        if method == 'GET' and url.path == CAPABILITIES_PATH:
+            capabilities = {
+                'notes': {'api_version': self.server.api_versions, 'version': '4.0.0'}
+            }
+            body = {'ocs': {'data': {'capabilities': capabilities}}}
+            return self._send(200, json.dumps(body).encode())
+
+        if url.path == NOTES_PATH:
+            if method == 'POST':
+                return self._send_json(store.save(None, self._read_form()))
+            if method == 'GET':
+                return self._list(parse_qs(url.query))
+            return self._send(405)
+
+        if not url.path.startswith(f'{NOTES_PATH}/'):
+            return self._send(404)
+        note_id = self._note_id(url.path)
+        if note_id is None:
+            return self._send(400)
+
+        note = store.get(note_id)
+        if note is None:
+            return self._send(404)
+        if method == 'GET':
+            if self.headers.get('If-None-Match') == f'"{note["etag"]}"':
+                return self._send(304)
+            return self._send_json(note)
+        if method == 'PUT':
+            if_match = self.headers.get('If-Match')
+            if if_match and if_match != f'"{note["etag"]}"':
+                return self._send(412)
+            return self._send_json(store.save(note_id, self._read_form()))
+        if method == 'DELETE':
+            store.delete(note_id)
+            return self._send(200)
+        return self._send(405)
+
+    def _list(self, query: Dict[str, List[str]]) -> None:
+        store = self.server.store
+        if not query:
+            etag = store.etag
+            if self.server.etags and self.headers.get('If-None-Match') == etag:
+                return self._send(304)
+            headers = {'ETag': etag} if self.server.etags else {}
+            return self._send(200, store.list_body(), headers)
+
+        exclude = tuple(query.get('exclude', [''])[0].split(','))
+        prune_before = query.get('pruneBefore')
+        chunk_size = query.get('chunkSize') if self.server.chunking else None
+        notes, cursor = store.listing(
+            exclude,
+            int(prune_before[0]) if prune_before else None,
+            int(chunk_size[0]) if chunk_size else None,
+            int(query.get('chunkCursor', ['0'])[0]),
+        )
+        headers = {'X-Notes-Chunk-Cursor': str(cursor)} if cursor else {}
+        self._send(200, json.dumps(notes).encode(), headers)
+
+    def do_GET(self) -> None:
+        self._route('GET')
+
+    def do_POST(self) -> None:
+        self._route('POST')
+
+    def do_PUT(self) -> None:
+        self._route('PUT')
+
+    def do_DELETE(self) -> None:
+        self._route('DELETE')
+
+
+class MockNotesServer(ThreadingHTTPServer):
+    """Notes API server on localhost, serving generated notes over plain HTTP.
+
+    Credentials aren't checked. Use as a context manager to serve in a background
+    thread.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        note_count: int = 1000,
+        *,
+        content_size: int = 256,
+        latency: float = 0.0,
+        etags: bool = True,
+        chunking: bool = True,
+        port: int = 0,
+    ):
+        """
+        Args:
+            note_count (int, optional): Number of notes to generate. Defaults to
+                1000.
+            content_size (int, optional): Size of every note's content. Defaults to
+                256.
+            latency (float, optional): Seconds to delay every response by.
+                Defaults to 0.
+            etags (bool, optional): Whether to send ETags for the note list.
+                Defaults to True.
+            chunking (bool, optional): Whether to support chunked note lists, like
+                API version 1.2 and up. Defaults to True.
+            port (int, optional): Port to listen on, 0 to pick a free one. Defaults
+                to 0.
+        """
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.note_count = note_count
+        """`int`: Number of generated notes."""
+        self.store = NotesStore(note_count, content_size)
+        """`NotesStore`: The served notes."""
+        self.latency = latency
+        """`float`: Seconds to delay every response by."""
+        self.etags = etags
+        """`bool`: Whether to send ETags for the note list."""
+        self.chunking = chunking
+        """`bool`: Whether to support chunked note lists."""
+        self.api_versions = ['0.2', '1.0', '1.2'] if chunking else ['0.2', '1.0']
+        """`List[str]`: Advertised Notes API versions."""
+        self._thread: Optional[Thread] = None
+
+    @property
+    def url(self) -> str:
+        """`str`: Base URL to pass as `hostname` to `NotesApi`."""
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self) -> MockNotesServer:
+        self._thread = Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.shutdown()
+        self.server_close()
@@ -8,17 +8,77 @@ from .api_exceptions import (
     InsufficientNextcloudStorage,
     InvalidNextcloudCredentials,
     InvalidNoteId,
+    NoteConflict,
     NoteNotFound,
+    ServerUnavailable,
+    UnexpectedStatusCode,
 )
 from .api_wrapper import NotesApi
+from .archive import ImportCheckpoint, NoteArchive, NoteArchiveWriter
+from .async_api_wrapper import AsyncNotesApi
+from .batch import BatchItem, BatchResult
+from .cache import CacheEntry, MemoryNoteCache, NoteCache, SqliteNoteCache
+from .capabilities import Capabilities
+from .collection import NoteCollection
+from .hooks import (
+    CacheEvent,
+    DecodeEvent,
+    Histogram,
+    MetricsCollector,
+    NotesApiHooks,
+    RequestEvent,
+)
+from .limits import RequestLimiter
+from .manager import Account, AccountResult, AccountStatus, NotesSyncManager
+from .mirror import MirrorChanges, NotesMirror
 from .note import Note
+from .outbox import NotesOutbox
+from .retry import RetryPolicy
+from .search import NoteIndex, SearchResult
+from .snapshot import NoteSnapshot
+from .sync import NotesSync, SyncChanges
 
 __version__ = '0.1.0'
 __all__ = [
+    'Account',
+    'AccountResult',
+    'AccountStatus',
+    'AsyncNotesApi',
+    'BatchItem',
+    'BatchResult',
+    'CacheEntry',
+    'CacheEvent',
+    'Capabilities',
+    'DecodeEvent',
+    'Histogram',
+    'ImportCheckpoint',
     'InsufficientNextcloudStorage',
     'InvalidNextcloudCredentials',
     'InvalidNoteId',
+    'MemoryNoteCache',
+    'MetricsCollector',
+    'MirrorChanges',
+    'NoteArchive',
+    'NoteArchiveWriter',
+    'NoteCache',
+    'NoteCollection',
+    'NoteConflict',
+    'NoteIndex',
     'NoteNotFound',
     'NotesApi',
+    'NotesApiHooks',
+    'NotesMirror',
+    'NotesOutbox',
+    'NotesSync',
+    'NotesSyncManager',
     'Note',
+    'NoteSnapshot',
+    'RequestEvent',
+    'RequestLimiter',
+    'RetryPolicy',
+    'SearchResult',
+    'ServerUnavailable',
+    'SqliteNoteCache',
+    'SyncChanges',
+    'UnexpectedStatusCode',
 ]
@@ -42,6 +42,15 @@ class NoteNotFound(NotesApiError):
         )
 
 
+class NoteConflict(NotesApiError):
+    """Note has been modified on the server since it has been fetched"""
+
+    def __init__(self, note_id: int, hostname: str):
+        NotesApiError.__init__(
+            self, 'Note has been modified: ', note_id=note_id, hostname=hostname
+        )
+
+
 class InsufficientNextcloudStorage(NotesApiError):
     """Not enough free storage for saving the notes content"""
 
@@ -52,3 +61,26 @@ class InsufficientNextcloudStorage(NotesApiError):
             hostname=hostname,
             note=note,
         )
+
+
+class ServerUnavailable(NotesApiError):
+    """Server is overloaded or temporarily unavailable"""
+
+    def __init__(self, status_code: int, hostname: str):
+        NotesApiError.__init__(
+            self, 'Server unavailable: ', status_code=status_code, hostname=hostname
+        )
+        self.status_code = status_code
+
+
+class UnexpectedStatusCode(NotesApiError):
+    """Server responded with an error not covered by the other exceptions"""
+
+    def __init__(self, status_code: int, hostname: str):
+        NotesApiError.__init__(
+            self,
+            'Unexpected status code: ',
+            status_code=status_code,
+            hostname=hostname,
+        )
+        self.status_code = status_code
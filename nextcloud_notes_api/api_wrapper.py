@@ -1,113 +1,875 @@
-from copy import deepcopy
+from __future__ import annotations
+
+from contextlib import nullcontext
+from copy import copy
 from dataclasses import dataclass, field
-from typing import Iterator, List, Sequence, Tuple, Union
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from time import monotonic, perf_counter, sleep
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from weakref import WeakValueDictionary
 
-from requests import delete, get, post, put
+from requests import ConnectionError as RequestsConnectionError
+from requests import ConnectTimeout, RequestException, Response, Session, Timeout
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 
 from .api_exceptions import (
     InsufficientNextcloudStorage,
     InvalidNextcloudCredentials,
     InvalidNoteId,
+    NoteConflict,
     NoteNotFound,
+    ServerUnavailable,
+    UnexpectedStatusCode,
 )
+from .archive import ImportCheckpoint, NoteArchive, NoteArchiveWriter
+from .batch import BatchResult, run_batch
+from .cache import CacheEntry, MemoryNoteCache, NoteCache
+from .capabilities import Capabilities
+from .collection import NoteCollection
+from .hooks import CacheEvent, DecodeEvent, NotesApiHooks, RequestEvent, endpoint
+from .limits import RequestLimiter
 from .note import Note
+from .retry import RetryPolicy
+from .search import NoteIndex
+from .singleflight import SingleFlight
+from .snapshot import NoteSnapshot
+from .stream import iter_json_array
 
+try:
+    from orjson import loads
+except ImportError:  # pragma: no cover
+    from json import loads
 
-class NotesApi:
-    """Wraps the [Nextcloud Notes app API](https://github.com/nextcloud/notes/blob/master/docs/api/v1.md)."""  # noqa: E501
+_NOTES_PATH = '/index.php/apps/notes/api/v1/notes'
+_CAPABILITIES_PATH = '/ocs/v2.php/cloud/capabilities'
+_UNAVAILABLE_STATUS_CODES = (429, 502, 503, 504)
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+T = TypeVar('T')
+
+
+def _is_connect_error(error: RequestException) -> bool:
+    """Whether `error` occurred while connecting, before anything has been sent."""
+    if isinstance(error, ConnectTimeout):
+        return True
+    # Connection refused and friends are wrapped in urllib3's MaxRetryError
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class _NotesApiBase:
+    """Transport independent parts shared by `NotesApi` and `AsyncNotesApi`."""
 
     @dataclass
     class EtagCache:
-        """Convenience class for caching notes using HTTP ETags."""
+        """Convenience class for caching notes using HTTP ETags.
+
+        `EtagCache.notes` is immutable, so it is handed out without copying.
+        """
 
         etag: str = ''
-        notes: List[Note] = field(default_factory=list)
+        notes: NoteSnapshot = field(default_factory=NoteSnapshot)
 
     def __init__(
-        self, username: str, password: str, hostname: str, *, etag_caching: bool = True
+        self,
+        username: str,
+        password: str,
+        hostname: str,
+        *,
+        etag_caching: bool = True,
+        cache: Optional[NoteCache] = None,
+        note_cache_size: int = 128,
+        index: Optional[NoteIndex] = None,
+        retry: Optional[RetryPolicy] = None,
+        hooks: Iterable[NotesApiHooks] = (),
+        timeout: Optional[Union[float, Tuple[float, float]]] = None,
+        capabilities_ttl: Optional[float] = 3600,
     ):
-        """
-        Args:
-            username (str): Nextcloud username.
-            password (str): Nextcloud password.
-            hostname (str): Nextcloud hostname.
-            etag_caching (bool, optional): Whether to cache notes using HTTP ETags, if
-                the server supports it. Defaults to True.
-        """
         self.username = username
         """`str`: Nextcloud username."""
         self.password = password
         """`str`: Nextcloud password."""
         self.hostname = hostname
         """`str`: Nextcloud hostname."""
+        # A full base URL is accepted as well, e.g. for local test servers
+        self._base_url = hostname if '://' in hostname else f'https://{hostname}'
         self.etag_caching = etag_caching
         """`bool`: Whether to cache notes using HTTP ETags."""
+        self.cache = cache
+        """`NoteCache`: Persistent storage for ETag cached notes."""
+        self.index = index
+        """`NoteIndex`: Search index kept up to date with changed notes."""
+        self.retry = retry
+        """`RetryPolicy`: When to retry failed requests, None to never retry."""
+        self.hooks: List[NotesApiHooks] = list(hooks)
+        """`List[NotesApiHooks]`: Receive events about requests, caching and
+        decoding."""
+        self.timeout = timeout
+        """`Union[float, Tuple[float, float]]`: Request timeout in seconds."""
+        self.capabilities_ttl = capabilities_ttl
+        """`float`: Seconds to reuse fetched capabilities for, None for ever."""
 
-        self._etag_cache = NotesApi.EtagCache()
-        self._common_headers = {'OCS-APIRequest': 'true', 'Accept': 'application/json'}
+        self._etag_cache = _NotesApiBase.EtagCache()
+        self._etag_lock = Lock()
+        self._note_cache = MemoryNoteCache(note_cache_size)
+        self._capabilities: Optional[Capabilities] = None
 
     @property
     def auth_pair(self) -> Tuple[str, str]:
         """Tuple[str, str]: Tuple of `NotesApi.username` and `NotesApi.password`."""
         return (self.username, self.password)
 
+    def _cached_capabilities(self) -> Optional[Capabilities]:
+        """Capabilities fetched within `capabilities_ttl`, from memory or from
+        `cache`."""
+        capabilities = self._capabilities
+        if capabilities is None and self.cache is not None:
+            capabilities = self._capabilities = self.cache.get_capabilities()
+        if capabilities is None or capabilities.is_stale(self.capabilities_ttl):
+            return None
+        return capabilities
+
+    def _capabilities_from_response(
+        self, status_code: int, content: bytes
+    ) -> Capabilities:
+        """Parse and cache the capabilities of a capabilities response."""
+        self._raise_for_status(status_code)
+
+        capabilities = Capabilities.from_response(loads(content))
+        self._capabilities = capabilities
+        if self.cache is not None:
+            self.cache.set_capabilities(capabilities)
+        return capabilities
+
+    def _raise_for_status(
+        self,
+        status_code: int,
+        *,
+        note_id: Optional[int] = None,
+        note: Optional[Note] = None,
+    ) -> None:
+        """Raise the exception matching an error `status_code`.
+
+        `InvalidNoteId`, `NoteNotFound` and `NoteConflict` are only raised if
+        `note_id` is given, `InsufficientNextcloudStorage` only if `note` is given.
+        Any other error status raises `UnexpectedStatusCode`.
+        """
+        if status_code in _UNAVAILABLE_STATUS_CODES:
+            raise ServerUnavailable(status_code, self.hostname)
+        if status_code == 400 and note_id is not None:
+            raise InvalidNoteId(note_id, self.hostname)
+        elif status_code == 401:
+            raise InvalidNextcloudCredentials(
+                self.username, self.password, self.hostname
+            )
+        elif status_code == 404 and note_id is not None:
+            raise NoteNotFound(note_id, self.hostname)
+        elif status_code == 412 and note_id is not None:
+            raise NoteConflict(note_id, self.hostname)
+        elif status_code == 507 and note is not None:
+            raise InsufficientNextcloudStorage(self.hostname, note)
+        elif status_code >= 400:
+            raise UnexpectedStatusCode(status_code, self.hostname)
+
+    def _retry_delay(
+        self,
+        method: str,
+        retry: int,
+        started: float,
+        status_code: Optional[int] = None,
+        retry_after: Optional[str] = None,
+        *,
+        connect_error: bool = False,
+    ) -> Optional[float]:
+        """Seconds to wait before retrying a failed request, None to give up.
+
+        Args:
+            method (str): HTTP method of the request.
+            retry (int): Number of retries done so far.
+            started (float): `time.monotonic` when the first attempt was sent.
+            status_code (int, optional): Status of the response, None if the
+                request failed without one. Defaults to None.
+            retry_after (str, optional): `Retry-After` header of the response.
+                Defaults to None.
+            connect_error (bool, optional): Whether the connection couldn't be
+                established. Defaults to False.
+        """
+        policy = self.retry
+        if policy is None or retry >= policy.max_retries:
+            return None
+        if status_code is not None and status_code < 400:
+            return None
+        if not policy.retries(method, status_code, connect_error=connect_error):
+            return None
+
+        delay = policy.backoff(retry, retry_after)
+        if (
+            policy.max_elapsed is not None
+            and monotonic() - started + delay > policy.max_elapsed
+        ):
+            return None
+        return delay
+
+    def _emit_request(self, event: RequestEvent) -> None:
+        for hook in self.hooks:
+            hook.on_request(event)
+
+    def _emit_cache(self, cache: str, hit: bool) -> None:
+        if self.hooks:
+            event = CacheEvent(cache, hit)
+            for hook in self.hooks:
+                hook.on_cache(event)
+
+    def _decode(self, path: str, content: bytes, build: Callable[[Any], T]) -> T:
+        """Parse the JSON `content` and `build` notes from it, timing both for
+        `NotesApi.hooks`."""
+        if not self.hooks:
+            return build(loads(content))
+
+        started = perf_counter()
+        data = loads(content)
+        parsed = perf_counter()
+        result = build(data)
+        event = DecodeEvent(
+            endpoint(path),
+            len(data) if isinstance(data, list) else 1,
+            parsed - started,
+            perf_counter() - parsed,
+        )
+        for hook in self.hooks:
+            hook.on_decode(event)
+        return result
+
+    def _etag_entry(self) -> Optional[_NotesApiBase.EtagCache]:
+        """Cached note list to revalidate, None if ETag caching is disabled.
+
+        The entry is swapped as a whole when updated, so it stays consistent while
+        a request revalidating it is in flight.
+        """
+        if not self.etag_caching:
+            return None
+
+        with self._etag_lock:
+            if not self._etag_cache.etag and self.cache:
+                entry = self.cache.get_notes()
+                if entry:
+                    self._etag_cache = _NotesApiBase.EtagCache(
+                        entry.etag, NoteSnapshot.from_notes(entry.value)
+                    )
+            return self._etag_cache
+
+    @staticmethod
+    def _etag_headers(cached: Optional[_NotesApiBase.EtagCache]) -> Dict[str, str]:
+        """Headers for a conditional request against the `cached` note list."""
+        return {'If-None-Match': cached.etag} if cached else {}
+
+    def _notes_from_response(
+        self,
+        status_code: int,
+        headers: Mapping[str, str],
+        content: bytes,
+        cached: Optional[_NotesApiBase.EtagCache],
+    ) -> Union[Iterator[Note], Sequence[Note]]:
+        """Turn a response of the note list endpoint into notes.
+
+        Args:
+            status_code (int): Response status code.
+            headers (Mapping[str, str]): Response headers.
+            content (bytes): Response body.
+            cached (Optional[_NotesApiBase.EtagCache]): Note list that has been
+                revalidated, see `_NotesApiBase._etag_entry`.
+        """
+        self._raise_for_status(status_code)
+
+        if cached is None:
+            return self._decode(
+                _NOTES_PATH,
+                content,
+                lambda note_dicts: (
+                    Note.from_dict(note_dict) for note_dict in note_dicts
+                ),
+            )
+
+        self._emit_cache('notes', status_code == 304)
+
+        # Cache is valid
+        if status_code == 304:
+            return cached.notes
+
+        notes = self._decode(_NOTES_PATH, content, NoteSnapshot)
+        # Update cache
+        with self._etag_lock:
+            self._etag_cache = _NotesApiBase.EtagCache(headers['ETag'], notes)
+            if self.cache:
+                self.cache.set_notes(CacheEntry(headers['ETag'], notes))
+        return notes
+
+    def _cached_note(self, note_id: int) -> Optional[CacheEntry[Note]]:
+        """Cached note to revalidate when fetching note `note_id`.
+
+        Looks in the in-memory cache first and falls back to `NotesApi.cache`.
+        """
+        if not self.etag_caching:
+            return None
+
+        entry = self._note_cache.get_note(note_id)
+        if entry is None and self.cache:
+            entry = self.cache.get_note(note_id)
+            if entry:
+                self._note_cache.set_note(entry)
+        return entry
+
+    def _note_from_response(
+        self,
+        note_id: int,
+        cached: Optional[CacheEntry[Note]],
+        status_code: int,
+        headers: Mapping[str, str],
+        content: bytes,
+    ) -> Note:
+        """Turn a response of the single note endpoint into a note.
+
+        Args:
+            note_id (int): ID of the requested note.
+            cached (Optional[CacheEntry[Note]]): Cached note that has been
+                revalidated, see `_NotesApiBase._cached_note`.
+            status_code (int): Response status code.
+            headers (Mapping[str, str]): Response headers.
+            content (bytes): Response body.
+        """
+        if self.etag_caching:
+            self._emit_cache('note', status_code == 304 and cached is not None)
+
+        # Cache is valid
+        if status_code == 304 and cached:
+            return cached.value
+
+        self._raise_for_status(status_code, note_id=note_id)
+
+        note = self._decode(f'{_NOTES_PATH}/{note_id}', content, Note.from_dict)
+        if note.etag is None and headers.get('ETag'):
+            note.etag = headers['ETag'].strip('"')
+        if self.etag_caching and headers.get('ETag'):
+            entry = CacheEntry(headers['ETag'], note)
+            self._note_cache.set_note(entry)
+            if self.cache:
+                self.cache.set_note(entry)
+        return note
+
+    def _invalidate_note(self, note_id: int) -> None:
+        """Drop note `note_id` from the caches, after it has been changed."""
+        self._note_cache.delete_note(note_id)
+        if self.cache:
+            self.cache.delete_note(note_id)
+
+    def _saved_note(self, path: str, content: bytes) -> Note:
+        """Note sent back by the server after creating or updating it at `path`."""
+        note = self._decode(path, content, Note.from_dict)
+        if self.index is not None:
+            self.index.add(note)
+        return note
+
+    def _note_deleted(self, note_id: int) -> None:
+        """Forget note `note_id` after it has been deleted."""
+        if self.index is not None:
+            self.index.remove(note_id)
+
+    @staticmethod
+    def _update_headers(note: Note, if_match: bool) -> Dict[str, str]:
+        """Headers for updating `note`, only if it hasn't been modified."""
+        if not if_match:
+            return {}
+        if not note.etag:
+            raise ValueError(f'Note etag not set {note}')
+        etag = note.etag.strip('"')
+        return {'If-Match': f'"{etag}"'}
+
+    @staticmethod
+    def _update_data(note: Note) -> Dict[str, Any]:
+        """Request body for updating `note`."""
+        if not note.id:
+            raise ValueError(f'Note id not set {note}')
+
+        data = note.to_dict()
+        del data['id']
+        return data
+
+    def __repr__(self):
+        return f'<{type(self).__name__} [{self.hostname}]>'
+
+
+class NotesApi(_NotesApiBase):
+    """Wraps the [Nextcloud Notes app API](https://github.com/nextcloud/notes/blob/master/docs/api/v1.md)."""  # noqa: E501
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        hostname: str,
+        *,
+        etag_caching: bool = True,
+        cache: Optional[NoteCache] = None,
+        note_cache_size: int = 128,
+        index: Optional[NoteIndex] = None,
+        bind_notes: bool = False,
+        retry: Optional[RetryPolicy] = None,
+        limiter: Optional[RequestLimiter] = None,
+        hooks: Iterable[NotesApiHooks] = (),
+        pool_connections: int = 1,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        timeout: Optional[Union[float, Tuple[float, float]]] = None,
+        capabilities_ttl: Optional[float] = 3600,
+        negotiate: bool = False,
+    ):
+        """Connections are kept alive and reused between calls, call `NotesApi.close`
+        or use the `NotesApi` as a context manager to release them.
+
+        A `NotesApi` may be shared between threads. Concurrent calls of
+        `NotesApi.get_all_notes` without parameters, or of `NotesApi.get_single_note`
+        with the same ID, share a single request and its result.
+
+        Args:
+            username (str): Nextcloud username.
+            password (str): Nextcloud password.
+            hostname (str): Nextcloud hostname, or a base URL like
+                'http://localhost:8080' to not use HTTPS.
+            etag_caching (bool, optional): Whether to cache notes using HTTP ETags, if
+                the server supports it. Defaults to True.
+            cache (NoteCache, optional): Persistent storage for ETag cached notes,
+                e.g. `SqliteNoteCache`. Cached notes are revalidated before use.
+                Defaults to None.
+            note_cache_size (int, optional): Number of recently fetched single notes
+                to keep in memory for revalidation with their ETag, 0 disables it.
+                Defaults to 128.
+            index (NoteIndex, optional): Search index to update with notes created,
+                updated or deleted through this `NotesApi`. Defaults to None.
+            bind_notes (bool, optional): Whether to bind all returned notes to this
+                `NotesApi`, see `NotesApi.bind`. Defaults to False.
+            retry (RetryPolicy, optional): When and how long to wait before
+                retrying requests that failed with connection errors, timeouts or
+                overload responses. Defaults to None, meaning requests aren't
+                retried.
+            limiter (RequestLimiter, optional): Limits the request rate and number
+                of requests in flight, e.g. `RequestLimiter.for_host` to share the
+                limits with all `NotesApi` instances using the same host. Defaults
+                to None.
+            hooks (Iterable[NotesApiHooks], optional): Receive events about every
+                request, ETag cache lookup and response decoding, e.g.
+                `MetricsCollector`. Defaults to ().
+            pool_connections (int, optional): Number of hosts to keep connection pools
+                for. Defaults to 1.
+            pool_maxsize (int, optional): Maximum number of connections kept alive per
+                host. Defaults to 10.
+            pool_block (bool, optional): Whether to block once `pool_maxsize`
+                connections are in use, instead of opening throwaway connections.
+                Defaults to False.
+            timeout (Union[float, Tuple[float, float]], optional): Timeout in seconds
+                for every request, either a single value or a (connect, read) tuple.
+                Defaults to None, meaning no timeout.
+            capabilities_ttl (float, optional): Seconds to reuse the server's
+                capabilities for before fetching them again, None to never refetch.
+                They are persisted in `cache` if given. Defaults to 3600.
+            negotiate (bool, optional): Whether to use list parameters and If-Match
+                only if the server's API version supports them, see
+                `NotesApi.capabilities`. Defaults to False.
+        """
+        _NotesApiBase.__init__(
+            self,
+            username,
+            password,
+            hostname,
+            etag_caching=etag_caching,
+            cache=cache,
+            note_cache_size=note_cache_size,
+            index=index,
+            retry=retry,
+            hooks=hooks,
+            timeout=timeout,
+            capabilities_ttl=capabilities_ttl,
+        )
+        self.bind_notes = bind_notes
+        """`bool`: Whether to bind all returned notes to this `NotesApi`."""
+        self.limiter = limiter
+        """`RequestLimiter`: Limits the request rate and requests in flight."""
+        self.negotiate = negotiate
+        """`bool`: Whether to use optional API features only if supported."""
+
+        # Notes aren't hashable, so they are keyed by identity
+        self._bound_notes: WeakValueDictionary[int, Note] = WeakValueDictionary()
+        # Changed and new bound notes are kept alive until they've been flushed
+        self._changed_notes: Dict[int, Note] = {}
+        self._bound_lock = Lock()
+        self._flights: SingleFlight[Any] = SingleFlight()
+
+        self._session = Session()
+        self._session.headers.update(
+            {'OCS-APIRequest': 'true', 'Accept': 'application/json'}
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+    def close(self) -> None:
+        """Close all pooled connections.
+
+        The `NotesApi` may still be used afterwards, new connections are opened as
+        needed.
+        """
+        self._session.close()
+
+    def _request(self, method: str, path: str, **kwargs: Any) -> Response:
+        """Send a request to `path` on `NotesApi.hostname` through the pooled session.
+
+        Every attempt waits for `NotesApi.limiter` first, if set. Failed requests
+        are retried according to `NotesApi.retry`.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Absolute path of the endpoint.
+            kwargs (Any): Passed on to `requests.Session.request`.
+
+        Returns:
+            Response: The servers response.
+        """
+        started = monotonic()
+        retry = 0
+        while True:
+            try:
+                response = self._send(method, path, retry, **kwargs)
+            except (RequestsConnectionError, Timeout) as e:
+                delay = self._retry_delay(
+                    method,
+                    retry,
+                    started,
+                    connect_error=_is_connect_error(e),
+                )
+                if delay is None:
+                    raise
+            else:
+                delay = self._retry_delay(
+                    method,
+                    retry,
+                    started,
+                    response.status_code,
+                    response.headers.get('Retry-After'),
+                )
+                if delay is None:
+                    return response
+                response.close()
+            sleep(delay)
+            retry += 1
+
+    def _send(self, method: str, path: str, retry: int, **kwargs: Any) -> Response:
+        """Send a single attempt of a request, see `NotesApi._request`."""
+        with self.limiter.slot() if self.limiter else nullcontext(0.0) as waited:
+            started = perf_counter()
+            try:
+                response = self._session.request(
+                    method,
+                    f'{self._base_url}{path}',
+                    auth=self.auth_pair,
+                    timeout=self.timeout,
+                    **kwargs,
+                )
+            except Exception as e:
+                if self.hooks:
+                    self._emit_request(
+                        RequestEvent(
+                            method,
+                            path,
+                            None,
+                            0,
+                            0,
+                            perf_counter() - started,
+                            limiter_wait=waited,
+                            retry=retry,
+                            error=e,
+                        )
+                    )
+                raise
+
+        if self.hooks:
+            self._emit_request(
+                RequestEvent(
+                    method,
+                    path,
+                    response.status_code,
+                    len(response.request.body or b''),
+                    # Streamed bodies haven't been read yet
+                    int(response.headers.get('Content-Length', 0))
+                    if kwargs.get('stream')
+                    else len(response.content),
+                    perf_counter() - started,
+                    response_time=response.elapsed.total_seconds(),
+                    limiter_wait=waited,
+                    retry=retry,
+                )
+            )
+        return response
+
+    def capabilities(self, *, refresh: bool = False) -> Capabilities:
+        """Capabilities of the Notes app on the server.
+
+        They are fetched once and reused for `NotesApi.capabilities_ttl` seconds,
+        and kept in `NotesApi.cache` if set.
+
+        Args:
+            refresh (bool, optional): Whether to fetch them even if cached. Defaults
+                to False.
+
+        Returns:
+            Capabilities: Supported API versions and features.
+
+        Raises:
+            InvalidNextcloudCredentials: Invalid credentials supplied.
+        """
+        capabilities = None if refresh else self._cached_capabilities()
+        if capabilities is not None:
+            return capabilities
+
+        response = self._request('GET', _CAPABILITIES_PATH)
+        return self._capabilities_from_response(response.status_code, response.content)
+
     def get_api_version(self) -> str:
         """
         Returns:
-            str: Highest supported Notes app api version.
+            str: Highest supported Notes app api version, see
+                `NotesApi.capabilities`.
         """
-        response = get(
-            f'https://{self.hostname}/ocs/v2.php/cloud/capabilities',
-            auth=self.auth_pair,
-            headers=self._common_headers,
-        )
+        return self.capabilities().api_version
 
-        return response.json()['ocs']['data']['capabilities']['notes']['api_version'][
-            -1
-        ]
+    def _supports(self, feature: str) -> bool:
+        """Whether to use `feature`, always if `NotesApi.negotiate` is off."""
+        return not self.negotiate or feature in self.capabilities().features
 
-    def get_all_notes(self) -> Union[Iterator[Note], Sequence[Note]]:
+    def get_all_notes(
+        self,
+        *,
+        chunk_size: Optional[int] = None,
+        exclude: Iterable[str] = (),
+        prune_before: Optional[Union[int, datetime]] = None,
+        as_collection: bool = False,
+        stream: bool = False,
+    ) -> Union[Iterator[Note], Sequence[Note]]:
         """Fetch all notes.
 
+        If `chunk_size` is set, notes are fetched lazily in chunks of `chunk_size`
+        notes while the returned `typing.Iterator` is consumed. Servers without
+        chunking support (API < 1.2) return all notes in the first chunk.
+
+        Fields listed in `exclude` are not transferred and left unset. Excluded
+        `Note.content` is fetched via `NotesApi.get_single_note` on first access.
+
+        Notes not modified since `prune_before` only have their `Note.id` set.
+
+        With `stream`, the response is parsed while it is downloaded and notes are
+        yielded one by one, so memory use doesn't grow with the number of notes.
+
+        The ETag cache is bypassed if any of `chunk_size`, `exclude`,
+        `prune_before` or `stream` is set. With `NotesApi.negotiate`, parameters the
+        server doesn't support are dropped instead of sent, so the ETag cache is
+        used if none are left.
+
+        With `as_collection`, the notes are returned as a column oriented
+        `NoteCollection` for fast bulk filtering and sorting.
+
+        Concurrent calls without `chunk_size`, `exclude`, `prune_before` and `stream`
+        share a single request.
+
+        Args:
+            chunk_size (int, optional): Number of notes to fetch per request.
+                Defaults to None, meaning all notes are fetched at once.
+            exclude (Iterable[str], optional): Names of fields to exclude, e.g.
+                `('content',)`. Defaults to ().
+            prune_before (Union[int, datetime], optional): Only transfer notes
+                modified at or after this posix timestamp or `datetime`. Defaults to
+                None.
+            as_collection (bool, optional): Whether to return a `NoteCollection`.
+                Defaults to False.
+            stream (bool, optional): Whether to parse the response incrementally
+                and return a `typing.Iterator`. Defaults to False.
+
         Returns:
-            Union[Iterator[Note], Sequence[Note]]: A `typing.Iterator` or
-                `collections.abc.Sequence` of all notes.
+            Union[Iterator[Note], Sequence[Note]]: A `typing.Iterator` or `list` of
+                all notes.
 
         Raises:
             InvalidNextcloudCredentials: Invalid credentials supplied.
         """
-        headers = self._common_headers
-        if self.etag_caching:
-            headers['If-None-Match'] = self._etag_cache.etag
+        notes = self._get_all_notes(chunk_size, tuple(exclude), prune_before, stream)
+        if as_collection:
+            return NoteCollection.from_notes(notes)
+        if self.bind_notes:
+            if isinstance(notes, Sequence):
+                return [self.bind(note) for note in notes]
+            return map(self.bind, notes)
+        if isinstance(notes, NoteSnapshot):
+            # A list of its own, the snapshot stays shared with the ETag cache
+            return list(notes)
+        return notes
 
-        response = get(
-            f'https://{self.hostname}/index.php/apps/notes/api/v1/notes',
-            auth=self.auth_pair,
-            headers=headers,
-        )
+    def _get_all_notes(
+        self,
+        chunk_size: Optional[int],
+        exclude: Sequence[str],
+        prune_before: Optional[Union[int, datetime]],
+        stream: bool,
+    ) -> Union[Iterator[Note], Sequence[Note]]:
+        """See `NotesApi.get_all_notes`."""
+        if exclude and not self._supports('exclude'):
+            exclude = ()
+        if prune_before is not None and not self._supports('prune_before'):
+            prune_before = None
+        if chunk_size is not None and not self._supports('chunking'):
+            if not (exclude or prune_before is not None or stream):
+                # Keep returning an iterator, but from the ETag cache
+                return iter(self._get_all_notes(None, exclude, prune_before, stream))
+            chunk_size = None
 
-        if response.status_code == 401:
-            raise InvalidNextcloudCredentials(
-                self.username, self.password, self.hostname
+        params: Dict[str, Any] = {}
+        if exclude:
+            params['exclude'] = ','.join(exclude)
+        if prune_before is not None:
+            if isinstance(prune_before, datetime):
+                prune_before = int(prune_before.timestamp())
+            params['pruneBefore'] = prune_before
+
+        if chunk_size is not None:
+            params['chunkSize'] = chunk_size
+
+        # Fetch the first chunk right away, so errors are raised here
+        if stream:
+            return self._iter_streamed_notes(
+                self._get_note_list(params, stream=True), params, exclude
             )
+        if chunk_size is not None:
+            return self._iter_note_chunks(self._get_note_list(params), params, exclude)
 
-        # Cache is valid
-        if response.status_code == 304 and self.etag_caching:
-            return self._etag_cache.notes
+        if params:
+            response = self._get_note_list(params)
+            return self._decode(
+                _NOTES_PATH,
+                response.content,
+                lambda note_dicts: [
+                    self._listed_note(note_dict, exclude) for note_dict in note_dicts
+                ],
+            )
 
         if self.etag_caching:
-            notes = [Note(**note_dict) for note_dict in response.json()]
-            # Update cache
-            self._etag_cache = NotesApi.EtagCache(
-                response.headers['ETag'], deepcopy(notes)
+            # The ETag cached list is immutable, so concurrent callers can share it
+            return self._flights.do('notes', self._fetch_note_list)
+
+        # Only share the response, every caller gets its own notes
+        response = self._flights.do(
+            'notes-response', lambda: self._request('GET', _NOTES_PATH)
+        )
+        return self._notes_from_response(
+            response.status_code, response.headers, response.content, None
+        )
+
+    def _fetch_note_list(self) -> Sequence[Note]:
+        """Fetch all notes, revalidating the ETag cache."""
+        cached = self._etag_entry()
+        response = self._request('GET', _NOTES_PATH, headers=self._etag_headers(cached))
+
+        return self._notes_from_response(  # type: ignore
+            response.status_code, response.headers, response.content, cached
+        )
+
+    def _get_note_list(
+        self,
+        params: Dict[str, Any],
+        cursor: Optional[str] = None,
+        *,
+        stream: bool = False,
+    ) -> Response:
+        """Fetch the note list, or the chunk of it starting at `cursor`.
+
+        With `stream`, the body is left to be read from the returned response.
+        """
+        if cursor:
+            params = {**params, 'chunkCursor': cursor}
+
+        response = self._request('GET', _NOTES_PATH, params=params, stream=stream)
+
+        if response.status_code >= 400:
+            response.close()
+        self._raise_for_status(response.status_code)
+        return response
+
+    def _iter_note_chunks(
+        self, response: Response, params: Dict[str, Any], exclude: Sequence[str]
+    ) -> Iterator[Note]:
+        """Yield the notes of `response` and all following chunks."""
+        while True:
+            yield from self._decode(
+                _NOTES_PATH,
+                response.content,
+                lambda note_dicts: [
+                    self._listed_note(note_dict, exclude) for note_dict in note_dicts
+                ],
             )
-            return notes
-        else:
-            return (Note(**note_dict) for note_dict in response.json())
+
+            cursor = response.headers.get('X-Notes-Chunk-Cursor')
+            if not cursor:
+                return
+            response = self._get_note_list(params, cursor)
+
+    def _iter_streamed_notes(
+        self, response: Response, params: Dict[str, Any], exclude: Sequence[str]
+    ) -> Iterator[Note]:
+        """Yield the notes of the streamed `response` and all following chunks, as
+        they are parsed."""
+        while True:
+            with response:
+                for note_dict in iter_json_array(
+                    response.iter_content(_STREAM_CHUNK_SIZE)
+                ):
+                    yield self._listed_note(note_dict, exclude)
+
+            cursor = response.headers.get('X-Notes-Chunk-Cursor')
+            if not cursor:
+                return
+            response = self._get_note_list(params, cursor, stream=True)
+
+    def _listed_note(self, note_dict: Dict[str, Any], exclude: Sequence[str]) -> Note:
+        """Note from the note list, loading its content lazily if it was excluded."""
+        if 'content' not in exclude or 'content' in note_dict:
+            return Note.from_dict(note_dict)
+
+        note_id = note_dict['id']
+        return Note(
+            **note_dict,
+            content_loader=lambda: self.get_single_note(note_id).content,
+        )
 
     def get_single_note(self, note_id: int) -> Note:
         """Retrieve note with ID `note_id`.
 
+        Concurrent calls for the same note share a single request, every caller
+        receives its own copy of the note.
+
         Args:
             note_id (int): ID of note to retrieve.
 
@@ -119,22 +881,22 @@ class NotesApi:
             InvalidNextcloudCredentials: Invalid credentials supplied.
             NoteNotFound: Note with id `note_id` doesn't exist.
         """
-        response = get(
-            f'https://{self.hostname}/index.php/apps/notes/api/v1/notes/{note_id}',
-            auth=self.auth_pair,
-            headers=self._common_headers,
+        note = self._flights.do(
+            ('note', note_id), lambda: self._fetch_single_note(note_id)
         )
+        # Concurrent callers share the fetched note, so each gets its own copy
+        return self._bound(copy(note))
 
-        if response.status_code == 400:
-            raise InvalidNoteId(note_id, self.hostname)
-        elif response.status_code == 401:
-            raise InvalidNextcloudCredentials(
-                self.username, self.password, self.hostname
-            )
-        elif response.status_code == 404:
-            raise NoteNotFound(note_id, self.hostname)
+    def _fetch_single_note(self, note_id: int) -> Note:
+        """Fetch note `note_id`, revalidating the ETag cache."""
+        cached = self._cached_note(note_id)
+        headers = {'If-None-Match': cached.etag} if cached else {}
+
+        response = self._request('GET', f'{_NOTES_PATH}/{note_id}', headers=headers)
 
-        return Note(**response.json())
+        return self._note_from_response(
+            note_id, cached, response.status_code, response.headers, response.content
+        )
 
     def create_note(self, note: Note) -> Note:
         """Create new note.
@@ -153,66 +915,74 @@ class NotesApi:
             InvalidNextcloudCredentials: Invalid credentials supplied.
             InsufficientNextcloudStorage: Not enough storage to save `note`.
         """
-        response = post(
-            f'https://{self.hostname}/index.php/apps/notes/api/v1/notes',
-            auth=self.auth_pair,
-            headers=self._common_headers,
-            data=note.to_dict(),
-        )
+        response = self._request('POST', _NOTES_PATH, data=note.to_dict())
 
         # Getting a status 400 is impossible since the note id is ignored by the
         # server, although specified by the api docs
-        if response.status_code == 401:
-            raise InvalidNextcloudCredentials(
-                self.username, self.password, self.hostname
-            )
-        elif response.status_code == 507:
-            raise InsufficientNextcloudStorage(self.hostname, note)
+        self._raise_for_status(response.status_code, note=note)
 
-        return Note(**response.json())
+        return self._bound(self._saved_note(_NOTES_PATH, response.content))
 
-    def update_note(self, note: Note) -> Note:
+    def update_note(self, note: Note, *, if_match: bool = False) -> Note:
         """Update `note`.
 
+        With `if_match`, the update is only applied if the note hasn't been modified
+        on the server since `note` has been fetched, based on `Note.etag`. This
+        avoids fetching the note again right before updating it. With
+        `NotesApi.negotiate`, servers ignoring If-Match (API < 1.3) get the note
+        revalidated before the update instead, by ETag or, if the server doesn't
+        send one, by `Note.modified`. That narrows but doesn't close the window
+        for conflicting changes.
+
         Args:
             note (Note): New note, `Note.id` has to match the ID of the note to be
                 replaced.
+            if_match (bool, optional): Whether to only update the note if its ETag
+                still matches `Note.etag`. Defaults to False.
 
         Returns:
             Note: Updated note with new `Note.modified`.
 
         Raises:
-            ValueError: `Note.id` is not set.
+            ValueError: `Note.id` is not set, or `if_match` is set and `Note.etag`
+                isn't.
             InvalidNoteId: `Note.id` is an invalid ID.
             InvalidNextcloudCredentials: Invalid credentials supplied.
             NoteNotFound: Note with id `Note.id` doesn't exist.
+            NoteConflict: The note has been modified on the server.
             InsufficientNextcloudStorage: Not enough storage to save `note`.
         """
-        if not note.id:
-            raise ValueError(f'Note id not set {note}')
+        return self._bound(self._put_note(note, self._update_data(note), if_match))
 
-        data = note.to_dict()
-        del data['id']
+    def _put_note(self, note: Note, data: Dict[str, Any], if_match: bool) -> Note:
+        """Send `data` as update of `note`, see `NotesApi.update_note`."""
+        headers = self._update_headers(note, if_match)
+        if headers and not self._supports('if_match'):
+            self._check_etag(note)
+            headers = {}
 
-        response = put(
-            f'https://{self.hostname}/index.php/apps/notes/api/v1/notes/{note.id}',
-            auth=self.auth_pair,
-            headers=self._common_headers,
-            data=data,
+        self._invalidate_note(note.id)
+        response = self._request(
+            'PUT', f'{_NOTES_PATH}/{note.id}', data=data, headers=headers
         )
 
-        if response.status_code == 400:
-            raise InvalidNoteId(note.id, self.hostname)
-        elif response.status_code == 401:
-            raise InvalidNextcloudCredentials(
-                self.username, self.password, self.hostname
-            )
-        elif response.status_code == 404:
-            raise NoteNotFound(note.id, self.hostname)
-        elif response.status_code == 507:
-            raise InsufficientNextcloudStorage(self.hostname, note)
+        self._raise_for_status(response.status_code, note_id=note.id, note=note)
+
+        return self._saved_note(f'{_NOTES_PATH}/{note.id}', response.content)
 
-        return Note(**response.json())
+    def _check_etag(self, note: Note) -> None:
+        """Raise `NoteConflict` if `note` has been modified on the server.
+
+        Without an ETag from the server, `Note.modified` is compared instead. If
+        that is missing too, the note is assumed to have been modified.
+        """
+        current = self.get_single_note(note.id)
+        if current.etag is not None:
+            conflict = current.etag.strip('"') != note.etag.strip('"')
+        else:
+            conflict = current.modified is None or current.modified != note.modified
+        if conflict:
+            raise NoteConflict(note.id, self.hostname)
 
     def delete_note(self, note_id: int):
         """Delete note with ID `note_id`.
@@ -225,20 +995,242 @@ class NotesApi:
             InvalidNextcloudCredentials: Invalid credentials supplied.
             NoteNotFound: Note with id `note_id` doesn't exist.
         """
-        response = delete(
-            f'https://{self.hostname}/index.php/apps/notes/api/v1/notes/{note_id}',
-            auth=self.auth_pair,
-            headers=self._common_headers,
-        )
+        self._invalidate_note(note_id)
+        response = self._request('DELETE', f'{_NOTES_PATH}/{note_id}')
 
-        if response.status_code == 400:
-            raise InvalidNoteId(note_id, self.hostname)
-        elif response.status_code == 401:
-            raise InvalidNextcloudCredentials(
-                self.username, self.password, self.hostname
+        self._raise_for_status(response.status_code, note_id=note_id)
+        self._note_deleted(note_id)
+
+    def create_notes(
+        self, notes: Iterable[Note], *, max_workers: int = 10
+    ) -> BatchResult:
+        """Create `notes` concurrently, see `NotesApi.create_note`.
+
+        Failures are recorded per note instead of aborting the batch. Keep
+        `max_workers` at or below `pool_maxsize` to reuse connections.
+
+        Args:
+            notes (Iterable[Note]): Notes to create.
+            max_workers (int, optional): Maximum number of concurrent requests.
+                Defaults to 10.
+
+        Returns:
+            BatchResult: Created notes and errors, streamed as requests complete.
+        """
+        return run_batch(self.create_note, notes, max_workers)
+
+    def update_notes(
+        self, notes: Iterable[Note], *, max_workers: int = 10
+    ) -> BatchResult:
+        """Update `notes` concurrently, see `NotesApi.update_note`.
+
+        Failures are recorded per note instead of aborting the batch.
+
+        Args:
+            notes (Iterable[Note]): Notes to update.
+            max_workers (int, optional): Maximum number of concurrent requests.
+                Defaults to 10.
+
+        Returns:
+            BatchResult: Updated notes and errors, streamed as requests complete.
+        """
+        return run_batch(self.update_note, notes, max_workers)
+
+    def delete_notes(
+        self, note_ids: Iterable[int], *, max_workers: int = 10
+    ) -> BatchResult:
+        """Delete notes with IDs `note_ids` concurrently, see `NotesApi.delete_note`.
+
+        Failures are recorded per note instead of aborting the batch.
+
+        Args:
+            note_ids (Iterable[int]): IDs of notes to delete.
+            max_workers (int, optional): Maximum number of concurrent requests.
+                Defaults to 10.
+
+        Returns:
+            BatchResult: Errors, streamed as requests complete.
+        """
+        return run_batch(self.delete_note, note_ids, max_workers)
+
+    def export_notes(
+        self,
+        path: Union[str, Path],
+        *,
+        chunk_size: Optional[int] = None,
+        block_size: int = 256,
+    ) -> int:
+        """Stream all notes into a compressed archive at `path`, see `NoteArchive`.
+
+        Notes are streamed from the server into the archive, so memory use doesn't
+        grow with the number of notes.
+
+        Args:
+            path (Union[str, Path]): Archive file, overwritten if it exists.
+            chunk_size (int, optional): Number of notes to fetch per request, see
+                `NotesApi.get_all_notes`. Defaults to None.
+            block_size (int, optional): Number of notes per compressed block, see
+                `NoteArchiveWriter`. Defaults to 256.
+
+        Returns:
+            int: Number of exported notes.
+
+        Raises:
+            InvalidNextcloudCredentials: Invalid credentials supplied.
+        """
+        with NoteArchiveWriter(path, block_size=block_size) as writer:
+            return writer.write_all(
+                self._get_all_notes(chunk_size, (), None, stream=True)
             )
-        elif response.status_code == 404:
-            raise NoteNotFound(note_id, self.hostname)
 
-    def __repr__(self):
-        return f'<NotesApi [{self.hostname}]>'
+    def import_notes(
+        self,
+        path: Union[str, Path],
+        *,
+        max_workers: int = 10,
+        checkpoint: Optional[Union[str, Path]] = None,
+    ) -> BatchResult:
+        """Create all notes of the archive at `path` concurrently, see
+        `NotesApi.create_notes`.
+
+        With `checkpoint`, every created note is recorded in the checkpoint file,
+        and notes already recorded there are skipped. Pass the same checkpoint to
+        resume an interrupted import.
+
+        Args:
+            path (Union[str, Path]): Archive written by `NotesApi.export_notes`.
+            max_workers (int, optional): Maximum number of concurrent requests.
+                Defaults to 10.
+            checkpoint (Union[str, Path], optional): Checkpoint file, see
+                `ImportCheckpoint`. Defaults to None.
+
+        Returns:
+            BatchResult: Archived notes along with the created notes and errors,
+                streamed as requests complete.
+        """
+        imported = ImportCheckpoint(checkpoint) if checkpoint is not None else None
+
+        def import_note(note: Note) -> Note:
+            archived_id = note.id
+            note.id = None
+            try:
+                created = self.create_note(note)
+            finally:
+                note.id = archived_id
+            if imported is not None and archived_id is not None:
+                imported.record(archived_id, created.id)
+            return created
+
+        notes: Iterable[Note] = NoteArchive(path)
+        if imported is not None:
+            notes = (note for note in notes if note.id not in imported)
+        return run_batch(import_note, notes, max_workers)
+
+    def bind(self, note: Note) -> Note:
+        """Bind `note` to this `NotesApi`.
+
+        Bound notes can save, refresh and delete themselves, see `Note.save`, and
+        track their changes in `Note.dirty_fields` from now on.
+
+        Args:
+            note (Note): Note to bind, assumed to be in sync with the server.
+
+        Returns:
+            Note: `note`.
+        """
+        note.api = self
+        note._mark_synced()
+        with self._bound_lock:
+            self._bound_notes[id(note)] = note
+            if note.id is None:
+                self._changed_notes[id(note)] = note
+        return note
+
+    def _track(self, note: Note) -> None:
+        """Hold a strong reference to bound `note`, which has been changed."""
+        with self._bound_lock:
+            self._changed_notes[id(note)] = note
+
+    def _untrack(self, note: Note) -> None:
+        """Drop the strong reference to bound `note`, which is in sync again."""
+        with self._bound_lock:
+            self._changed_notes.pop(id(note), None)
+
+    def _bound(self, note: Note) -> Note:
+        return self.bind(note) if self.bind_notes else note
+
+    def flush(
+        self,
+        notes: Optional[Iterable[Note]] = None,
+        *,
+        if_match: bool = False,
+        max_workers: int = 10,
+    ) -> BatchResult:
+        """Push all changes of bound notes to the server in one batch.
+
+        Notes without `Note.id` are created, notes with `Note.dirty_fields` are
+        updated with just those fields. Changes to bound notes sharing an ID are
+        merged into a single request, so any number of edits to a note costs at
+        most one request per flush. Clean notes aren't sent at all.
+
+        Args:
+            notes (Iterable[Note], optional): Notes to flush, notes not bound to
+                this `NotesApi` are skipped. Defaults to None, meaning all bound
+                notes.
+            if_match (bool, optional): Only update notes that haven't been modified
+                on the server, see `NotesApi.update_note`. Defaults to False.
+            max_workers (int, optional): Maximum number of concurrent requests.
+                Defaults to 10.
+
+        Returns:
+            BatchResult: One item per created or updated note, see
+                `NotesApi.update_notes`.
+        """
+        if notes is None:
+            with self._bound_lock:
+                notes = list(self._bound_notes.values())
+
+        created: List[List[Note]] = []
+        updated: Dict[int, List[Note]] = {}
+        for note in notes:
+            if note.api is not self:
+                continue
+            if note.id is None:
+                created.append([note])
+            elif note.dirty_fields:
+                updated.setdefault(note.id, []).append(note)
+            else:
+                # Changed back to its synced state
+                self._untrack(note)
+
+        groups = [*created, *updated.values()]
+        leaders = {id(group[0]): group for group in groups}
+        return run_batch(
+            lambda note: self._push_notes(leaders[id(note)], if_match),
+            [group[0] for group in groups],
+            max_workers,
+        )
+
+    def _push_notes(self, notes: List[Note], if_match: bool) -> Note:
+        """Create or update bound `notes`, which all share the same ID."""
+        note = notes[0]
+        if note.id is None:
+            saved = self.create_note(note)
+        else:
+            data: Dict[str, Any] = {}
+            # Later edits win, if the same field has been changed in several notes
+            for changed in notes:
+                for field_name in changed.dirty_fields:
+                    data[field_name] = getattr(changed, field_name)
+            saved = self._put_note(note, data, if_match)
+
+        for changed in notes:
+            changed._update_from(saved)
+            self._untrack(changed)
+        return note
+
+    def __enter__(self) -> NotesApi:
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
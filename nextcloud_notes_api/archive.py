@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import gzip
+import json
+import zlib
+from pathlib import Path
+from threading import Lock
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from .note import Note
+
+_READ_SIZE = 64 * 1024
+
+
+def _index_path(path: Union[str, Path]) -> Path:
+    return Path(f'{path}.idx')
+
+
+class NoteArchiveWriter:
+    """Writes notes to a gzip compressed JSON lines archive, see `NoteArchive`.
+
+    Notes are compressed in blocks of `block_size` notes, each block is a separate
+    gzip member. The archive is a regular `.jsonl.gz` file, the offset of every
+    note's block is written to an index file next to it. Only the current block is
+    kept in memory.
+    """
+
+    def __init__(self, path: Union[str, Path], *, block_size: int = 256):
+        """
+        Args:
+            path (Union[str, Path]): Archive file, overwritten if it exists. The
+                index is written to the same path with `.idx` appended.
+            block_size (int, optional): Number of notes per compressed block, larger
+                blocks compress better but make random access slower. Defaults to
+                256.
+        """
+        self.path = path
+        """`Union[str, Path]`: Archive file."""
+        self.block_size = block_size
+        """`int`: Number of notes per compressed block."""
+        self.count = 0
+        """`int`: Number of notes written so far."""
+
+        self._file = open(path, 'wb')
+        self._index = open(_index_path(path), 'w', encoding='utf-8')
+        self._block: List[bytes] = []
+        self._block_ids: List[Optional[int]] = []
+
+    def write(self, note: Note) -> None:
+        """Append `note` to the archive.
+
+        Args:
+            note (Note): Note to write, including its `Note.id`.
+        """
+        self._block.append(json.dumps(note.to_dict()).encode() + b'\n')
+        self._block_ids.append(note.id)
+        self.count += 1
+        if len(self._block) >= self.block_size:
+            self._flush_block()
+
+    def write_all(self, notes: Iterable[Note]) -> int:
+        """Append all `notes` to the archive.
+
+        Args:
+            notes (Iterable[Note]): Notes to write, consumed lazily.
+
+        Returns:
+            int: Number of notes written.
+        """
+        written = 0
+        for note in notes:
+            self.write(note)
+            written += 1
+        return written
+
+    def _flush_block(self) -> None:
+        if not self._block:
+            return
+        offset = self._file.tell()
+        self._file.write(gzip.compress(b''.join(self._block)))
+        self._index.writelines(
+            f'{note_id}\t{offset}\n' for note_id in self._block_ids if note_id
+        )
+        self._block.clear()
+        self._block_ids.clear()
+
+    def close(self) -> None:
+        """Write the last block and close the archive."""
+        self._flush_block()
+        self._file.close()
+        self._index.close()
+
+    def __enter__(self) -> NoteArchiveWriter:
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f'<NoteArchiveWriter [{self.path}, {self.count} notes]>'
+
+
+class NoteArchive:
+    """Reads an archive written by `NoteArchiveWriter` or `NotesApi.export_notes`.
+
+    Iterating streams the notes in constant memory, `NoteArchive.get` looks up a
+    single note by ID through the index, decompressing only its block.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Args:
+            path (Union[str, Path]): Archive file.
+        """
+        self.path = path
+        """`Union[str, Path]`: Archive file."""
+        self._offsets: Optional[Dict[int, int]] = None
+
+    @property
+    def offsets(self) -> Dict[int, int]:
+        """`Dict[int, int]`: Offset of the block of every note by ID, loaded from
+        the index on first access."""
+        if self._offsets is None:
+            with open(_index_path(self.path), encoding='utf-8') as index:
+                self._offsets = {
+                    int(note_id): int(offset)
+                    for note_id, offset in (line.split('\t') for line in index)
+                }
+        return self._offsets
+
+    def get(self, note_id: int) -> Note:
+        """
+        Args:
+            note_id (int): ID of the note at the time it has been archived.
+
+        Returns:
+            Note: The archived note.
+
+        Raises:
+            KeyError: There is no note with ID `note_id` in the archive.
+        """
+        offset = self.offsets[note_id]
+        with open(self.path, 'rb') as file:
+            file.seek(offset)
+            block = _read_member(file)
+
+        for line in block.splitlines():
+            note_dict = json.loads(line)
+            if note_dict.get('id') == note_id:
+                return Note.from_dict(note_dict)
+        raise KeyError(note_id)
+
+    def __iter__(self) -> Iterator[Note]:
+        with gzip.open(self.path, 'rb') as file:
+            for line in file:
+                yield Note.from_dict(json.loads(line))
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __contains__(self, note_id: object) -> bool:
+        return note_id in self.offsets
+
+    def __repr__(self) -> str:
+        return f'<NoteArchive [{self.path}]>'
+
+
+def _read_member(file: IO[bytes]) -> bytes:
+    """Decompress the gzip member starting at the current position of `file`."""
+    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    data = []
+    while not decompressor.eof:
+        chunk = file.read(_READ_SIZE)
+        if not chunk:
+            raise EOFError('Archive ended in the middle of a block')
+        data.append(decompressor.decompress(chunk))
+    return b''.join(data)
+
+
+class ImportCheckpoint:
+    """Records which archived notes have been imported, so an interrupted import
+    can be resumed.
+
+    Every imported note is appended to the checkpoint file right away, as the
+    archived ID along with the ID the server assigned.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Args:
+            path (Union[str, Path]): Checkpoint file, created if it doesn't exist.
+        """
+        self.path = path
+        """`Union[str, Path]`: Checkpoint file."""
+        self.imported: Dict[int, int] = {}
+        """`Dict[int, int]`: Server assigned IDs by archived ID."""
+
+        try:
+            with open(path, 'r+b') as file:
+                data = file.read()
+                complete = data.rfind(b'\n') + 1
+                if complete < len(data):
+                    # Torn write of an interrupted import, cut off so new records
+                    # start on a line of their own
+                    file.truncate(complete)
+        except FileNotFoundError:
+            data, complete = b'', 0
+
+        for line in data[:complete].decode().splitlines():
+            archived_id, note_id = line.split('\t')
+            self.imported[int(archived_id)] = int(note_id)
+
+        self._lock = Lock()
+
+    def record(self, archived_id: int, note_id: int) -> None:
+        """Mark archived note `archived_id` as imported as note `note_id`.
+
+        Args:
+            archived_id (int): ID of the note in the archive.
+            note_id (int): ID of the created note.
+        """
+        with self._lock:
+            self.imported[archived_id] = note_id
+            # Reopened every time, so the file is complete whenever the import stops
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(f'{archived_id}\t{note_id}\n')
+
+    def __contains__(self, archived_id: object) -> bool:
+        return archived_id in self.imported
+
+    def __repr__(self) -> str:
+        return f'<ImportCheckpoint [{self.path}, {len(self.imported)} imported]>'
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+from asyncio import Semaphore, sleep
+from time import monotonic, perf_counter
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple, Union
+
+from .api_wrapper import _CAPABILITIES_PATH, _NOTES_PATH, _NotesApiBase
+from .cache import NoteCache
+from .capabilities import Capabilities
+from .hooks import NotesApiHooks, RequestEvent
+from .note import Note
+from .retry import RetryPolicy
+from .search import NoteIndex
+from .snapshot import NoteSnapshot
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+class AsyncNotesApi(_NotesApiBase):
+    """Asynchronous counterpart of `NotesApi`, built on
+    [httpx](https://www.python-httpx.org/).
+
+    Covers the core of `NotesApi` as coroutines raising the same exceptions:
+    capabilities, reading, creating, updating and deleting single notes, and
+    listing all notes without parameters. Batches, bound notes, exports and
+    feature negotiation are only offered by `NotesApi`, use `asyncio.gather` to
+    fan out instead. Requires the `async` extra:
+    `pip install nextcloud-notes-api[async]`.
+    """
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        hostname: str,
+        *,
+        etag_caching: bool = True,
+        cache: Optional[NoteCache] = None,
+        note_cache_size: int = 128,
+        index: Optional[NoteIndex] = None,
+        retry: Optional[RetryPolicy] = None,
+        hooks: Iterable[NotesApiHooks] = (),
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[Union[float, Tuple[float, float]]] = None,
+        capabilities_ttl: Optional[float] = 3600,
+    ):
+        """Connections are kept alive and reused between calls, await
+        `AsyncNotesApi.aclose` or use the `AsyncNotesApi` as an async context manager
+        to release them.
+
+        Args:
+            username (str): Nextcloud username.
+            password (str): Nextcloud password.
+            hostname (str): Nextcloud hostname, see `NotesApi`.
+            etag_caching (bool, optional): Whether to cache notes using HTTP ETags, if
+                the server supports it. Defaults to True.
+            cache (NoteCache, optional): Persistent storage for ETag cached notes,
+                see `NotesApi`. Defaults to None.
+            note_cache_size (int, optional): Number of recently fetched single notes
+                to keep in memory, see `NotesApi`. Defaults to 128.
+            index (NoteIndex, optional): Search index to keep up to date, see
+                `NotesApi`. Defaults to None.
+            retry (RetryPolicy, optional): When to retry failed requests, see
+                `NotesApi`. Defaults to None.
+            hooks (Iterable[NotesApiHooks], optional): Receive events, see
+                `NotesApi`. Defaults to ().
+            max_connections (int, optional): Maximum number of open connections.
+                Defaults to 100.
+            max_keepalive_connections (int, optional): Maximum number of idle
+                connections kept alive. Defaults to 20.
+            max_concurrency (int, optional): Maximum number of requests in flight at
+                once, further requests wait for a free slot. Defaults to None,
+                meaning unbounded.
+            timeout (Union[float, Tuple[float, float]], optional): Timeout in seconds
+                for every request, either a single value or a (connect, read) tuple.
+                Defaults to None, meaning no timeout.
+            capabilities_ttl (float, optional): Seconds to reuse the server's
+                capabilities for, see `NotesApi`. Defaults to 3600.
+
+        Raises:
+            ImportError: httpx is not installed.
+        """
+        if httpx is None:
+            raise ImportError(
+                'AsyncNotesApi requires httpx, install nextcloud-notes-api[async]'
+            )
+
+        _NotesApiBase.__init__(
+            self,
+            username,
+            password,
+            hostname,
+            etag_caching=etag_caching,
+            cache=cache,
+            note_cache_size=note_cache_size,
+            index=index,
+            retry=retry,
+            hooks=hooks,
+            timeout=timeout,
+            capabilities_ttl=capabilities_ttl,
+        )
+        self.max_concurrency = max_concurrency
+        """`int`: Maximum number of requests in flight at once."""
+
+        # Created lazily, since it has to be bound to the running event loop
+        self._semaphore: Optional[Semaphore] = None
+        self._client = httpx.AsyncClient(
+            headers={'OCS-APIRequest': 'true', 'Accept': 'application/json'},
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+        )
+
+    async def aclose(self) -> None:
+        """Close all pooled connections."""
+        await self._client.aclose()
+
+    def _httpx_timeout(self) -> httpx.Timeout:
+        """`AsyncNotesApi.timeout` in the format expected by httpx."""
+        if isinstance(self.timeout, tuple):
+            connect, read = self.timeout
+            return httpx.Timeout(read, connect=connect)
+        return httpx.Timeout(self.timeout)
+
+    async def _request(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        """Send a request to `path` on `AsyncNotesApi.hostname`.
+
+        Waits for a free slot first, if `AsyncNotesApi.max_concurrency` is set.
+        Failed requests are retried according to `AsyncNotesApi.retry`.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Absolute path of the endpoint.
+            kwargs (Any): Passed on to `httpx.AsyncClient.request`.
+
+        Returns:
+            httpx.Response: The servers response.
+        """
+        started = monotonic()
+        retry = 0
+        while True:
+            try:
+                response = await self._send(method, path, retry, **kwargs)
+            except httpx.TransportError as e:
+                delay = self._retry_delay(
+                    method,
+                    retry,
+                    started,
+                    connect_error=isinstance(
+                        e, (httpx.ConnectError, httpx.ConnectTimeout)
+                    ),
+                )
+                if delay is None:
+                    raise
+            else:
+                delay = self._retry_delay(
+                    method,
+                    retry,
+                    started,
+                    response.status_code,
+                    response.headers.get('Retry-After'),
+                )
+                if delay is None:
+                    return response
+            # Backoff happens outside of the semaphore, to not block other requests
+            await sleep(delay)
+            retry += 1
+
+    async def _send(
+        self, method: str, path: str, retry: int, **kwargs: Any
+    ) -> httpx.Response:
+        """Send a single attempt of a request, see `AsyncNotesApi._request`."""
+        queued = perf_counter()
+        if self.max_concurrency is not None:
+            if self._semaphore is None:
+                self._semaphore = Semaphore(self.max_concurrency)
+            await self._semaphore.acquire()
+
+        started = perf_counter()
+        try:
+            response = await self._client.request(
+                method,
+                f'{self._base_url}{path}',
+                auth=self.auth_pair,
+                timeout=self._httpx_timeout(),
+                **kwargs,
+            )
+        except Exception as e:
+            if self.hooks:
+                self._emit_request(
+                    RequestEvent(
+                        method,
+                        path,
+                        None,
+                        0,
+                        0,
+                        perf_counter() - started,
+                        limiter_wait=started - queued,
+                        retry=retry,
+                        error=e,
+                    )
+                )
+            raise
+        finally:
+            if self._semaphore is not None:
+                self._semaphore.release()
+
+        if self.hooks:
+            self._emit_request(
+                RequestEvent(
+                    method,
+                    path,
+                    response.status_code,
+                    len(response.request.content),
+                    len(response.content),
+                    perf_counter() - started,
+                    limiter_wait=started - queued,
+                    retry=retry,
+                )
+            )
+        return response
+
+    @staticmethod
+    def _form_data(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Drop unset fields, like requests does for form data."""
+        return {key: val for key, val in data.items() if val is not None}
+
+    async def capabilities(self, *, refresh: bool = False) -> Capabilities:
+        """See `NotesApi.capabilities`."""
+        capabilities = None if refresh else self._cached_capabilities()
+        if capabilities is not None:
+            return capabilities
+
+        response = await self._request('GET', _CAPABILITIES_PATH)
+        return self._capabilities_from_response(response.status_code, response.content)
+
+    async def get_api_version(self) -> str:
+        """See `NotesApi.get_api_version`."""
+        return (await self.capabilities()).api_version
+
+    async def get_all_notes(self) -> Union[Iterator[Note], Sequence[Note]]:
+        """See `NotesApi.get_all_notes`."""
+        cached = self._etag_entry()
+        response = await self._request(
+            'GET', _NOTES_PATH, headers=self._etag_headers(cached)
+        )
+
+        notes = self._notes_from_response(
+            response.status_code, response.headers, response.content, cached
+        )
+        # A list of its own, the snapshot stays shared with the ETag cache
+        return list(notes) if isinstance(notes, NoteSnapshot) else notes
+
+    async def get_single_note(self, note_id: int) -> Note:
+        """See `NotesApi.get_single_note`."""
+        cached = self._cached_note(note_id)
+        headers = {'If-None-Match': cached.etag} if cached else {}
+
+        response = await self._request(
+            'GET', f'{_NOTES_PATH}/{note_id}', headers=headers
+        )
+
+        return self._note_from_response(
+            note_id, cached, response.status_code, response.headers, response.content
+        )
+
+    async def create_note(self, note: Note) -> Note:
+        """See `NotesApi.create_note`."""
+        response = await self._request(
+            'POST', _NOTES_PATH, data=self._form_data(note.to_dict())
+        )
+
+        self._raise_for_status(response.status_code, note=note)
+
+        return self._saved_note(_NOTES_PATH, response.content)
+
+    async def update_note(self, note: Note, *, if_match: bool = False) -> Note:
+        """See `NotesApi.update_note`."""
+        data = self._form_data(self._update_data(note))
+        headers = self._update_headers(note, if_match)
+
+        self._invalidate_note(note.id)
+        response = await self._request(
+            'PUT', f'{_NOTES_PATH}/{note.id}', data=data, headers=headers
+        )
+
+        self._raise_for_status(response.status_code, note_id=note.id, note=note)
+
+        return self._saved_note(f'{_NOTES_PATH}/{note.id}', response.content)
+
+    async def delete_note(self, note_id: int):
+        """See `NotesApi.delete_note`."""
+        self._invalidate_note(note_id)
+        response = await self._request('DELETE', f'{_NOTES_PATH}/{note_id}')
+
+        self._raise_for_status(response.status_code, note_id=note_id)
+        self._note_deleted(note_id)
+
+    async def __aenter__(self) -> AsyncNotesApi:
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        await self.aclose()
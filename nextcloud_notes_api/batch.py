@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from queue import Queue
+from threading import BoundedSemaphore, Lock, Thread
+from typing import Callable, Iterable, Iterator, List, Optional, TypeVar, Union
+
+from requests import RequestException
+
+from .api_exceptions import NotesApiError
+from .note import Note
+
+T = TypeVar('T', Note, int)
+
+_BATCH_ERRORS = (NotesApiError, RequestException, ValueError)
+"""Exceptions that are recorded in `BatchItem.error` instead of aborting a batch."""
+
+
+@dataclass
+class BatchItem:
+    """Outcome of a single operation of a batch."""
+
+    item: Union[Note, int]
+    """`Union[Note, int]`: The note or note ID that has been passed in."""
+    result: Optional[Note] = None
+    """`Note`: Note returned by the server, None for deletions and failures."""
+    error: Optional[Exception] = None
+    """`Exception`: Why the operation failed, None on success."""
+
+    @property
+    def ok(self) -> bool:
+        """`bool`: Whether the operation succeeded."""
+        return self.error is None
+
+
+class BatchResult:
+    """Streams `BatchItem`s in the order their operations complete.
+
+    The batch runs in the background from the moment it has been started,
+    whether or not the result is iterated. `BatchResult.wait` blocks until it is
+    complete. Items already seen are kept in `BatchResult.items`.
+    """
+
+    def __init__(self, done: Queue[Union[BatchItem, Exception, None]]):
+        self._done = done
+        self._finished = False
+        self._lock = Lock()
+        self.items: List[BatchItem] = []
+        """`List[BatchItem]`: All items completed so far."""
+
+    def wait(self) -> BatchResult:
+        """Wait for the remaining operations.
+
+        Returns:
+            BatchResult: This result.
+        """
+        for _ in self:
+            pass
+        return self
+
+    @property
+    def succeeded(self) -> List[BatchItem]:
+        """`List[BatchItem]`: Successful items, waits for the batch to finish."""
+        return [item for item in self.wait().items if item.ok]
+
+    @property
+    def failed(self) -> List[BatchItem]:
+        """`List[BatchItem]`: Failed items, waits for the batch to finish."""
+        return [item for item in self.wait().items if not item.ok]
+
+    def __iter__(self) -> Iterator[BatchItem]:
+        index = 0
+        while True:
+            with self._lock:
+                if index < len(self.items):
+                    item = self.items[index]
+                elif self._finished:
+                    return
+                else:
+                    done = self._done.get()
+                    if done is None or isinstance(done, Exception):
+                        self._finished = True
+                        if done is None:
+                            return
+                        raise done
+                    item = done
+                    self.items.append(item)
+            index += 1
+            yield item
+
+    def __repr__(self) -> str:
+        return f'<BatchResult [{len(self.items)} done]>'
+
+
+def run_batch(
+    operation: Callable[[T], Optional[Note]], items: Iterable[T], max_workers: int
+) -> BatchResult:
+    """Apply `operation` to every item of `items` on a pool of `max_workers` threads.
+
+    The batch starts right away in a background thread. At most `max_workers`
+    items are pulled from `items` ahead of time, so `items` may be a lazy iterator
+    of any length.
+
+    Args:
+        operation (Callable[[T], Optional[Note]]): Operation to apply.
+        items (Iterable[T]): Notes or note IDs.
+        max_workers (int): Maximum number of concurrent operations.
+
+    Returns:
+        BatchResult: Outcome of every operation.
+    """
+    if max_workers < 1:
+        raise ValueError(f'max_workers has to be at least 1, got {max_workers}')
+
+    done: Queue[Union[BatchItem, Exception, None]] = Queue()
+    slots = BoundedSemaphore(max_workers)
+
+    def run(item: T) -> None:
+        try:
+            done.put(BatchItem(item, operation(item)))
+        except _BATCH_ERRORS as e:
+            done.put(BatchItem(item, error=e))
+        except Exception as e:
+            done.put(e)
+        finally:
+            slots.release()
+
+    def feed() -> None:
+        try:
+            with ThreadPoolExecutor(max_workers) as executor:
+                for item in items:
+                    slots.acquire()
+                    executor.submit(run, item)
+        except Exception as e:
+            done.put(e)
+        finally:
+            done.put(None)
+
+    Thread(target=feed, name='notes-batch').start()
+    return BatchResult(done)
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from copy import copy
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Generic, Optional, Sequence, TypeVar, Union
+
+from .capabilities import Capabilities
+from .note import Note
+from .snapshot import NoteSnapshot
+
+T = TypeVar('T')
+
+
+@dataclass
+class CacheEntry(Generic[T]):
+    """A cached value along with its HTTP ETag."""
+
+    etag: str
+    """`str`: ETag the server sent along with `CacheEntry.value`."""
+    value: T
+    """The cached note or list of notes."""
+    synced: datetime = field(default_factory=datetime.now)
+    """`datetime.datetime`: When `CacheEntry.value` has been fetched."""
+
+
+def _note_to_json(note: Note) -> Dict[str, Any]:
+    """`Note.to_dict` including `Note.etag`."""
+    return {**note.to_dict(), 'etag': note.etag}
+
+
+class NoteCache(ABC):
+    """Storage backend for notes and their ETags.
+
+    Pass an instance as `cache` to `NotesApi` to keep cached notes across `NotesApi`
+    instances. Cached notes are revalidated with the server before being used.
+    """
+
+    @abstractmethod
+    def get_notes(self) -> Optional[CacheEntry[Sequence[Note]]]:
+        """
+        Returns:
+            Optional[CacheEntry[Sequence[Note]]]: The cached list of all notes.
+        """
+
+    @abstractmethod
+    def set_notes(self, entry: CacheEntry[Sequence[Note]]) -> None:
+        """Replace the cached list of all notes.
+
+        Args:
+            entry (CacheEntry[Sequence[Note]]): List of all notes.
+        """
+
+    @abstractmethod
+    def get_note(self, note_id: int) -> Optional[CacheEntry[Note]]:
+        """
+        Args:
+            note_id (int): ID of the cached note.
+
+        Returns:
+            Optional[CacheEntry[Note]]: The cached note with ID `note_id`.
+        """
+
+    @abstractmethod
+    def set_note(self, entry: CacheEntry[Note]) -> None:
+        """Cache a single note.
+
+        Args:
+            entry (CacheEntry[Note]): Note to cache.
+        """
+
+    @abstractmethod
+    def delete_note(self, note_id: int) -> None:
+        """Drop the cached note with ID `note_id`, if present.
+
+        Args:
+            note_id (int): ID of the note to drop.
+        """
+
+    def get_capabilities(self) -> Optional[Capabilities]:
+        """Not persisted by default, override along with
+        `NoteCache.set_capabilities` to keep them across `NotesApi` instances.
+
+        Returns:
+            Optional[Capabilities]: The cached server capabilities.
+        """
+        return None
+
+    def set_capabilities(self, capabilities: Capabilities) -> None:
+        """Replace the cached server capabilities.
+
+        Args:
+            capabilities (Capabilities): Capabilities to cache.
+        """
+
+
+class MemoryNoteCache(NoteCache):
+    """In-memory `NoteCache` that keeps the `maxsize` most recently used notes.
+
+    Notes are copied when stored and retrieved, so callers can't alter cached notes.
+    The list of all notes is kept as a `NoteSnapshot`.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        """
+        Args:
+            maxsize (int, optional): Maximum number of single notes to keep. The
+                list of all notes doesn't count towards it. Defaults to 128.
+        """
+        self.maxsize = maxsize
+        """`int`: Maximum number of single notes to keep."""
+
+        self._lock = Lock()
+        self._notes: Optional[CacheEntry[Sequence[Note]]] = None
+        self._note_entries: OrderedDict[int, CacheEntry[Note]] = OrderedDict()
+        self._capabilities: Optional[Capabilities] = None
+
+    def get_notes(self) -> Optional[CacheEntry[Sequence[Note]]]:
+        return self._notes
+
+    def set_notes(self, entry: CacheEntry[Sequence[Note]]) -> None:
+        # Snapshots are immutable, so they can be stored without copying
+        self._notes = CacheEntry(
+            entry.etag, NoteSnapshot.from_notes(entry.value), entry.synced
+        )
+
+    def get_note(self, note_id: int) -> Optional[CacheEntry[Note]]:
+        with self._lock:
+            entry = self._note_entries.get(note_id)
+            if entry is None:
+                return None
+            self._note_entries.move_to_end(note_id)
+
+        return CacheEntry(entry.etag, copy(entry.value), entry.synced)
+
+    def set_note(self, entry: CacheEntry[Note]) -> None:
+        if self.maxsize < 1:
+            return
+
+        with self._lock:
+            self._note_entries[entry.value.id] = CacheEntry(
+                entry.etag, copy(entry.value), entry.synced
+            )
+            self._note_entries.move_to_end(entry.value.id)
+            while len(self._note_entries) > self.maxsize:
+                self._note_entries.popitem(last=False)
+
+    def delete_note(self, note_id: int) -> None:
+        with self._lock:
+            self._note_entries.pop(note_id, None)
+
+    def get_capabilities(self) -> Optional[Capabilities]:
+        return self._capabilities
+
+    def set_capabilities(self, capabilities: Capabilities) -> None:
+        # Capabilities are frozen, so they can be stored without copying
+        self._capabilities = capabilities
+
+    def __len__(self) -> int:
+        return len(self._note_entries)
+
+    def __repr__(self) -> str:
+        return f'<MemoryNoteCache [{len(self)}/{self.maxsize}]>'
+
+
+class SqliteNoteCache(NoteCache):
+    """`NoteCache` backed by an SQLite database file."""
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Args:
+            path (Union[str, Path]): Database file, created if it doesn't exist.
+        """
+        self.path = path
+        """`Union[str, Path]`: Database file."""
+
+        self._lock = Lock()
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS note_list '
+                '(key INTEGER PRIMARY KEY CHECK (key = 0), etag TEXT, synced REAL, '
+                'notes TEXT)'
+            )
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS notes '
+                '(id INTEGER PRIMARY KEY, etag TEXT, synced REAL, note TEXT)'
+            )
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS capabilities '
+                '(key INTEGER PRIMARY KEY CHECK (key = 0), capabilities TEXT)'
+            )
+
+    def get_notes(self) -> Optional[CacheEntry[Sequence[Note]]]:
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT etag, synced, notes FROM note_list'
+            ).fetchone()
+
+        if row is None:
+            return None
+        etag, synced, notes = row
+        return CacheEntry(
+            etag,
+            [Note.from_dict(note_dict) for note_dict in json.loads(notes)],
+            datetime.fromtimestamp(synced),
+        )
+
+    def set_notes(self, entry: CacheEntry[Sequence[Note]]) -> None:
+        notes = json.dumps([_note_to_json(note) for note in entry.value])
+        with self._lock, self._connection:
+            self._connection.execute(
+                'REPLACE INTO note_list VALUES (0, ?, ?, ?)',
+                (entry.etag, entry.synced.timestamp(), notes),
+            )
+
+    def get_note(self, note_id: int) -> Optional[CacheEntry[Note]]:
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT etag, synced, note FROM notes WHERE id = ?', (note_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+        etag, synced, note = row
+        return CacheEntry(
+            etag, Note.from_dict(json.loads(note)), datetime.fromtimestamp(synced)
+        )
+
+    def set_note(self, entry: CacheEntry[Note]) -> None:
+        note = json.dumps(_note_to_json(entry.value))
+        with self._lock, self._connection:
+            self._connection.execute(
+                'REPLACE INTO notes VALUES (?, ?, ?, ?)',
+                (entry.value.id, entry.etag, entry.synced.timestamp(), note),
+            )
+
+    def delete_note(self, note_id: int) -> None:
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM notes WHERE id = ?', (note_id,))
+
+    def get_capabilities(self) -> Optional[Capabilities]:
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT capabilities FROM capabilities'
+            ).fetchone()
+
+        if row is None:
+            return None
+        return Capabilities.from_dict(json.loads(row[0]))
+
+    def set_capabilities(self, capabilities: Capabilities) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                'REPLACE INTO capabilities VALUES (0, ?)',
+                (json.dumps(capabilities.to_dict()),),
+            )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._connection.close()
+
+    def __repr__(self) -> str:
+        return f'<SqliteNoteCache [{self.path}]>'
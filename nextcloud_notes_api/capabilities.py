@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Tuple
+
+_FEATURES = {
+    'exclude': (1, 0),
+    'prune_before': (1, 0),
+    'chunking': (1, 2),
+    'if_match': (1, 3),
+}
+"""Optional API features by the first Notes API version supporting them."""
+
+
+def _parse_version(version: str) -> Tuple[int, ...]:
+    """'1.2' -> (1, 2), unparseable parts count as 0."""
+    return tuple(int(part) if part.isdigit() else 0 for part in version.split('.'))
+
+
+@dataclass(frozen=True)
+class Capabilities:
+    """Notes app capabilities of a Nextcloud server."""
+
+    api_versions: Tuple[str, ...]
+    """`Tuple[str, ...]`: Supported Notes API versions."""
+    version: Optional[str] = None
+    """`str`: Version of the Notes app."""
+    fetched: datetime = field(default_factory=datetime.now)
+    """`datetime.datetime`: When the capabilities have been fetched."""
+
+    @classmethod
+    def from_response(cls, data: Mapping[str, Any]) -> Capabilities:
+        """Create capabilities from a response of the capabilities endpoint.
+
+        Args:
+            data (Mapping[str, Any]): Decoded response body.
+
+        Returns:
+            Capabilities: The server's capabilities.
+        """
+        notes = data['ocs']['data']['capabilities']['notes']
+        return cls(tuple(notes['api_version']), notes.get('version'))
+
+    @classmethod
+    def from_dict(cls, capabilities_dict: Mapping[str, Any]) -> Capabilities:
+        """Create capabilities from a `dict`, see `Capabilities.to_dict`.
+
+        Args:
+            capabilities_dict (Mapping[str, Any]): Capabilities attributes.
+
+        Returns:
+            Capabilities: The restored capabilities.
+        """
+        return cls(
+            tuple(capabilities_dict['api_versions']),
+            capabilities_dict.get('version'),
+            datetime.fromtimestamp(capabilities_dict['fetched']),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: JSON serializable attributes, `Capabilities.fetched` as
+                posix timestamp.
+        """
+        return {
+            'api_versions': list(self.api_versions),
+            'version': self.version,
+            'fetched': self.fetched.timestamp(),
+        }
+
+    @property
+    def api_version(self) -> Optional[str]:
+        """`str`: Highest supported Notes API version."""
+        return max(self.api_versions, key=_parse_version, default=None)
+
+    def supports(self, api_version: str) -> bool:
+        """Whether the server supports Notes API `api_version` or a later minor
+        version of it.
+
+        Args:
+            api_version (str): API version, e.g. '1.2'.
+
+        Returns:
+            bool: Whether the version is supported.
+        """
+        wanted = _parse_version(api_version)
+        return any(
+            parsed[0] == wanted[0] and parsed >= wanted
+            for parsed in map(_parse_version, self.api_versions)
+        )
+
+    @property
+    def features(self) -> FrozenSet[str]:
+        """`FrozenSet[str]`: Supported optional features, out of 'exclude',
+        'prune_before', 'chunking' and 'if_match'."""
+        return frozenset(
+            feature
+            for feature, version in _FEATURES.items()
+            if self.supports('.'.join(map(str, version)))
+        )
+
+    def is_stale(self, ttl: Optional[float]) -> bool:
+        """Whether the capabilities are older than `ttl` seconds.
+
+        Args:
+            ttl (float, optional): Maximum age in seconds, None to never expire.
+
+        Returns:
+            bool: Whether they should be fetched again.
+        """
+        if ttl is None:
+            return False
+        return (datetime.now() - self.fetched).total_seconds() > ttl
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+from array import array
+from datetime import datetime
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Union,
+    overload,
+)
+
+from .note import Note
+from .snapshot import NoteSnapshot
+
+_SORT_KEYS = ('id', 'title', 'category', 'favorite', 'modified')
+
+
+class NoteCollection(Sequence[Note]):
+    """Column oriented, immutable sequence of notes.
+
+    IDs, favorite flags, modification times and categories are stored as packed
+    `array.array` columns, titles and contents as separate lists. Filtering,
+    sorting and grouping scan these columns and return new collections, `Note`
+    objects are only created when accessed.
+
+    Unset IDs and modification times are stored as 0, unset favorite flags as
+    False.
+    """
+
+    __slots__ = (
+        '_ids',
+        '_favorites',
+        '_modified',
+        '_category_codes',
+        '_categories',
+        '_titles',
+        '_contents',
+        '_etags',
+    )
+
+    def __init__(self, note_dicts: Iterable[Mapping[str, Any]] = ()):
+        """
+        Args:
+            note_dicts (Iterable[Mapping[str, Any]], optional): Notes as returned by
+                the API, see `Note.to_dict`. Defaults to ().
+        """
+        self._ids = array('q')
+        self._favorites = array('b')
+        self._modified = array('d')
+        self._category_codes = array('l')
+        self._categories: List[Optional[str]] = []
+        self._titles: List[Optional[str]] = []
+        self._contents: List[Optional[str]] = []
+        self._etags: List[Optional[str]] = []
+
+        codes: Dict[Optional[str], int] = {}
+        for note_dict in note_dicts:
+            category = note_dict.get('category')
+            code = codes.get(category)
+            if code is None:
+                code = codes[category] = len(self._categories)
+                self._categories.append(category)
+
+            self._ids.append(note_dict.get('id') or 0)
+            self._favorites.append(bool(note_dict.get('favorite')))
+            self._modified.append(note_dict.get('modified') or 0)
+            self._category_codes.append(code)
+            self._titles.append(note_dict.get('title'))
+            self._contents.append(note_dict.get('content'))
+            self._etags.append(note_dict.get('etag'))
+
+    @classmethod
+    def from_notes(cls, notes: Iterable[Note]) -> NoteCollection:
+        """Create a collection of `notes`.
+
+        Content that hasn't been loaded yet, see `Note.content_loaded`, stays unset.
+
+        Args:
+            notes (Iterable[Note]): Notes to collect.
+
+        Returns:
+            NoteCollection: Collection of `notes`.
+        """
+        if isinstance(notes, NoteCollection):
+            return notes
+        if isinstance(notes, NoteSnapshot):
+            return cls(notes.to_dicts())
+        return cls(
+            {
+                **note.to_dict(),
+                'content': note.content if note.content_loaded else None,
+                'etag': note.etag,
+            }
+            for note in notes
+        )
+
+    @property
+    def ids(self) -> array:
+        """`array.array`: Note IDs."""
+        return self._ids
+
+    @property
+    def titles(self) -> Sequence[Optional[str]]:
+        """`Sequence[str]`: Note titles."""
+        return tuple(self._titles)
+
+    @property
+    def categories(self) -> Sequence[Optional[str]]:
+        """`Sequence[str]`: Note categories."""
+        return tuple(self._categories[code] for code in self._category_codes)
+
+    @property
+    def favorites(self) -> array:
+        """`array.array`: Favorite flags as 0 or 1."""
+        return self._favorites
+
+    @property
+    def modified(self) -> array:
+        """`array.array`: Modification times as posix timestamps."""
+        return self._modified
+
+    def _take(self, indices: Iterable[int]) -> NoteCollection:
+        """New collection of the notes at `indices`, in that order."""
+        indices = list(indices)
+        collection = NoteCollection()
+        collection._ids = array('q', [self._ids[i] for i in indices])
+        collection._favorites = array('b', [self._favorites[i] for i in indices])
+        collection._modified = array('d', [self._modified[i] for i in indices])
+        collection._category_codes = array(
+            'l', [self._category_codes[i] for i in indices]
+        )
+        # Category codes stay valid, since the category table is shared
+        collection._categories = self._categories
+        collection._titles = [self._titles[i] for i in indices]
+        collection._contents = [self._contents[i] for i in indices]
+        collection._etags = [self._etags[i] for i in indices]
+        return collection
+
+    def filter(
+        self,
+        *,
+        category: Optional[str] = None,
+        favorite: Optional[bool] = None,
+        modified_after: Optional[Union[datetime, float]] = None,
+        modified_before: Optional[Union[datetime, float]] = None,
+        title: Optional[Callable[[Optional[str]], bool]] = None,
+    ) -> NoteCollection:
+        """Notes matching all given conditions.
+
+        Args:
+            category (str, optional): Only notes in this category. Defaults to None.
+            favorite (bool, optional): Only (non) favorite notes. Defaults to None.
+            modified_after (Union[datetime, float], optional): Only notes modified
+                at or after this time. Defaults to None.
+            modified_before (Union[datetime, float], optional): Only notes modified
+                before this time. Defaults to None.
+            title (Callable[[Optional[str]], bool], optional): Only notes whose
+                title this returns True for. Defaults to None.
+
+        Returns:
+            NoteCollection: Matching notes, in their current order.
+        """
+        indices: Sequence[int] = range(len(self))
+
+        if category is not None:
+            if category not in self._categories:
+                return self._take(())
+            code = self._categories.index(category)
+            codes = self._category_codes
+            indices = [i for i in indices if codes[i] == code]
+        if favorite is not None:
+            favorites = self._favorites
+            indices = [i for i in indices if favorites[i] == favorite]
+        if modified_after is not None:
+            if isinstance(modified_after, datetime):
+                modified_after = modified_after.timestamp()
+            modified = self._modified
+            indices = [i for i in indices if modified[i] >= modified_after]
+        if modified_before is not None:
+            if isinstance(modified_before, datetime):
+                modified_before = modified_before.timestamp()
+            modified = self._modified
+            indices = [i for i in indices if modified[i] < modified_before]
+        if title is not None:
+            titles = self._titles
+            indices = [i for i in indices if title(titles[i])]
+
+        return self._take(indices)
+
+    def sort(self, by: str = 'modified', *, reverse: bool = False) -> NoteCollection:
+        """Notes sorted by the column `by`.
+
+        Args:
+            by (str, optional): One of 'id', 'title', 'category', 'favorite' and
+                'modified'. Defaults to 'modified'.
+            reverse (bool, optional): Sort in descending order. Defaults to False.
+
+        Returns:
+            NoteCollection: Sorted notes.
+
+        Raises:
+            ValueError: `by` isn't a sortable column.
+        """
+        if by not in _SORT_KEYS:
+            raise ValueError(f'Can\'t sort by {by}, expected one of {_SORT_KEYS}')
+
+        column: Sequence[Any]
+        if by == 'id':
+            column = self._ids
+        elif by == 'title':
+            column = [title or '' for title in self._titles]
+        elif by == 'category':
+            # Sort the category table once instead of comparing strings per note
+            ranks = {
+                code: rank
+                for rank, code in enumerate(
+                    sorted(
+                        range(len(self._categories)),
+                        key=lambda code: self._categories[code] or '',
+                    )
+                )
+            }
+            column = [ranks[code] for code in self._category_codes]
+        elif by == 'favorite':
+            column = self._favorites
+        else:
+            column = self._modified
+
+        return self._take(
+            sorted(range(len(self)), key=column.__getitem__, reverse=reverse)
+        )
+
+    def group_by_category(self) -> Dict[Optional[str], NoteCollection]:
+        """
+        Returns:
+            Dict[Optional[str], NoteCollection]: Notes by category.
+        """
+        groups: Dict[int, List[int]] = {}
+        for i, code in enumerate(self._category_codes):
+            groups.setdefault(code, []).append(i)
+
+        return {
+            self._categories[code]: self._take(indices)
+            for code, indices in groups.items()
+        }
+
+    def _note(self, index: int) -> Note:
+        modified = self._modified[index]
+        return Note(
+            self._titles[index],
+            self._contents[index],
+            category=self._categories[self._category_codes[index]],
+            favorite=bool(self._favorites[index]),
+            id=self._ids[index] or None,
+            modified=modified or None,
+            etag=self._etags[index],
+        )
+
+    @overload
+    def __getitem__(self, index: int) -> Note:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> NoteCollection:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Note, NoteCollection]:
+        if isinstance(index, slice):
+            return self._take(range(len(self))[index])
+        return self._note(range(len(self))[index])
+
+    def __iter__(self) -> Iterator[Note]:
+        return map(self._note, range(len(self)))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __repr__(self) -> str:
+        return f'<NoteCollection [{len(self)} notes]>'
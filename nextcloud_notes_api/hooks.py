@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+from math import ceil, log
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+_NOTE_ID = re.compile(r'/\d+')
+
+
+def endpoint(path: str) -> str:
+    """`path` with note IDs replaced by `{id}`, to group requests by endpoint.
+
+    Args:
+        path (str): Absolute path of a request.
+
+    Returns:
+        str: Endpoint of `path`, e.g. `/index.php/apps/notes/api/v1/notes/{id}`.
+    """
+    return _NOTE_ID.sub('/{id}', path)
+
+
+@dataclass
+class RequestEvent:
+    """A single attempt of an HTTP request, retries emit an event each."""
+
+    method: str
+    """`str`: HTTP method."""
+    path: str
+    """`str`: Absolute path of the request."""
+    status_code: Optional[int]
+    """`int`: Response status, None if the request failed without a response."""
+    request_bytes: int
+    """`int`: Size of the request body."""
+    response_bytes: int
+    """`int`: Size of the response body."""
+    duration: float
+    """`float`: Seconds from sending the request until the body has been read,
+    excluding `RequestEvent.limiter_wait`."""
+    response_time: Optional[float] = None
+    """`float`: Seconds until the response headers have been parsed, covering
+    connecting and server time. None if the client doesn't report it."""
+    limiter_wait: float = 0.0
+    """`float`: Seconds waited for the limiter or concurrency limit."""
+    retry: int = 0
+    """`int`: Number of retries before this attempt."""
+    error: Optional[BaseException] = None
+    """`BaseException`: Why the request failed without a response."""
+
+    @property
+    def endpoint(self) -> str:
+        """`str`: `RequestEvent.path` with note IDs replaced by `{id}`."""
+        return endpoint(self.path)
+
+    @property
+    def download_time(self) -> Optional[float]:
+        """`float`: Seconds spent reading the response body, if known."""
+        if self.response_time is None:
+            return None
+        return max(0.0, self.duration - self.response_time)
+
+
+@dataclass
+class CacheEvent:
+    """A lookup in the ETag cache, which is a hit if the server confirmed it."""
+
+    cache: str
+    """`str`: 'notes' for the note list, 'note' for single notes."""
+    hit: bool
+    """`bool`: Whether the cached value has been used."""
+
+
+@dataclass
+class DecodeEvent:
+    """Decoding of a response body into notes."""
+
+    endpoint: str
+    """`str`: Endpoint of the response, see `RequestEvent.endpoint`."""
+    notes: int
+    """`int`: Number of decoded notes."""
+    parse_time: float
+    """`float`: Seconds spent parsing JSON."""
+    build_time: float
+    """`float`: Seconds spent creating `Note`s, 0 if they are created lazily."""
+
+
+class NotesApiHooks:
+    """Receives events from `NotesApi` and `AsyncNotesApi`, pass instances as
+    `hooks`.
+
+    All methods do nothing by default, override the ones you need. Hooks are
+    called synchronously, possibly from several threads at once, so they should be
+    fast and thread safe, and must not raise.
+    """
+
+    def on_request(self, event: RequestEvent) -> None:
+        """Called after every request attempt.
+
+        Args:
+            event (RequestEvent): The request.
+        """
+
+    def on_cache(self, event: CacheEvent) -> None:
+        """Called whenever the ETag cache has been revalidated.
+
+        Args:
+            event (CacheEvent): The lookup.
+        """
+
+    def on_decode(self, event: DecodeEvent) -> None:
+        """Called after a response has been turned into notes.
+
+        Args:
+            event (DecodeEvent): The decoding.
+        """
+
+
+class Histogram:
+    """Histogram with logarithmic buckets, for percentiles in constant memory.
+
+    Percentiles are accurate to `Histogram.precision`, relative to the value.
+    """
+
+    def __init__(self, precision: float = 0.02, minimum: float = 1e-6):
+        """
+        Args:
+            precision (float, optional): Relative width of a bucket. Defaults to
+                0.02.
+            minimum (float, optional): Values at or below this share the first
+                bucket. Defaults to 1e-6.
+        """
+        self.precision = precision
+        """`float`: Relative width of a bucket."""
+        self.minimum = minimum
+        """`float`: Values at or below this share the first bucket."""
+        self.count = 0
+        """`int`: Number of recorded values."""
+        self.total = 0.0
+        """`float`: Sum of all recorded values."""
+        self.max = 0.0
+        """`float`: Largest recorded value."""
+
+        self._log_growth = log(1 + precision)
+        self._buckets: Counter = Counter()
+
+    def record(self, value: float) -> None:
+        """Add `value` to the histogram.
+
+        Args:
+            value (float): Value to record, e.g. seconds.
+        """
+        bucket = 0
+        if value > self.minimum:
+            bucket = ceil(log(value / self.minimum) / self._log_growth)
+        self._buckets[bucket] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        """`float`: Average of all recorded values."""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """Value below which `percent` percent of the recorded values fall.
+
+        Args:
+            percent (float): Percentile between 0 and 100.
+
+        Returns:
+            float: Upper bound of the bucket containing the percentile, 0 if
+                nothing has been recorded.
+        """
+        if not self.count:
+            return 0.0
+
+        rank = percent / 100 * self.count
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                return min(self.max, self.minimum * (1 + self.precision) ** bucket)
+        return self.max  # pragma: no cover, only reached through rounding
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Returns:
+            Dict[str, float]: Count, mean, max and the 50th, 90th, 99th
+                percentiles.
+        """
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+class MetricsCollector(NotesApiHooks):
+    """Built-in hooks that aggregate latencies, sizes and cache hits in memory.
+
+    Request latencies are grouped by method and endpoint, see
+    `MetricsCollector.summary` for a machine readable report.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        """`Dict[Tuple[str, str], Histogram]`: Request durations in seconds by
+        method and endpoint."""
+        self.response_time: Dict[Tuple[str, str], Histogram] = {}
+        """`Dict[Tuple[str, str], Histogram]`: Seconds until the response headers
+        arrived, by method and endpoint."""
+        self.statuses: Counter = Counter()
+        """`Counter`: Responses by status code, None for failed requests."""
+        self.bytes_sent = 0
+        """`int`: Size of all request bodies."""
+        self.bytes_received = 0
+        """`int`: Size of all response bodies."""
+        self.retries = 0
+        """`int`: Number of retried request attempts."""
+        self.limiter_wait = Histogram()
+        """`Histogram`: Seconds waited for the limiter per request."""
+        self.cache_hits: Counter = Counter()
+        """`Counter`: ETag cache hits by cache."""
+        self.cache_misses: Counter = Counter()
+        """`Counter`: ETag cache misses by cache."""
+        self.parse_time = Histogram()
+        """`Histogram`: Seconds spent parsing JSON per response."""
+        self.build_time = Histogram()
+        """`Histogram`: Seconds spent creating notes per response."""
+
+    def on_request(self, event: RequestEvent) -> None:
+        key = (event.method, event.endpoint)
+        with self._lock:
+            self.latency.setdefault(key, Histogram()).record(event.duration)
+            if event.response_time is not None:
+                self.response_time.setdefault(key, Histogram()).record(
+                    event.response_time
+                )
+            self.statuses[event.status_code] += 1
+            self.bytes_sent += event.request_bytes
+            self.bytes_received += event.response_bytes
+            self.retries += event.retry > 0
+            self.limiter_wait.record(event.limiter_wait)
+
+    def on_cache(self, event: CacheEvent) -> None:
+        with self._lock:
+            if event.hit:
+                self.cache_hits[event.cache] += 1
+            else:
+                self.cache_misses[event.cache] += 1
+
+    def on_decode(self, event: DecodeEvent) -> None:
+        with self._lock:
+            self.parse_time.record(event.parse_time)
+            self.build_time.record(event.build_time)
+
+    def hit_ratio(self, cache: Optional[str] = None) -> float:
+        """Share of ETag cache lookups that were hits.
+
+        Args:
+            cache (str, optional): 'notes' or 'note', None for both. Defaults to
+                None.
+
+        Returns:
+            float: Hit ratio between 0 and 1, 0 without lookups.
+        """
+        with self._lock:
+            if cache is None:
+                hits = sum(self.cache_hits.values())
+                misses = sum(self.cache_misses.values())
+            else:
+                hits, misses = self.cache_hits[cache], self.cache_misses[cache]
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        """All metrics as JSON serializable `dict`.
+
+        Returns:
+            Dict[str, Any]: Latencies by '<method> <endpoint>', statuses, bytes,
+                retries, limiter waits, cache hits and decoding times.
+        """
+        with self._lock:
+            return {
+                'requests': {
+                    f'{method} {path}': histogram.summary()
+                    for (method, path), histogram in self.latency.items()
+                },
+                'response_time': {
+                    f'{method} {path}': histogram.summary()
+                    for (method, path), histogram in self.response_time.items()
+                },
+                'statuses': {str(code): n for code, n in self.statuses.items()},
+                'bytes_sent': self.bytes_sent,
+                'bytes_received': self.bytes_received,
+                'retries': self.retries,
+                'limiter_wait': self.limiter_wait.summary(),
+                'cache': {
+                    cache: {
+                        'hits': self.cache_hits[cache],
+                        'misses': self.cache_misses[cache],
+                    }
+                    for cache in sorted({*self.cache_hits, *self.cache_misses})
+                },
+                'parse_time': self.parse_time.summary(),
+                'build_time': self.build_time.summary(),
+            }
+
+    def reset(self) -> None:
+        """Drop all collected metrics."""
+        with self._lock:
+            self._clear()
+
+    def __repr__(self) -> str:
+        return f'<MetricsCollector [{sum(self.statuses.values())} requests]>'
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Lock
+from time import monotonic, sleep
+from typing import Any, ClassVar, Dict, Iterator, Optional
+
+
+class RequestLimiter:
+    """Token bucket rate limiter combined with a limit of requests in flight.
+
+    A limiter can be shared by any number of `NotesApi` instances and threads, use
+    `RequestLimiter.for_host` to share one per Nextcloud host. Time spent waiting
+    for the limiter is recorded in `RequestLimiter.total_wait` and
+    `RequestLimiter.max_wait`.
+    """
+
+    _shared: ClassVar[Dict[str, RequestLimiter]] = {}
+    _shared_lock: ClassVar[Lock] = Lock()
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        *,
+        burst: int = 1,
+        max_in_flight: Optional[int] = None,
+    ):
+        """
+        Args:
+            rate (float, optional): Maximum sustained requests per second. Defaults
+                to None, meaning no rate limit.
+            burst (int, optional): Number of requests that may be sent at once after
+                being idle. Defaults to 1.
+            max_in_flight (int, optional): Maximum number of requests in flight at
+                once. Defaults to None, meaning no limit.
+
+        Raises:
+            ValueError: `rate`, `burst` or `max_in_flight` is out of range.
+        """
+        if rate is not None and rate <= 0:
+            raise ValueError(f'rate has to be positive, got {rate}')
+        if burst < 1:
+            raise ValueError(f'burst has to be at least 1, got {burst}')
+        if max_in_flight is not None and max_in_flight < 1:
+            raise ValueError(f'max_in_flight has to be at least 1, got {max_in_flight}')
+
+        self.rate = rate
+        """`float`: Maximum sustained requests per second."""
+        self.burst = burst
+        """`int`: Number of requests that may be sent at once after being idle."""
+        self.max_in_flight = max_in_flight
+        """`int`: Maximum number of requests in flight at once."""
+
+        self.requests = 0
+        """`int`: Number of requests let through so far."""
+        self.total_wait = 0.0
+        """`float`: Seconds all requests spent waiting for the limiter."""
+        self.max_wait = 0.0
+        """`float`: Longest time a single request waited, in seconds."""
+
+        self._lock = Lock()
+        self._tokens = float(burst)
+        self._updated = monotonic()
+        self._in_flight = 0
+        self._slots = BoundedSemaphore(max_in_flight) if max_in_flight else None
+
+    @classmethod
+    def for_host(cls, hostname: str, **kwargs: Any) -> RequestLimiter:
+        """The limiter shared by all requests to `hostname` in this process.
+
+        Args:
+            hostname (str): Nextcloud hostname.
+            kwargs (Any): Passed on to `RequestLimiter` when the limiter for
+                `hostname` is created, ignored afterwards.
+
+        Returns:
+            RequestLimiter: Limiter for `hostname`.
+        """
+        with cls._shared_lock:
+            limiter = cls._shared.get(hostname)
+            if limiter is None:
+                limiter = cls._shared[hostname] = cls(**kwargs)
+            return limiter
+
+    @property
+    def in_flight(self) -> int:
+        """`int`: Number of requests currently holding a slot."""
+        return self._in_flight
+
+    @property
+    def mean_wait(self) -> float:
+        """`float`: Average seconds a request waited for the limiter."""
+        return self.total_wait / self.requests if self.requests else 0.0
+
+    def _reserve(self) -> float:
+        """Take a token and return how long to wait until it is actually available.
+
+        Tokens may go negative, so waiting requests queue up in order without
+        holding the lock while sleeping.
+        """
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def acquire(self) -> float:
+        """Wait until a request may be sent, see `RequestLimiter.release`.
+
+        Returns:
+            float: Seconds waited.
+        """
+        started = monotonic()
+        if self._slots is not None:
+            self._slots.acquire()
+        if self.rate is not None:
+            delay = self._reserve()
+            if delay:
+                sleep(delay)
+        waited = monotonic() - started
+
+        with self._lock:
+            self._in_flight += 1
+            self.requests += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def release(self) -> None:
+        """Mark a request acquired with `RequestLimiter.acquire` as finished."""
+        with self._lock:
+            self._in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    @contextmanager
+    def slot(self) -> Iterator[float]:
+        """Context manager holding the limiter for the duration of a request.
+
+        Yields:
+            float: Seconds waited.
+        """
+        waited = self.acquire()
+        try:
+            yield waited
+        finally:
+            self.release()
+
+    def __repr__(self) -> str:
+        return (
+            f'<RequestLimiter [{self.rate}/s, {self.in_flight}/{self.max_in_flight} '
+            'in flight]>'
+        )
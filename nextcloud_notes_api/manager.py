@@ -0,0 +1,429 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from hashlib import sha1
+from pathlib import Path
+from queue import Empty, Queue
+from threading import Lock, Thread
+from time import perf_counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from .api_wrapper import NotesApi
+from .limits import RequestLimiter
+from .sync import NotesSync
+
+_PRIORITIES = ('staleness', 'changes')
+_CHANGE_RATE_WEIGHT = 0.5
+"""Weight of the latest sync in `AccountStatus.change_rate`."""
+
+
+@dataclass(frozen=True)
+class Account:
+    """Credentials of a Nextcloud account to sync."""
+
+    username: str
+    """`str`: Nextcloud username."""
+    password: str = field(repr=False)
+    """`str`: Nextcloud password."""
+    hostname: str
+    """`str`: Nextcloud hostname, see `NotesApi`."""
+
+    @property
+    def key(self) -> str:
+        """`str`: Identifies the account, '<username>@<hostname>'."""
+        return f'{self.username}@{self.hostname}'
+
+
+@dataclass
+class AccountResult:
+    """Outcome of syncing a single account."""
+
+    account: str
+    """`str`: `Account.key` of the synced account."""
+    notes: int = 0
+    """`int`: Number of notes after the sync."""
+    added: int = 0
+    """`int`: Number of new notes."""
+    changed: int = 0
+    """`int`: Number of modified notes."""
+    deleted: int = 0
+    """`int`: Number of deleted notes."""
+    duration: float = 0.0
+    """`float`: Seconds the sync took."""
+    error: Optional[str] = None
+    """`str`: Why the sync failed, None on success."""
+
+    @property
+    def ok(self) -> bool:
+        """`bool`: Whether the sync succeeded."""
+        return self.error is None
+
+    @property
+    def changes(self) -> int:
+        """`int`: Number of added, changed and deleted notes."""
+        return self.added + self.changed + self.deleted
+
+
+@dataclass
+class AccountStatus:
+    """Sync history of an account, used to prioritise it."""
+
+    synced: Optional[float] = None
+    """`float`: Posix timestamp of the last successful sync."""
+    change_rate: float = 0.0
+    """`float`: Average changes per hour, weighted towards recent syncs."""
+    errors: int = 0
+    """`int`: Number of failed syncs since the last successful one."""
+    last_error: Optional[str] = None
+    """`str`: Why the last sync failed."""
+
+    def staleness(self, now: float) -> float:
+        """
+        Args:
+            now (float): Current posix timestamp.
+
+        Returns:
+            float: Hours since the last successful sync, infinite if never synced.
+        """
+        return float('inf') if self.synced is None else (now - self.synced) / 3600
+
+    def update(self, result: AccountResult, now: float) -> None:
+        """Record `result` of a sync that finished at `now`.
+
+        Args:
+            result (AccountResult): Outcome of the sync.
+            now (float): Current posix timestamp.
+        """
+        if not result.ok:
+            self.errors += 1
+            self.last_error = result.error
+            return
+
+        if self.synced is not None:
+            hours = max(self.staleness(now), 1 / 3600)
+            self.change_rate += _CHANGE_RATE_WEIGHT * (
+                result.changes / hours - self.change_rate
+            )
+        self.synced = now
+        self.errors = 0
+        self.last_error = None
+
+
+class NotesSyncManager:
+    """Syncs many accounts with `NotesSync`, spread across processes and threads.
+
+    Accounts are handed out one by one in priority order, so a slow account only
+    occupies a single worker. Every process runs `workers` threads and limits the
+    connections to each host to its share of `max_connections_per_host`.
+
+    Synced notes are kept as `NotesSync` files in `state_dir`, along with the sync
+    history of every account that determines its priority.
+    """
+
+    def __init__(
+        self,
+        accounts: Iterable[Account],
+        state_dir: Union[str, Path],
+        *,
+        processes: Optional[int] = None,
+        workers: int = 8,
+        max_connections_per_host: int = 8,
+        priority: str = 'staleness',
+        api_options: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Args:
+            accounts (Iterable[Account]): Accounts to sync.
+            state_dir (Union[str, Path]): Directory for synced notes and sync
+                history, created if it doesn't exist.
+            processes (int, optional): Number of worker processes, 1 to sync in the
+                current process. Capped at `max_connections_per_host`. Defaults to
+                None, meaning the number of CPUs.
+            workers (int, optional): Number of accounts synced at once per process.
+                Defaults to 8.
+            max_connections_per_host (int, optional): Maximum number of requests in
+                flight per host, across all processes. Defaults to 8.
+            priority (str, optional): 'staleness' to sync the accounts synced
+                longest ago first, 'changes' to sync the accounts with the most
+                expected changes first, based on their change rate. Accounts never
+                synced come first either way. Defaults to 'staleness'.
+            api_options (Dict[str, Any], optional): Keyword arguments for every
+                `NotesApi`, e.g. `retry` or `timeout`. Have to be picklable with
+                more than one process. Defaults to None.
+
+        Raises:
+            ValueError: An argument is out of range.
+        """
+        if priority not in _PRIORITIES:
+            raise ValueError(f'priority has to be one of {_PRIORITIES}, got {priority}')
+        if workers < 1:
+            raise ValueError(f'workers has to be at least 1, got {workers}')
+        if max_connections_per_host < 1:
+            raise ValueError(
+                'max_connections_per_host has to be at least 1, got '
+                f'{max_connections_per_host}'
+            )
+
+        self.accounts: Dict[str, Account] = {
+            account.key: account for account in accounts
+        }
+        """`Dict[str, Account]`: Accounts to sync by `Account.key`."""
+        self.state_dir = Path(state_dir)
+        """`Path`: Directory for synced notes and sync history."""
+        # Every process needs at least one connection of its own
+        self.processes = min(processes or os.cpu_count() or 1, max_connections_per_host)
+        """`int`: Number of worker processes, at most `max_connections_per_host`."""
+        self.workers = workers
+        """`int`: Number of accounts synced at once per process."""
+        self.max_connections_per_host = max_connections_per_host
+        """`int`: Maximum number of requests in flight per host."""
+        self.priority = priority
+        """`str`: 'staleness' or 'changes', see `NotesSyncManager`."""
+        self.api_options = api_options or {}
+        """`Dict[str, Any]`: Keyword arguments for every `NotesApi`."""
+
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.status: Dict[str, AccountStatus] = self._load_status()
+        """`Dict[str, AccountStatus]`: Sync history by `Account.key`."""
+        self.running: Dict[str, float] = {}
+        """`Dict[str, float]`: Accounts being synced, with the posix timestamp
+        their sync started at."""
+
+    @property
+    def _status_path(self) -> Path:
+        return self.state_dir / 'accounts.json'
+
+    def _load_status(self) -> Dict[str, AccountStatus]:
+        try:
+            with open(self._status_path, encoding='utf-8') as file:
+                status = json.load(file)
+        except FileNotFoundError:
+            status = {}
+        return {key: AccountStatus(**status) for key, status in status.items()}
+
+    def _save_status(self) -> None:
+        with open(self._status_path, 'w', encoding='utf-8') as file:
+            json.dump({key: asdict(val) for key, val in self.status.items()}, file)
+
+    def schedule(self, now: Optional[float] = None) -> List[Account]:
+        """
+        Args:
+            now (float, optional): Posix timestamp to rate staleness at. Defaults
+                to the current time.
+
+        Returns:
+            List[Account]: All accounts, in the order they will be synced.
+        """
+        now = datetime.now().timestamp() if now is None else now
+
+        def urgency(account: Account) -> float:
+            status = self.status.get(account.key, AccountStatus())
+            staleness = status.staleness(now)
+            if self.priority == 'changes' and staleness != float('inf'):
+                return status.change_rate * staleness
+            return staleness
+
+        return sorted(self.accounts.values(), key=urgency, reverse=True)
+
+    def sync_all(self) -> Iterator[AccountResult]:
+        """Sync all accounts, yielding their results as they finish.
+
+        Failures are reported in `AccountResult.error` and don't stop the other
+        accounts. `NotesSyncManager.status` is saved after every account, and
+        `NotesSyncManager.running` lists the accounts in progress.
+
+        Yields:
+            AccountResult: Outcome of every account.
+        """
+        schedule = self.schedule()
+        # Every process gets its share of the connections
+        connections = self.max_connections_per_host // self.processes
+        args = (self.workers, connections, self.state_dir, self.api_options)
+        worker_count = self.processes * self.workers
+
+        processes = []
+        if self.processes == 1:
+            tasks: Any = Queue()
+            results: Any = Queue()
+            _start_workers(tasks, results, *args)
+        else:
+            context = multiprocessing.get_context()
+            tasks = context.Queue()
+            results = context.Queue()
+            processes = [
+                context.Process(
+                    target=_process_main, args=(tasks, results, *args), daemon=True
+                )
+                for _ in range(self.processes)
+            ]
+            for process in processes:
+                process.start()
+
+        for account in schedule:
+            tasks.put(account)
+        for _ in range(worker_count):
+            tasks.put(None)
+
+        exited = 0
+        try:
+            while exited < worker_count:
+                event, key, payload = results.get()
+                if event == 'exited':
+                    exited += 1
+                elif event == 'started':
+                    self.running[key] = payload
+                else:
+                    yield self._finished(key, payload)
+        finally:
+            if exited < worker_count:
+                # Stopped early, skip the accounts that haven't been started yet
+                _drain(tasks)
+                for _ in range(worker_count):
+                    tasks.put(None)
+                # Workers only exit once their results have been consumed
+                while exited < worker_count:
+                    event, key, payload = results.get()
+                    if event == 'exited':
+                        exited += 1
+                    elif event == 'done':
+                        self._finished(key, payload)
+            for process in processes:
+                process.join()
+
+    def _finished(self, key: str, result: AccountResult) -> AccountResult:
+        """Record the `result` of account `key` in `NotesSyncManager.status`."""
+        self.running.pop(key, None)
+        self.status.setdefault(key, AccountStatus()).update(
+            result, datetime.now().timestamp()
+        )
+        self._save_status()
+        return result
+
+    def __repr__(self) -> str:
+        return f'<NotesSyncManager [{len(self.accounts)} accounts]>'
+
+
+def _state_path(state_dir: Path, account: Account) -> Path:
+    """File the synced notes of `account` are kept in."""
+    return state_dir / f'{sha1(account.key.encode()).hexdigest()}.json'
+
+
+def sync_account(
+    account: Account,
+    state_dir: Union[str, Path],
+    *,
+    limiter: Optional[RequestLimiter] = None,
+    api_options: Optional[Dict[str, Any]] = None,
+) -> AccountResult:
+    """Sync a single account with the notes kept in `state_dir`.
+
+    Args:
+        account (Account): Account to sync.
+        state_dir (Union[str, Path]): Directory of the synced notes.
+        limiter (RequestLimiter, optional): Limiter for the account's host.
+            Defaults to None.
+        api_options (Dict[str, Any], optional): Keyword arguments for `NotesApi`.
+            Defaults to None.
+
+    Returns:
+        AccountResult: Outcome of the sync, failures are reported in
+            `AccountResult.error` instead of raised.
+    """
+    started = perf_counter()
+    path = _state_path(Path(state_dir), account)
+    api = NotesApi(
+        account.username,
+        account.password,
+        account.hostname,
+        limiter=limiter,
+        **(api_options or {}),
+    )
+    try:
+        sync = NotesSync.load(api, path)
+        changes = sync.sync()
+        sync.save(path)
+    except Exception as e:
+        # Exceptions aren't necessarily picklable, so only their message is kept
+        return AccountResult(
+            account.key,
+            duration=perf_counter() - started,
+            error=f'{type(e).__name__}: {e}',
+        )
+    finally:
+        api.close()
+
+    return AccountResult(
+        account.key,
+        len(sync.notes),
+        len(changes.added),
+        len(changes.changed),
+        len(changes.deleted),
+        perf_counter() - started,
+    )
+
+
+def _drain(queue: Any) -> None:
+    """Remove all items from `queue` without waiting."""
+    while True:
+        try:
+            queue.get_nowait()
+        except Empty:
+            return
+
+
+def _start_workers(
+    tasks: Any,
+    results: Any,
+    workers: int,
+    connections: int,
+    state_dir: Path,
+    api_options: Dict[str, Any],
+) -> List[Thread]:
+    """Start `workers` threads syncing accounts from `tasks` until they get None."""
+    limiters: Dict[str, RequestLimiter] = {}
+    lock = Lock()
+
+    def limiter_for(hostname: str) -> RequestLimiter:
+        with lock:
+            if hostname not in limiters:
+                limiters[hostname] = RequestLimiter(max_in_flight=connections)
+            return limiters[hostname]
+
+    def work() -> None:
+        while True:
+            account = tasks.get()
+            if account is None:
+                results.put(('exited', None, None))
+                return
+            results.put(('started', account.key, datetime.now().timestamp()))
+            result = sync_account(
+                account,
+                state_dir,
+                limiter=limiter_for(account.hostname),
+                api_options=api_options,
+            )
+            results.put(('done', account.key, result))
+
+    threads = [Thread(target=work, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def _process_main(
+    tasks: Any,
+    results: Any,
+    workers: int,
+    connections: int,
+    state_dir: Path,
+    api_options: Dict[str, Any],
+) -> None:
+    """Entry point of a worker process."""
+    for thread in _start_workers(
+        tasks, results, workers, connections, state_dir, api_options
+    ):
+        thread.join()
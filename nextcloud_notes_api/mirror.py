@@ -0,0 +1,489 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import astuple, dataclass, field
+from datetime import datetime
+from hashlib import sha1
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from .api_wrapper import NotesApi
+from .batch import BatchItem
+from .note import Note
+from .sync import _fetch_changes
+
+_STATE_FILE = '.notes-mirror.json'
+_UNSAFE = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+"""Characters replaced in file and directory names."""
+
+_Stat = Tuple[int, int]
+"""Modification time in nanoseconds and size of a file."""
+
+
+def _hash(content: str) -> str:
+    return sha1(content.encode()).hexdigest()
+
+
+def _safe_name(name: Optional[str]) -> str:
+    """`name` usable as a single path component."""
+    name = _UNSAFE.sub('_', name or '').strip().lstrip('.')
+    return name or 'Untitled'
+
+
+@dataclass
+class _Entry:
+    """Mirrored state of a note, as of the last sync."""
+
+    path: str
+    """Path of the note's file relative to the mirror directory, POSIX style."""
+    modified: Optional[int]
+    """`Note.modified` on the server, as posix timestamp."""
+    hash: str
+    """Hash of the note's content."""
+    mtime_ns: int
+    size: int
+    title: Optional[str] = None
+    """`Note.title`, which the file name may only approximate."""
+    category: Optional[str] = None
+    """`Note.category`, which the directory may only approximate."""
+
+    @property
+    def stat(self) -> _Stat:
+        return (self.mtime_ns, self.size)
+
+
+@dataclass
+class MirrorChanges:
+    """What a `NotesMirror.sync` transferred."""
+
+    downloaded: Set[int] = field(default_factory=set)
+    """`Set[int]`: Notes written to local files."""
+    uploaded: Set[int] = field(default_factory=set)
+    """`Set[int]`: Notes updated or renamed on the server."""
+    created: Set[int] = field(default_factory=set)
+    """`Set[int]`: Notes created on the server from new local files."""
+    deleted_local: Set[int] = field(default_factory=set)
+    """`Set[int]`: Notes whose local file has been deleted."""
+    deleted_remote: Set[int] = field(default_factory=set)
+    """`Set[int]`: Notes deleted on the server."""
+    conflicts: List[Path] = field(default_factory=list)
+    """`List[Path]`: Local versions of notes changed on both sides, saved next to
+    the note's file before it was overwritten with the server's version."""
+    errors: List[BatchItem] = field(default_factory=list)
+    """`List[BatchItem]`: Uploads that failed, retried on the next sync."""
+
+    def __bool__(self) -> bool:
+        return any(astuple(self))
+
+
+class NotesMirror:
+    """Mirrors all notes of an account to a local directory, in both directions.
+
+    Every note is a file named after its title, in subdirectories named after its
+    category, e.g. `Work/Projects/Todo.md`. Editing, moving, creating or deleting
+    files changes the notes on the next `NotesMirror.sync`, and vice versa.
+
+    Only notes modified since the last sync are transferred, see `NotesSync`. Local
+    files are compared by modification time and size first and only hashed if
+    those changed. Notes changed on both sides are resolved in favour of the
+    server, keeping the local version as a conflict file.
+    """
+
+    def __init__(
+        self,
+        api: NotesApi,
+        directory: Union[str, Path],
+        *,
+        extension: str = '.md',
+        max_workers: int = 10,
+    ):
+        """
+        Args:
+            api (NotesApi): API to sync with.
+            directory (Union[str, Path]): Mirror directory, created if it doesn't
+                exist. The sync state is kept in a hidden file inside it.
+            extension (str, optional): File extension of notes, other files are
+                ignored. Defaults to '.md'.
+            max_workers (int, optional): Maximum number of concurrent uploads.
+                Defaults to 10.
+        """
+        self.api = api
+        """`NotesApi`: API to sync with."""
+        self.directory = Path(directory)
+        """`Path`: Mirror directory."""
+        self.extension = extension
+        """`str`: File extension of notes."""
+        self.max_workers = max_workers
+        """`int`: Maximum number of concurrent uploads."""
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._entries: Dict[int, _Entry] = self._load()
+        self._paths: Dict[str, int] = {
+            entry.path: note_id for note_id, entry in self._entries.items()
+        }
+
+    @property
+    def _state_path(self) -> Path:
+        return self.directory / _STATE_FILE
+
+    def _load(self) -> Dict[int, _Entry]:
+        try:
+            with open(self._state_path, encoding='utf-8') as file:
+                state = json.load(file)
+        except FileNotFoundError:
+            return {}
+        return {int(note_id): _Entry(*entry) for note_id, entry in state.items()}
+
+    def _save(self) -> None:
+        temp_path = self._state_path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(
+                {note_id: astuple(entry) for note_id, entry in self._entries.items()},
+                file,
+            )
+        os.replace(temp_path, self._state_path)
+
+    def _set_entry(self, note_id: int, entry: _Entry) -> None:
+        self._pop_entry(note_id)
+        self._entries[note_id] = entry
+        self._paths[entry.path] = note_id
+
+    def _pop_entry(self, note_id: int) -> Optional[_Entry]:
+        entry = self._entries.pop(note_id, None)
+        if entry is not None and self._paths.get(entry.path) == note_id:
+            del self._paths[entry.path]
+        return entry
+
+    def path(self, note_id: int) -> Optional[Path]:
+        """
+        Args:
+            note_id (int): ID of a mirrored note.
+
+        Returns:
+            Optional[Path]: File of the note as of the last sync, None if it isn't
+                mirrored.
+        """
+        entry = self._entries.get(note_id)
+        return self.directory / entry.path if entry else None
+
+    def sync(
+        self, changed_paths: Optional[Iterable[Union[str, Path]]] = None
+    ) -> MirrorChanges:
+        """Transfer changes in both directions.
+
+        Local changes are found by scanning the whole directory, unless
+        `changed_paths` is given, e.g. by a file system watcher. Then only those
+        paths are checked.
+
+        Args:
+            changed_paths (Iterable[Union[str, Path]], optional): Files created,
+                modified or deleted since the last sync, absolute or relative to
+                `NotesMirror.directory`. Defaults to None.
+
+        Returns:
+            MirrorChanges: What has been transferred.
+
+        Raises:
+            InvalidNextcloudCredentials: Invalid credentials supplied.
+        """
+        changes = MirrorChanges()
+        files = self._scan(changed_paths)
+        local_changed, renamed, local_deleted, new_files = self._local_changes(files)
+        remote_changed, remote_deleted = self._remote_changes()
+
+        for note_id, note in remote_changed.items():
+            local_path = local_changed.get(note_id) or renamed.get(note_id)
+            if local_path is not None:
+                changes.conflicts.append(self._keep_conflict(local_path))
+            self._download(note)
+            changes.downloaded.add(note_id)
+
+        for note_id in remote_deleted:
+            entry = self._pop_entry(note_id)
+            local_path = local_changed.get(note_id) or renamed.get(note_id)
+            if local_path is not None:
+                # Changed locally, so keep it as a new note
+                new_files.add(local_path)
+            else:
+                self._remove(entry.path)
+                changes.deleted_local.add(note_id)
+
+        local_paths = {**local_changed, **renamed}
+        updates = [
+            self._note_from_file(path, note_id)
+            for note_id, path in local_paths.items()
+            if note_id in self._entries and note_id not in remote_changed
+        ]
+        for item in self.api.update_notes(updates, max_workers=self.max_workers):
+            if item.ok:
+                self._uploaded(item.result, local_paths[item.item.id])
+                changes.uploaded.add(item.item.id)
+            else:
+                changes.errors.append(item)
+
+        deletions = [
+            note_id
+            for note_id in local_deleted
+            if note_id in self._entries and note_id not in remote_changed
+        ]
+        for item in self.api.delete_notes(deletions, max_workers=self.max_workers):
+            if item.ok:
+                self._remove(self._pop_entry(item.item).path)
+                changes.deleted_remote.add(item.item)
+            else:
+                changes.errors.append(item)
+
+        new_notes = {path: self._note_from_file(path) for path in sorted(new_files)}
+        paths = {id(note): path for path, note in new_notes.items()}
+        for item in self.api.create_notes(
+            new_notes.values(), max_workers=self.max_workers
+        ):
+            if item.ok:
+                self._uploaded(item.result, paths[id(item.item)])
+                changes.created.add(item.result.id)
+            else:
+                changes.errors.append(item)
+
+        self._save()
+        return changes
+
+    def _scan(
+        self, changed_paths: Optional[Iterable[Union[str, Path]]]
+    ) -> Dict[str, _Stat]:
+        """Current files with their stats, by path relative to the directory."""
+        if changed_paths is None:
+            files: Dict[str, _Stat] = {}
+            self._scan_directory(self.directory, '', files)
+            return files
+
+        files = {entry.path: entry.stat for entry in self._entries.values()}
+        for changed in changed_paths:
+            path = Path(changed)
+            if not path.is_absolute():
+                path = self.directory / path
+            relative = path.relative_to(self.directory).as_posix()
+            if not self._is_note_file(PurePosixPath(relative)):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                files.pop(relative, None)
+            else:
+                files[relative] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def _scan_directory(
+        self, directory: Path, prefix: str, files: Dict[str, _Stat]
+    ) -> None:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                relative = f'{prefix}{entry.name}'
+                if entry.is_dir(follow_symlinks=False):
+                    self._scan_directory(Path(entry.path), f'{relative}/', files)
+                elif entry.name.endswith(self.extension):
+                    stat = entry.stat()
+                    files[relative] = (stat.st_mtime_ns, stat.st_size)
+
+    def _is_note_file(self, path: PurePosixPath) -> bool:
+        return path.name.endswith(self.extension) and not any(
+            part.startswith('.') for part in path.parts
+        )
+
+    def _local_changes(
+        self, files: Dict[str, _Stat]
+    ) -> Tuple[Dict[int, str], Dict[int, str], Set[int], Set[str]]:
+        """Compare `files` to the last sync.
+
+        Returns:
+            Tuple[Dict[int, str], Dict[int, str], Set[int], Set[str]]: Paths of
+                modified notes, new paths of moved notes, deleted notes and paths of
+                new files.
+        """
+        changed: Dict[int, str] = {}
+        new_files: Dict[str, str] = {}
+
+        for path, stat in files.items():
+            note_id = self._paths.get(path)
+            if note_id is None:
+                new_files[path] = _hash(self._read(path))
+                continue
+
+            entry = self._entries[note_id]
+            if stat == entry.stat:
+                continue
+            if _hash(self._read(path)) == entry.hash:
+                # Only touched
+                entry.mtime_ns, entry.size = stat
+            else:
+                changed[note_id] = path
+
+        # Notes with the same content, e.g. empty ones, share a hash
+        missing: Dict[str, List[int]] = {}
+        for note_id, entry in self._entries.items():
+            if entry.path not in files:
+                missing.setdefault(entry.hash, []).append(note_id)
+        deleted = {note_id for note_ids in missing.values() for note_id in note_ids}
+        renamed: Dict[int, str] = {}
+        for path, content_hash in list(new_files.items()):
+            note_ids = missing.get(content_hash)
+            if note_ids:
+                note_id = note_ids.pop()
+                renamed[note_id] = path
+                deleted.discard(note_id)
+                del new_files[path]
+
+        return changed, renamed, deleted, set(new_files)
+
+    def _remote_changes(self) -> Tuple[Dict[int, Note], Set[int]]:
+        """Notes changed on the server since the last sync, and IDs of deleted
+        notes."""
+        last_modified = max(
+            (entry.modified or 0 for entry in self._entries.values()), default=0
+        )
+        remote, deleted = _fetch_changes(self.api, self._entries.keys(), last_modified)
+
+        changed: Dict[int, Note] = {}
+        for note in remote.values():
+            entry = self._entries.get(note.id)
+            modified = int(note.modified.timestamp()) if note.modified else None
+            if entry is not None and entry.modified == modified:
+                continue
+            if (
+                entry is not None
+                and entry.hash == _hash(note.content or '')
+                and entry.path == self._path_for(note, entry.path)
+            ):
+                # The file stays, but the title might differ in unsafe characters
+                entry.modified = modified
+                entry.title = note.title
+                entry.category = note.category
+            else:
+                changed[note.id] = note
+
+        return changed, deleted
+
+    def _path_for(self, note: Note, current: Optional[str] = None) -> str:
+        """Relative path for `note`, named after its title and category.
+
+        Falls back to a name including `Note.id` if the path is taken by another
+        note or file, unless it is `current`, the note's file as of now.
+        """
+        parts = [_safe_name(part) for part in (note.category or '').split('/') if part]
+        base = '/'.join([*parts, _safe_name(note.title)])
+        path = f'{base}{self.extension}'
+
+        owner = self._paths.get(path)
+        if (
+            path == current
+            or owner == note.id
+            or (owner is None and not (self.directory / path).exists())
+        ):
+            return path
+        return f'{base} ({note.id}){self.extension}'
+
+    def _note_from_file(self, path: str, note_id: Optional[int] = None) -> Note:
+        """Note with the title, category and content of the file at `path`.
+
+        File and directory names may have been sanitized or disambiguated, so the
+        title and category of a mirrored note are kept unless its file has been
+        renamed or moved.
+        """
+        relative = PurePosixPath(path)
+        title = relative.name[: -len(self.extension)]
+        category = '/'.join(relative.parent.parts)
+
+        entry = self._entries.get(note_id) if note_id is not None else None
+        if entry is not None:
+            previous = PurePosixPath(entry.path)
+            if previous.name == relative.name and entry.title is not None:
+                title = entry.title
+            if previous.parent == relative.parent and entry.category is not None:
+                category = entry.category
+
+        return Note(title, self._read(path), category=category, id=note_id)
+
+    def _read(self, path: str) -> str:
+        with open(self.directory / path, encoding='utf-8', newline='') as file:
+            return file.read()
+
+    def _download(self, note: Note) -> None:
+        """Write `note` to its file, moving it if its title or category changed."""
+        entry = self._entries.get(note.id)
+        current = entry.path if entry is not None else None
+        path = self._path_for(note, current)
+
+        target = self.directory / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, 'w', encoding='utf-8', newline='') as file:
+            file.write(note.content or '')
+        if note.modified is not None:
+            timestamp = note.modified.timestamp()
+            os.utime(target, (timestamp, timestamp))
+
+        if current is not None and current != path:
+            self._remove(current)
+        self._uploaded(note, path)
+
+    def _uploaded(self, note: Note, path: str) -> None:
+        """Record `note` as sent by the server for the file at `path`, moving the
+        file if the server changed the note's title."""
+        expected = self._path_for(note, path)
+        if expected != path:
+            (self.directory / expected).parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self.directory / path, self.directory / expected)
+            self._remove_empty_parents(self.directory / path)
+            path = expected
+
+        previous = self._entries.get(note.id)
+        if previous is not None and previous.path != path:
+            # Moved locally, the category may be gone
+            self._remove_empty_parents(self.directory / previous.path)
+
+        stat = (self.directory / path).stat()
+        self._set_entry(
+            note.id,
+            _Entry(
+                path,
+                int(note.modified.timestamp()) if note.modified else None,
+                _hash(note.content or ''),
+                stat.st_mtime_ns,
+                stat.st_size,
+                note.title,
+                note.category,
+            ),
+        )
+
+    def _keep_conflict(self, path: str) -> Path:
+        """Move the local version of a note at `path` to a conflict file, which
+        isn't synced."""
+        source = self.directory / path
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        conflict = source.with_name(f'{source.name}.conflict-{stamp}')
+        os.replace(source, conflict)
+        return conflict
+
+    def _remove(self, path: str) -> None:
+        """Delete the file at `path` along with directories left empty."""
+        target = self.directory / path
+        try:
+            target.unlink()
+        except FileNotFoundError:
+            pass
+        self._remove_empty_parents(target)
+
+    def _remove_empty_parents(self, target: Path) -> None:
+        """Delete the directories of `target` that are empty."""
+        for parent in target.parents:
+            if parent == self.directory:
+                break
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+
+    def __repr__(self) -> str:
+        return f'<NotesMirror [{self.directory}, {len(self._entries)} notes]>'
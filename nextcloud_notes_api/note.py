@@ -1,11 +1,49 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Mapping,
+    Optional,
+    Union,
+)
+
+if TYPE_CHECKING:
+    from .api_wrapper import NotesApi
+
+_TRACKED_FIELDS = ('title', 'content', 'category', 'favorite')
+"""Fields compared by `Note.dirty_fields`, in the order of `Note._synced`."""
 
 
 class Note:
-    """Represents a Nextcloud Notes app note."""
+    """Represents a Nextcloud Notes app note.
+
+    Notes are slotted to keep them small, `Note.modified` is only converted to a
+    `datetime.datetime` when first accessed.
+
+    Notes bound to a `NotesApi`, see `NotesApi.bind`, remember the state they have
+    last been synced in. Changes are tracked in `Note.dirty_fields` and can be
+    pushed with `Note.save` or `NotesApi.flush`.
+    """
+
+    __slots__ = (
+        '_title',
+        '_category',
+        '_favorite',
+        'id',
+        'etag',
+        'api',
+        '_synced',
+        '__weakref__',
+        '_content',
+        '_content_loader',
+        '_modified',
+        '_modified_timestamp',
+    )
 
     def __init__(
         self,
@@ -17,7 +55,9 @@ class Note:
         id: Optional[int] = None,
         modified: Optional[int] = None,
         modified_datetime: Optional[datetime] = None,
+        etag: Optional[str] = None,
         generate_modified: bool = False,
+        content_loader: Optional[Callable[[], Optional[str]]] = None,
         **_: Optional[Any],
     ):
         """See `Note.to_dict` for conversion to a `dict`.
@@ -34,31 +74,235 @@ class Note:
             modified_datetime (datetime, optional): When the note has last been
                 modified as datetime object, preferred over `modified`. Defaults to
                 None.
+            etag (str, optional): The notes ETag, as sent by the server. Defaults
+                to None.
             generate_modified (bool): Whether `Note.modified` should be set
                 to the current time. Overrides both `modified` and `modified_datetime`.
                 Defaults to False.
+            content_loader (Callable[[], Optional[str]], optional): Called to load
+                `Note.content` on first access, if `content` is not set. Defaults to
+                None.
             _(Any, optional): Discard unused keyword arguments.
         """
-        self.title = title
-        """`str`: Note title."""
-        self.content = content
-        """`str`: Note content."""
-        self.category = category
-        """`str`: Note category."""
-        self.favorite = favorite
-        """`bool`: Whether the note is marked as a favorite."""
+        self.api: Optional[NotesApi] = None
+        """`NotesApi`: API the note is bound to, see `NotesApi.bind`."""
+        self._title = title
+        self._content = content
+        self._content_loader = content_loader if content is None else None
+        self._category = category
+        self._favorite = favorite
         self.id = id
         """`int`: A unique note id."""
-        self.modified = (
-            datetime.fromtimestamp(modified)
-            if not modified_datetime and modified
-            else modified_datetime
-        )
-        """`datetime.datetime`: When the note has last been modified."""
+        self._modified = modified_datetime
+        self._modified_timestamp = None if modified_datetime else modified
+        self.etag = etag
+        """`str`: ETag of the note as fetched from the server, not part of
+        `Note.to_dict`."""
+        self._synced: Optional[tuple] = None
 
         if generate_modified:
             self.update_modified()
 
+    @classmethod
+    def from_dict(cls, note_dict: Mapping[str, Any]) -> Note:
+        """Create a note from a `dict` as returned by the API, see `Note.to_dict`.
+
+        Faster than `Note(**note_dict)`, unknown keys are ignored.
+
+        Args:
+            note_dict (Mapping[str, Any]): Note attributes.
+
+        Returns:
+            Note: The new note.
+        """
+        get = note_dict.get
+        note = cls.__new__(cls)
+        note._title = get('title')
+        note._content = get('content')
+        note._content_loader = None
+        note._category = get('category')
+        note._favorite = get('favorite')
+        note.id = get('id')
+        note._modified = None
+        note._modified_timestamp = get('modified')
+        note.etag = get('etag')
+        note.api = None
+        note._synced = None
+        return note
+
+    @property
+    def title(self) -> Optional[str]:
+        """`str`: Note title."""
+        return self._title
+
+    @title.setter
+    def title(self, title: Optional[str]) -> None:
+        self._title = title
+        self._changed()
+
+    @property
+    def category(self) -> Optional[str]:
+        """`str`: Note category."""
+        return self._category
+
+    @category.setter
+    def category(self, category: Optional[str]) -> None:
+        self._category = category
+        self._changed()
+
+    @property
+    def favorite(self) -> Optional[bool]:
+        """`bool`: Whether the note is marked as a favorite."""
+        return self._favorite
+
+    @favorite.setter
+    def favorite(self, favorite: Optional[bool]) -> None:
+        self._favorite = favorite
+        self._changed()
+
+    @property
+    def modified(self) -> Optional[datetime]:
+        """`datetime.datetime`: When the note has last been modified."""
+        if self._modified is None and self._modified_timestamp:
+            self._modified = datetime.fromtimestamp(self._modified_timestamp)
+        return self._modified
+
+    @modified.setter
+    def modified(self, modified: Optional[datetime]) -> None:
+        self._modified = modified
+        self._modified_timestamp = None
+
+    @property
+    def content(self) -> Optional[str]:
+        """`str`: Note content, loaded on first access if it hasn't been fetched."""
+        if self._content_loader:
+            self._content = self._content_loader()
+            self._content_loader = None
+            if self._synced is not None:
+                # The loaded content is the synced content
+                self._synced = (
+                    self._synced[0],
+                    self._content,
+                    *self._synced[2:],
+                )
+        return self._content
+
+    @content.setter
+    def content(self, content: Optional[str]) -> None:
+        self._content = content
+        self._content_loader = None
+        self._changed()
+
+    def _changed(self) -> None:
+        """Keep the note alive in `Note.api` until its changes have been flushed."""
+        if self.api is not None:
+            self.api._track(self)
+
+    @property
+    def content_loaded(self) -> bool:
+        """`bool`: Whether `Note.content` is available without loading it."""
+        return self._content_loader is None
+
+    @property
+    def dirty_fields(self) -> FrozenSet[str]:
+        """`FrozenSet[str]`: Fields changed since the note has last been synced
+        through `Note.api`, always empty for unbound notes.
+
+        Fields are compared to their synced values, so changing a field back
+        makes it clean again.
+        """
+        if self._synced is None:
+            return frozenset()
+        return frozenset(
+            field
+            for field, synced, current in zip(
+                _TRACKED_FIELDS, self._synced, self._tracked_values()
+            )
+            if synced != current
+        )
+
+    def _tracked_values(self) -> tuple:
+        # Content that hasn't been loaded can't have been changed
+        content = self._content if self._content_loader is None else None
+        return (self._title, content, self._category, self._favorite)
+
+    def _mark_synced(self) -> None:
+        """Remember the current state as synced with the server."""
+        self._synced = self._tracked_values()
+
+    def _update_from(self, note: Note) -> None:
+        """Take over all attributes of `note`, as sent by the server."""
+        self._title = note._title
+        self._content = note._content
+        self._content_loader = note._content_loader
+        self._category = note._category
+        self._favorite = note._favorite
+        self.id = note.id
+        self._modified = note._modified
+        self._modified_timestamp = note._modified_timestamp
+        self.etag = note.etag
+        self._mark_synced()
+
+    def _bound_api(self) -> NotesApi:
+        if self.api is None:
+            raise ValueError(f'Note not bound to a NotesApi {self}')
+        return self.api
+
+    def save(self, *, if_match: bool = False) -> Note:
+        """Push this note through `Note.api`.
+
+        New notes are created, notes with `Note.id` set are only updated if they
+        have `Note.dirty_fields`, sending just those fields. The note takes over
+        the attributes sent back by the server.
+
+        Args:
+            if_match (bool, optional): Only update the note if it hasn't been
+                modified on the server, see `NotesApi.update_note`. Defaults to
+                False.
+
+        Returns:
+            Note: This note.
+
+        Raises:
+            ValueError: The note isn't bound to a `NotesApi`.
+            NotesApiError: See `NotesApi.create_note` and `NotesApi.update_note`.
+        """
+        for item in self._bound_api().flush([self], if_match=if_match):
+            if item.error:
+                raise item.error
+        return self
+
+    def refresh(self) -> Note:
+        """Replace all attributes with the current version on the server, discarding
+        unsaved changes.
+
+        Returns:
+            Note: This note.
+
+        Raises:
+            ValueError: The note isn't bound to a `NotesApi`, or `Note.id` isn't
+                set.
+        """
+        if not self.id:
+            raise ValueError(f'Note id not set {self}')
+        self._update_from(self._bound_api().get_single_note(self.id))
+        return self
+
+    def delete(self) -> None:
+        """Delete this note through `Note.api` and unbind it.
+
+        Raises:
+            ValueError: The note isn't bound to a `NotesApi`, or `Note.id` isn't
+                set.
+        """
+        if not self.id:
+            raise ValueError(f'Note id not set {self}')
+        api = self._bound_api()
+        api.delete_note(self.id)
+        api._untrack(self)
+        self.api = None
+        self._synced = None
+
     def to_dict(self) -> Dict[str, Any]:
         """Generate a `dict` from this class.
 
@@ -67,13 +311,20 @@ class Note:
         Returns:
             Dict[str, Any]: A `dict` containing the attributes of this class.
         """
+        modified: Optional[Union[int, float]]
+        if self._modified is not None:
+            modified = self._modified.timestamp()
+        else:
+            # Skip the round trip through datetime, if it hasn't been converted yet
+            modified = self._modified_timestamp or None
+
         return {
             'title': self.title,
             'content': self.content,
             'category': self.category,
             'favorite': self.favorite,
             'id': self.id,
-            'modified': self.modified.timestamp() if self.modified else None,
+            'modified': modified,
         }
 
     def update_modified(self, dt: datetime = None) -> None:
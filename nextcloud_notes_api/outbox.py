@@ -0,0 +1,429 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+from requests import RequestException
+
+from .api_exceptions import (
+    InvalidNextcloudCredentials,
+    NotesApiError,
+    ServerUnavailable,
+)
+from .api_wrapper import NotesApi, _is_connect_error
+from .batch import BatchItem
+from .note import Note
+from .retry import RetryPolicy
+
+_TRANSIENT_ERRORS = (ServerUnavailable, InvalidNextcloudCredentials, RequestException)
+"""Exceptions that keep an operation in the outbox to be replayed later, unless it
+is a creation the server may have processed, see `NotesOutbox._transient`."""
+_PERMANENT_ERRORS = (NotesApiError, ValueError)
+"""Exceptions that drop an operation from the outbox into `NotesOutbox.failed`."""
+
+
+@dataclass
+class _Entry:
+    """A journaled write operation."""
+
+    seq: int
+    operation: str
+    note_id: int
+    note: Optional[Dict[str, Any]]
+    if_match: bool
+
+
+class NotesOutbox:
+    """Journals writes locally and replays them to a `NotesApi` in the background.
+
+    Writes return right away, no matter how slow or unreachable the server is.
+    Operations are replayed in the order they have been made, with up to
+    `NotesOutbox.max_workers` different notes in flight at once. Pending operations
+    on the same note are collapsed: updates replace each other, and a deletion
+    drops pending updates, or the whole note if its creation hasn't been replayed
+    yet.
+
+    Created notes get a temporary negative `Note.id` until their creation has
+    been replayed, use `NotesOutbox.resolve` to look up the ID assigned by the
+    server. Temporary IDs may be used for further updates and deletions.
+
+    Operations failing because the server is unavailable or rejects the
+    credentials stay in the outbox and are retried after
+    `NotesOutbox.retry_interval` seconds. Creations are only kept if the server
+    can't have processed them, like `RetryPolicy` does, so notes are never created
+    twice. Other failures are dropped into `NotesOutbox.failed`.
+    """
+
+    def __init__(
+        self,
+        api: NotesApi,
+        path: Optional[Union[str, Path]] = None,
+        *,
+        max_workers: int = 4,
+        retry_interval: float = 5.0,
+    ):
+        """Call `NotesOutbox.start` or use the `NotesOutbox` as a context manager to
+        replay in a background thread, or call `NotesOutbox.flush` to replay
+        manually.
+
+        Args:
+            api (NotesApi): API to replay operations to.
+            path (Union[str, Path], optional): Journal database file, created if it
+                doesn't exist. Pending operations survive restarts. Defaults to
+                None, meaning the journal is kept in memory.
+            max_workers (int, optional): Maximum number of operations replayed at
+                once. Defaults to 4.
+            retry_interval (float, optional): Seconds to wait before replaying
+                again after the server failed. Defaults to 5.
+
+        Raises:
+            ValueError: `max_workers` is less than 1.
+        """
+        if max_workers < 1:
+            raise ValueError(f'max_workers has to be at least 1, got {max_workers}')
+
+        self.api = api
+        """`NotesApi`: API to replay operations to."""
+        self.path = path
+        """`Union[str, Path]`: Journal database file, None if kept in memory."""
+        self.max_workers = max_workers
+        """`int`: Maximum number of operations replayed at once."""
+        self.retry_interval = retry_interval
+        """`float`: Seconds to wait before replaying again after a failure."""
+        self.failed: List[BatchItem] = []
+        """`List[BatchItem]`: Operations dropped because the server rejected them."""
+        self.last_error: Optional[Exception] = None
+        """`Exception`: Why the last replay stopped early, None if it didn't."""
+
+        self._lock = Lock()
+        self._in_flight: Set[int] = set()
+        self._wakeup = Event()
+        self._stopped = Event()
+        self._thread: Optional[Thread] = None
+
+        self._connection = sqlite3.connect(
+            str(path) if path is not None else ':memory:', check_same_thread=False
+        )
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS outbox '
+                '(seq INTEGER PRIMARY KEY AUTOINCREMENT, operation TEXT, '
+                'note_id INTEGER, note TEXT, if_match INTEGER)'
+            )
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS temp_ids '
+                '(id INTEGER PRIMARY KEY AUTOINCREMENT, note_id INTEGER)'
+            )
+
+    def create_note(self, note: Note) -> Note:
+        """Journal the creation of `note`.
+
+        Args:
+            note (Note): Note to create.
+
+        Returns:
+            Note: Copy of `note` with a temporary negative `Note.id`.
+        """
+        with self._lock, self._connection:
+            temp_id = -self._connection.execute(
+                'INSERT INTO temp_ids (note_id) VALUES (NULL)'
+            ).lastrowid
+            self._append('create', temp_id, note, False)
+
+        self._wakeup.set()
+        created = Note.from_dict(note.to_dict())
+        created.id = temp_id
+        return created
+
+    def update_note(self, note: Note, *, if_match: bool = False) -> None:
+        """Journal an update of `note`, see `NotesApi.update_note`.
+
+        Args:
+            note (Note): New note, `Note.id` may be a temporary ID.
+            if_match (bool, optional): Whether to only update the note if its ETag
+                still matches `Note.etag` when replayed. Defaults to False.
+
+        Raises:
+            ValueError: `Note.id` is not set, or `if_match` is set and `Note.etag`
+                isn't.
+        """
+        if not note.id:
+            raise ValueError(f'Note id not set {note}')
+        if if_match and not note.etag:
+            raise ValueError(f'Note etag not set {note}')
+
+        with self._lock, self._connection:
+            note_id = self._resolved(note.id)
+            pending = self._pending_entries(note_id)
+            create = next((e for e in pending if e.operation == 'create'), None)
+            if create is not None:
+                # Not created yet, so create it with the new fields right away
+                self._connection.execute(
+                    'UPDATE outbox SET note = ? WHERE seq = ?',
+                    (json.dumps(self._note_json(note)), create.seq),
+                )
+            else:
+                self._drop(e for e in pending if e.operation == 'update')
+                self._append('update', note_id, note, if_match)
+
+        self._wakeup.set()
+
+    def delete_note(self, note_id: int) -> None:
+        """Journal the deletion of note `note_id`.
+
+        Args:
+            note_id (int): ID of the note to delete, may be a temporary ID.
+        """
+        with self._lock, self._connection:
+            note_id = self._resolved(note_id)
+            pending = self._pending_entries(note_id)
+            self._drop(pending)
+            if not any(entry.operation == 'create' for entry in pending):
+                self._append('delete', note_id, None, False)
+
+        self._wakeup.set()
+
+    def resolve(self, note_id: int) -> Optional[int]:
+        """ID assigned by the server to a note created through the outbox.
+
+        Args:
+            note_id (int): Temporary or server assigned note ID.
+
+        Returns:
+            Optional[int]: The server assigned ID, None if the creation hasn't been
+                replayed yet.
+        """
+        with self._lock:
+            resolved = self._resolved(note_id)
+        return resolved if resolved > 0 else None
+
+    @property
+    def pending(self) -> int:
+        """`int`: Number of operations waiting to be replayed."""
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+
+    def flush(self) -> List[BatchItem]:
+        """Replay journaled operations until the outbox is empty or the server
+        fails, see `NotesOutbox.last_error`.
+
+        Returns:
+            List[BatchItem]: Outcome of every replayed operation, in the order they
+                completed.
+        """
+        done: List[BatchItem] = []
+        error: Optional[Exception] = None
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            pending: Dict[Future, _Entry] = {}
+            while True:
+                if error is None:
+                    for entry in self._ready(self.max_workers - len(pending)):
+                        pending[executor.submit(self._replay, entry)] = entry
+                if not pending:
+                    break
+
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    entry = pending.pop(future)
+                    try:
+                        item = future.result()
+                    except Exception as e:
+                        # Transient or unexpected, keep the operation and stop, to
+                        # not reorder operations
+                        error = e
+                        with self._lock:
+                            self._in_flight.discard(entry.seq)
+                        continue
+
+                    done.append(item)
+                    if not item.ok:
+                        self.failed.append(item)
+
+        self.last_error = error
+        return done
+
+    def _ready(self, limit: int) -> List[_Entry]:
+        """Claim up to `limit` operations that can be replayed now, the oldest
+        pending one of every note not already in flight."""
+        if limit < 1:
+            return []
+
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT seq, operation, note_id, note, if_match FROM outbox '
+                'ORDER BY seq'
+            ).fetchall()
+
+            entries = [self._entry(row) for row in rows]
+            busy = {entry.note_id for entry in entries if entry.seq in self._in_flight}
+            ready: List[_Entry] = []
+            for entry in entries:
+                if len(ready) >= limit:
+                    break
+                if entry.note_id not in busy:
+                    ready.append(entry)
+                # Later operations on the same note wait for this one
+                busy.add(entry.note_id)
+
+            self._in_flight.update(entry.seq for entry in ready)
+        return ready
+
+    def _replay(self, entry: _Entry) -> BatchItem:
+        """Send `entry` to the server and remove it from the journal, unless it
+        failed transiently, see `NotesOutbox._transient`, or unexpectedly."""
+        note_id = self.resolve(entry.note_id) or entry.note_id
+        item: Union[Note, int] = note_id
+        try:
+            if entry.operation == 'delete':
+                self.api.delete_note(note_id)
+                result = None
+            else:
+                item = Note.from_dict({**(entry.note or {}), 'id': note_id})
+                if entry.operation == 'create':
+                    item.id = None
+                    result = self.api.create_note(item)
+                    item.id = entry.note_id
+                else:
+                    result = self.api.update_note(item, if_match=entry.if_match)
+        except _TRANSIENT_ERRORS + _PERMANENT_ERRORS as e:
+            if self._transient(entry, e):
+                raise
+            self._done(entry, None)
+            return BatchItem(item, error=e)
+
+        self._done(entry, result.id if entry.operation == 'create' else None)
+        return BatchItem(item, result)
+
+    def _transient(self, entry: _Entry, error: Exception) -> bool:
+        """Whether `entry` should be replayed again after failing with `error`."""
+        if not isinstance(error, _TRANSIENT_ERRORS):
+            return False
+        if entry.operation != 'create' or isinstance(
+            error, InvalidNextcloudCredentials
+        ):
+            return True
+        # Replaying a creation the server may have processed duplicates the note
+        if isinstance(error, ServerUnavailable):
+            policy = self.api.retry or RetryPolicy()
+            return error.status_code in policy.unprocessed_status_codes
+        return _is_connect_error(error)
+
+    def _done(self, entry: _Entry, created_id: Optional[int]) -> None:
+        """Remove the replayed `entry`, mapping its temporary ID to `created_id`."""
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM outbox WHERE seq = ?', (entry.seq,))
+            if created_id is not None:
+                self._connection.execute(
+                    'UPDATE temp_ids SET note_id = ? WHERE id = ?',
+                    (created_id, -entry.note_id),
+                )
+                # Operations journaled while the creation was in flight
+                self._connection.execute(
+                    'UPDATE outbox SET note_id = ? WHERE note_id = ?',
+                    (created_id, entry.note_id),
+                )
+            self._in_flight.discard(entry.seq)
+
+    def _resolved(self, note_id: int) -> int:
+        """Server assigned ID of a temporary ID if known, `note_id` otherwise."""
+        if note_id > 0:
+            return note_id
+        row = self._connection.execute(
+            'SELECT note_id FROM temp_ids WHERE id = ?', (-note_id,)
+        ).fetchone()
+        return row[0] if row and row[0] is not None else note_id
+
+    def _pending_entries(self, note_id: int) -> List[_Entry]:
+        """Operations on `note_id` that aren't in flight."""
+        rows = self._connection.execute(
+            'SELECT seq, operation, note_id, note, if_match FROM outbox '
+            'WHERE note_id = ? ORDER BY seq',
+            (note_id,),
+        ).fetchall()
+        return [
+            entry
+            for entry in map(self._entry, rows)
+            if entry.seq not in self._in_flight
+        ]
+
+    def _append(
+        self, operation: str, note_id: int, note: Optional[Note], if_match: bool
+    ) -> None:
+        self._connection.execute(
+            'INSERT INTO outbox (operation, note_id, note, if_match) '
+            'VALUES (?, ?, ?, ?)',
+            (
+                operation,
+                note_id,
+                json.dumps(self._note_json(note)) if note else None,
+                if_match,
+            ),
+        )
+
+    def _drop(self, entries: Iterable[_Entry]) -> None:
+        self._connection.executemany(
+            'DELETE FROM outbox WHERE seq = ?', [(entry.seq,) for entry in entries]
+        )
+
+    @staticmethod
+    def _note_json(note: Note) -> Dict[str, Any]:
+        note_dict = note.to_dict()
+        del note_dict['id']
+        return {**note_dict, 'etag': note.etag}
+
+    @staticmethod
+    def _entry(row: tuple) -> _Entry:
+        seq, operation, note_id, note, if_match = row
+        return _Entry(
+            seq, operation, note_id, json.loads(note) if note else None, bool(if_match)
+        )
+
+    def start(self) -> None:
+        """Replay operations in a background thread as they are journaled."""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._wakeup.set()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.retry_interval if self.last_error else None)
+            self._wakeup.clear()
+            if not self._stopped.is_set():
+                try:
+                    self.flush()
+                except Exception as e:
+                    # Keep replaying, e.g. after the journal failed once
+                    self.last_error = e
+
+    def stop(self) -> None:
+        """Stop the background thread after the operations in flight, pending
+        operations stay in the journal."""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+
+    def close(self) -> None:
+        """Stop replaying and close the journal."""
+        self.stop()
+        self._connection.close()
+
+    def __enter__(self) -> NotesOutbox:
+        self.start()
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f'<NotesOutbox [{self.api.hostname}, {self.pending} pending]>'
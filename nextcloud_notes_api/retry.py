@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from random import uniform
+from typing import FrozenSet, Optional
+
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'))
+"""Methods that can be repeated without changing the outcome."""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait according to a `Retry-After` header.
+
+    Args:
+        value (str, optional): Header value, either seconds or an HTTP date.
+
+    Returns:
+        Optional[float]: Seconds to wait, None if `value` is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date is None:  # pragma: no cover, Python < 3.10
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """When and how long to wait before repeating a failed request.
+
+    Idempotent requests, see `IDEMPOTENT_METHODS`, are retried on connection errors,
+    timeouts and any of `RetryPolicy.status_codes`. Other requests, i.e. creating a
+    note, are only retried if the server can't have processed them: when the
+    connection couldn't be established, or on one of
+    `RetryPolicy.unprocessed_status_codes`.
+
+    Waits grow exponentially with "full jitter", a random time between zero and the
+    exponential backoff, which spreads out retries of many clients. A `Retry-After`
+    header sent by the server takes precedence.
+    """
+
+    max_retries: int = 3
+    """`int`: Maximum number of retries per request."""
+    backoff_factor: float = 0.5
+    """`float`: Backoff before the n-th retry is `backoff_factor * 2 ** n` seconds."""
+    max_backoff: float = 30.0
+    """`float`: Upper bound of the exponential backoff, in seconds."""
+    jitter: bool = True
+    """`bool`: Whether to wait a random time of up to the backoff."""
+    max_elapsed: Optional[float] = 60.0
+    """`float`: Don't retry once a request would take longer than this in total,
+    in seconds. None for no limit."""
+    status_codes: FrozenSet[int] = frozenset((429, 502, 503, 504))
+    """`FrozenSet[int]`: Status codes to retry idempotent requests on."""
+    unprocessed_status_codes: FrozenSet[int] = frozenset((429,))
+    """`FrozenSet[int]`: Status codes to retry all requests on, since the server
+    rejected them before processing."""
+
+    def retries(
+        self, method: str, status_code: Optional[int], *, connect_error: bool = False
+    ) -> bool:
+        """Whether a failed request should be retried.
+
+        Args:
+            method (str): HTTP method of the request.
+            status_code (int, optional): Status of the response, None if the
+                request failed without one.
+            connect_error (bool, optional): Whether the request failed because the
+                connection couldn't be established. Defaults to False.
+
+        Returns:
+            bool: Whether to retry.
+        """
+        if method.upper() in IDEMPOTENT_METHODS:
+            return status_code is None or status_code in self.status_codes
+        if status_code is None:
+            return connect_error
+        return status_code in self.unprocessed_status_codes
+
+    def backoff(self, retry: int, retry_after: Optional[str] = None) -> float:
+        """Seconds to wait before the `retry`-th retry, counting from 0.
+
+        Args:
+            retry (int): Number of retries done so far.
+            retry_after (str, optional): `Retry-After` header of the failed
+                response. Defaults to None.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        server_backoff = parse_retry_after(retry_after)
+        if server_backoff is not None:
+            return server_backoff
+
+        backoff = min(self.max_backoff, self.backoff_factor * 2**retry)
+        return uniform(0, backoff) if self.jitter else backoff
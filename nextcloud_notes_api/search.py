@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import json
+import re
+from collections import Counter
+from dataclasses import dataclass
+from math import log
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Set, Union
+
+from .note import Note
+
+_TOKEN = re.compile(r'\w+')
+
+_FIELD_WEIGHTS = (('title', 3.0), ('category', 2.0), ('content', 1.0))
+"""Term frequencies are multiplied by these, so title matches rank highest."""
+
+
+def _tokens(text: Optional[str]) -> List[str]:
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+def _trigrams(text: Optional[str]) -> Set[str]:
+    # Padding makes short words and word starts count
+    padded = f'  {(text or "").lower()} '
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class SearchResult:
+    """A note matching a `NoteIndex` query."""
+
+    note_id: int
+    """`int`: ID of the matching note."""
+    title: Optional[str]
+    """`str`: Title of the matching note."""
+    score: float
+    """`float`: Relevance, higher is better."""
+
+
+class NoteIndex:
+    """Local full-text and fuzzy title index over notes.
+
+    Title, category and content are indexed in an inverted index, titles also by
+    their trigrams for typo tolerant lookups. Pass the index as `index` to
+    `NotesApi` to keep it up to date with notes created, updated and deleted
+    through it.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        # token -> note id -> weighted term frequency
+        self._postings: Dict[str, Dict[int, float]] = {}
+        # trigram -> note ids
+        self._trigram_postings: Dict[str, Set[int]] = {}
+        self._terms: Dict[int, Dict[str, float]] = {}
+        self._titles: Dict[int, Optional[str]] = {}
+        self._title_trigram_counts: Dict[int, int] = {}
+
+    def add(self, note: Note) -> None:
+        """Index `note`, replacing a previously indexed version of it.
+
+        Args:
+            note (Note): Note to index, `Note.id` has to be set.
+
+        Raises:
+            ValueError: `Note.id` is not set.
+        """
+        if not note.id:
+            raise ValueError(f'Note id not set {note}')
+
+        terms: Counter = Counter()
+        for field, weight in _FIELD_WEIGHTS:
+            for token in _tokens(getattr(note, field)):
+                terms[token] += weight
+
+        with self._lock:
+            self._remove(note.id)
+            self._insert(note.id, note.title, dict(terms))
+
+    def add_all(self, notes: Iterable[Note]) -> None:
+        """Index all of `notes`, see `NoteIndex.add`.
+
+        Args:
+            notes (Iterable[Note]): Notes to index.
+        """
+        for note in notes:
+            self.add(note)
+
+    def remove(self, note_id: int) -> None:
+        """Drop note `note_id` from the index, if present.
+
+        Args:
+            note_id (int): ID of the note to drop.
+        """
+        with self._lock:
+            self._remove(note_id)
+
+    def _insert(
+        self, note_id: int, title: Optional[str], terms: Dict[str, float]
+    ) -> None:
+        self._terms[note_id] = terms
+        self._titles[note_id] = title
+        for token, frequency in terms.items():
+            self._postings.setdefault(token, {})[note_id] = frequency
+
+        trigrams = _trigrams(title)
+        self._title_trigram_counts[note_id] = len(trigrams)
+        for trigram in trigrams:
+            self._trigram_postings.setdefault(trigram, set()).add(note_id)
+
+    def _remove(self, note_id: int) -> None:
+        terms = self._terms.pop(note_id, None)
+        if terms is None:
+            return
+
+        for token in terms:
+            postings = self._postings[token]
+            del postings[note_id]
+            if not postings:
+                del self._postings[token]
+        for trigram in _trigrams(self._titles.pop(note_id)):
+            postings = self._trigram_postings[trigram]
+            postings.discard(note_id)
+            if not postings:
+                del self._trigram_postings[trigram]
+        del self._title_trigram_counts[note_id]
+
+    def search(self, query: str, *, limit: Optional[int] = 10) -> List[SearchResult]:
+        """Notes containing any word of `query`, ranked by TF-IDF.
+
+        Args:
+            query (str): Words to search for.
+            limit (int, optional): Maximum number of results, None for all.
+                Defaults to 10.
+
+        Returns:
+            List[SearchResult]: Matching notes, best match first.
+        """
+        scores: Counter = Counter()
+        with self._lock:
+            note_count = len(self._terms)
+            for token in set(_tokens(query)):
+                postings = self._postings.get(token)
+                if not postings:
+                    continue
+                idf = log(1 + note_count / len(postings))
+                for note_id, frequency in postings.items():
+                    scores[note_id] += frequency * idf
+
+            return [
+                SearchResult(note_id, self._titles[note_id], score)
+                for note_id, score in scores.most_common(limit)
+            ]
+
+    def fuzzy_title(
+        self, query: str, *, limit: Optional[int] = 10, min_similarity: float = 0.3
+    ) -> List[SearchResult]:
+        """Notes whose title is similar to `query`, tolerating typos.
+
+        Similarity is the Jaccard index of the trigram sets of `query` and the
+        title.
+
+        Args:
+            query (str): Title to look for.
+            limit (int, optional): Maximum number of results, None for all.
+                Defaults to 10.
+            min_similarity (float, optional): Minimum similarity between 0 and 1.
+                Defaults to 0.3.
+
+        Returns:
+            List[SearchResult]: Matching notes, most similar first.
+        """
+        query_trigrams = _trigrams(query)
+        shared: Counter = Counter()
+        with self._lock:
+            for trigram in query_trigrams:
+                shared.update(self._trigram_postings.get(trigram, ()))
+
+            results = []
+            for note_id, count in shared.items():
+                title_trigrams = self._title_trigram_counts[note_id]
+                similarity = count / (len(query_trigrams) + title_trigrams - count)
+                if similarity >= min_similarity:
+                    results.append(
+                        SearchResult(note_id, self._titles[note_id], similarity)
+                    )
+
+        results.sort(key=lambda result: result.score, reverse=True)
+        return results[:limit]
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Persist the index to a JSON file at `path`.
+
+        Args:
+            path (Union[str, Path]): File to write to.
+        """
+        with self._lock:
+            documents = [
+                [note_id, self._titles[note_id], terms]
+                for note_id, terms in self._terms.items()
+            ]
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(documents, file)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> NoteIndex:
+        """Restore an index saved with `NoteIndex.save`.
+
+        Args:
+            path (Union[str, Path]): File to read from.
+
+        Returns:
+            NoteIndex: The restored index.
+        """
+        with open(path, encoding='utf-8') as file:
+            documents = json.load(file)
+
+        index = cls()
+        for note_id, title, terms in documents:
+            index._insert(note_id, title, terms)
+        return index
+
+    def __contains__(self, note_id: object) -> bool:
+        return note_id in self._terms
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def __repr__(self) -> str:
+        return f'<NoteIndex [{len(self)} notes]>'
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from threading import Event, Lock
+from typing import Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class _Call(Generic[T]):
+    """A call in flight, followers wait for `_Call.done`."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[T]):
+    """Coalesces concurrent calls with the same key into a single call.
+
+    The first thread calling `SingleFlight.do` with a key runs the function, threads
+    calling with the same key meanwhile wait for it and receive its result or
+    exception. Results are shared, so they have to be immutable or copied by the
+    callers.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._calls: Dict[Hashable, _Call[T]] = {}
+
+    def do(self, key: Hashable, function: Callable[[], T]) -> T:
+        """Call `function`, unless a call with `key` is already in flight.
+
+        Args:
+            key (Hashable): Identifies calls that may share a result.
+            function (Callable[[], T]): Produces the result.
+
+        Returns:
+            T: Result of `function`, either from this or a concurrent call.
+
+        Raises:
+            BaseException: Whatever `function` raised.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result  # type: ignore
+
+        try:
+            call.result = function()
+            return call.result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def __len__(self) -> int:
+        """Number of calls in flight."""
+        return len(self._calls)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    overload,
+)
+
+from .note import Note
+
+_Record = Tuple[
+    Optional[str],
+    Optional[str],
+    Optional[str],
+    Optional[bool],
+    Optional[int],
+    Optional[float],
+    Optional[str],
+]
+
+
+_FIELDS = ('title', 'content', 'category', 'favorite', 'id', 'modified', 'etag')
+
+
+class NoteSnapshot(Sequence[Note]):
+    """Immutable sequence of notes that can be shared without copying.
+
+    Notes are stored as plain tuples. Every access creates a new `Note`, so changing
+    a returned note never affects the snapshot or anyone else holding it.
+    """
+
+    __slots__ = ('_records',)
+
+    def __init__(self, note_dicts: Iterable[Mapping[str, Any]] = ()):
+        """
+        Args:
+            note_dicts (Iterable[Mapping[str, Any]], optional): Notes as returned by
+                the API, see `Note.to_dict`. Defaults to ().
+        """
+        self._records: Tuple[_Record, ...] = tuple(
+            (
+                note_dict.get('title'),
+                note_dict.get('content'),
+                note_dict.get('category'),
+                note_dict.get('favorite'),
+                note_dict.get('id'),
+                note_dict.get('modified'),
+                note_dict.get('etag'),
+            )
+            for note_dict in note_dicts
+        )
+
+    @classmethod
+    def from_notes(cls, notes: Iterable[Note]) -> NoteSnapshot:
+        """Create a snapshot of `notes`.
+
+        Args:
+            notes (Iterable[Note]): Notes to take a snapshot of.
+
+        Returns:
+            NoteSnapshot: Snapshot of `notes`.
+        """
+        if isinstance(notes, NoteSnapshot):
+            return notes
+        return cls({**note.to_dict(), 'etag': note.etag} for note in notes)
+
+    def to_dicts(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over the notes as `dict`s, without creating `Note` objects.
+
+        Yields:
+            Dict[str, Any]: Note attributes, see `Note.to_dict`, including `etag`.
+        """
+        for record in self._records:
+            yield dict(zip(_FIELDS, record))
+
+    @staticmethod
+    def _note(record: _Record) -> Note:
+        title, content, category, favorite, note_id, modified, etag = record
+        return Note(
+            title,
+            content,
+            category=category,
+            favorite=favorite,
+            id=note_id,
+            modified=modified,
+            etag=etag,
+        )
+
+    @overload
+    def __getitem__(self, index: int) -> Note:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> NoteSnapshot:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Note, NoteSnapshot]:
+        if isinstance(index, slice):
+            snapshot = NoteSnapshot()
+            snapshot._records = self._records[index]
+            return snapshot
+        return self._note(self._records[index])
+
+    def __iter__(self) -> Iterator[Note]:
+        return map(self._note, self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __repr__(self) -> str:
+        return f'<NoteSnapshot [{len(self)} notes]>'
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import codecs
+from json import JSONDecodeError, JSONDecoder
+from typing import Any, Iterable, Iterator, Tuple
+
+_WHITESPACE = ' \t\n\r'
+_NUMBER_START = '-0123456789'
+_NUMBER_CHARS = '0123456789+-.eE'
+
+# Parser states, what is expected next
+_START = 0
+"""The opening bracket."""
+_FIRST = 1
+"""The first element or the closing bracket."""
+_ELEMENT = 2
+"""An element, after a comma."""
+_SEPARATOR = 3
+"""A comma or the closing bracket."""
+_ENDED = 4
+"""Nothing but whitespace."""
+
+_decoder = JSONDecoder()
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """Parse a JSON array incrementally, yielding each element once it is complete.
+
+    Only the element being parsed is buffered, so memory stays proportional to the
+    largest element instead of the whole array.
+
+    Args:
+        chunks (Iterable[bytes]): UTF-8 encoded JSON array, in arbitrary pieces.
+
+    Yields:
+        Any: The decoded elements of the array.
+
+    Raises:
+        ValueError: The input is not a JSON array, or it is incomplete.
+        JSONDecodeError: The array is malformed, e.g. `[1,,2]`.
+    """
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    position = 0
+    state = _START
+    # Parsing an incomplete element is retried once the buffer has doubled, so
+    # large elements spread over many chunks are parsed a bounded number of times
+    retry_at = 0
+
+    for chunk, final in _with_final(chunks):
+        buffer = buffer[position:] + text_decoder.decode(chunk, final)
+        position = 0
+        if state == _ENDED:
+            _expect_end(buffer)
+            buffer = ''
+            continue
+        if len(buffer) < retry_at and not final:
+            continue
+
+        while True:
+            position = _skip_whitespace(buffer, position)
+            if position == len(buffer):
+                break
+            char = buffer[position]
+
+            if state == _START:
+                if char != '[':
+                    raise ValueError(f'Expected a JSON array, got {buffer[:20]!r}')
+                state = _FIRST
+                position += 1
+                continue
+            if char == ']' and state in (_FIRST, _SEPARATOR):
+                state = _ENDED
+                position += 1
+                _expect_end(buffer[position:])
+                break
+            if state == _SEPARATOR:
+                if char != ',':
+                    raise JSONDecodeError("Expecting ',' delimiter", buffer, position)
+                state = _ELEMENT
+                position += 1
+                continue
+            if char in ',]':
+                raise JSONDecodeError('Expecting value', buffer, position)
+
+            if char in _NUMBER_START and not final:
+                # Numbers aren't delimited, the next chunk might continue them
+                token_end = position
+                while token_end < len(buffer) and buffer[token_end] in _NUMBER_CHARS:
+                    token_end += 1
+                if token_end == len(buffer):
+                    break
+            try:
+                element, end = _decoder.raw_decode(buffer, position)
+            except JSONDecodeError:
+                if final:
+                    raise
+                retry_at = 2 * (len(buffer) - position)
+                break
+            retry_at = 0
+            state = _SEPARATOR
+            position = end
+            yield element
+
+    if state != _ENDED:
+        raise ValueError('Incomplete JSON array')
+
+
+def _with_final(chunks: Iterable[bytes]) -> Iterator[Tuple[bytes, bool]]:
+    """Pair every chunk with whether it is the last one, ending with an empty
+    final chunk."""
+    for chunk in chunks:
+        yield chunk, False
+    yield b'', True
+
+
+def _skip_whitespace(buffer: str, position: int) -> int:
+    """Position of the next character in `buffer` that isn't whitespace."""
+    while position < len(buffer) and buffer[position] in _WHITESPACE:
+        position += 1
+    return position
+
+
+def _expect_end(rest: str) -> None:
+    """Make sure only whitespace follows the end of the array."""
+    if rest.strip(_WHITESPACE):
+        raise ValueError(f'Unexpected data after JSON array: {rest[:20]!r}')
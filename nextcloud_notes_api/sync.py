@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import AbstractSet, Dict, List, Optional, Set, Tuple, Union
+
+from .api_exceptions import NoteNotFound
+from .api_wrapper import NotesApi
+from .note import Note
+
+
+@dataclass
+class SyncChanges:
+    """IDs of notes that changed on the server during a `NotesSync.sync`."""
+
+    added: Set[int] = field(default_factory=set)
+    """`Set[int]`: Notes that are new."""
+    changed: Set[int] = field(default_factory=set)
+    """`Set[int]`: Notes that have been modified."""
+    deleted: Set[int] = field(default_factory=set)
+    """`Set[int]`: Notes that have been deleted."""
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.deleted)
+
+
+def _fetch_changes(
+    api: NotesApi,
+    known: AbstractSet[int],
+    prune_before: Union[int, datetime],
+    *,
+    chunk_size: Optional[int] = None,
+) -> Tuple[Dict[int, Note], Set[int]]:
+    """Fetch the notes modified since `prune_before` and find deleted notes.
+
+    Notes modified in the same second as `prune_before` are transferred again, to
+    not miss any of them. Pruned notes that aren't `known` are fetched one by one,
+    they may have been created with an old modification time.
+
+    Args:
+        api (NotesApi): API to fetch from.
+        known (AbstractSet[int]): IDs of notes known from previous syncs.
+        prune_before (Union[int, datetime]): Only transfer notes modified since,
+            see `NotesApi.get_all_notes`.
+        chunk_size (int, optional): Fetch the note list in chunks of this size.
+            Defaults to None.
+
+    Returns:
+        Tuple[Dict[int, Note], Set[int]]: Transferred notes by ID and IDs of
+            `known` notes that have been deleted.
+
+    Raises:
+        InvalidNextcloudCredentials: Invalid credentials supplied.
+    """
+    remote: Dict[int, Note] = {}
+    unknown: List[int] = []
+    seen: Set[int] = set()
+    for note in api.get_all_notes(chunk_size=chunk_size, prune_before=prune_before):
+        seen.add(note.id)
+        # Pruned notes only have their id set
+        if note.modified is not None:
+            remote[note.id] = note
+        elif note.id not in known:
+            unknown.append(note.id)
+
+    for note_id in unknown:
+        try:
+            remote[note_id] = api.get_single_note(note_id)
+        except NoteNotFound:
+            seen.discard(note_id)
+
+    return remote, known - seen
+
+
+class NotesSync:
+    """Keeps a local copy of all notes up to date with as little transfer as
+    possible.
+
+    After the first sync, only notes modified since the newest known note are
+    transferred in full, all other notes are only listed by ID (`pruneBefore`).
+    """
+
+    def __init__(
+        self,
+        api: NotesApi,
+        notes: Optional[Dict[int, Note]] = None,
+        *,
+        chunk_size: Optional[int] = None,
+    ):
+        """
+        Args:
+            api (NotesApi): API to sync with.
+            notes (Dict[int, Note], optional): Previously synced notes by ID, see
+                `NotesSync.load`. Defaults to None.
+            chunk_size (int, optional): Fetch the note list in chunks of this size,
+                see `NotesApi.get_all_notes`. Defaults to None.
+        """
+        self.api = api
+        """`NotesApi`: API to sync with."""
+        self.notes: Dict[int, Note] = notes if notes is not None else {}
+        """`Dict[int, Note]`: Local copy of all notes by ID."""
+        self.chunk_size = chunk_size
+        """`int`: Fetch the note list in chunks of this size."""
+
+    @property
+    def last_modified(self) -> Optional[datetime]:
+        """`datetime.datetime`: Modification time of the newest known note."""
+        return max(
+            (note.modified for note in self.notes.values() if note.modified),
+            default=None,
+        )
+
+    def sync(self) -> SyncChanges:
+        """Fetch all changes since the last sync and apply them to `NotesSync.notes`.
+
+        Returns:
+            SyncChanges: Notes that have been added, changed or deleted.
+
+        Raises:
+            InvalidNextcloudCredentials: Invalid credentials supplied.
+        """
+        last_modified = self.last_modified
+        remote, deleted = _fetch_changes(
+            self.api,
+            self.notes.keys(),
+            last_modified if last_modified else 0,
+            chunk_size=self.chunk_size,
+        )
+
+        changes = SyncChanges(deleted=deleted)
+        for note in remote.values():
+            local = self.notes.get(note.id)
+            if local is None:
+                changes.added.add(note.id)
+            elif local != note:
+                changes.changed.add(note.id)
+            self.notes[note.id] = note
+
+        for note_id in changes.deleted:
+            del self.notes[note_id]
+
+        return changes
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Persist `NotesSync.notes` to a JSON file at `path`.
+
+        Args:
+            path (Union[str, Path]): File to write to.
+        """
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump([note.to_dict() for note in self.notes.values()], file)
+
+    @classmethod
+    def load(cls, api: NotesApi, path: Union[str, Path], **kwargs) -> NotesSync:
+        """Restore a `NotesSync` saved with `NotesSync.save`.
+
+        A missing file yields an empty `NotesSync`.
+
+        Args:
+            api (NotesApi): API to sync with.
+            path (Union[str, Path]): File to read from.
+            kwargs: Passed on to `NotesSync`.
+
+        Returns:
+            NotesSync: The restored sync state.
+        """
+        try:
+            with open(path, encoding='utf-8') as file:
+                note_dicts = json.load(file)
+        except FileNotFoundError:
+            note_dicts = []
+
+        notes = {note_dict['id']: Note.from_dict(note_dict) for note_dict in note_dicts}
+        return cls(api, notes, **kwargs)
+
+    def __repr__(self) -> str:
+        return f'<NotesSync [{self.api.hostname}, {len(self.notes)} notes]>'
@@ -1,15 +1,20 @@
+import gc
+from copy import copy
 from typing import ContextManager, Iterator
 
 import pytest
 from requests_mock.mocker import Mocker as RequestsMocker
 
+from benchmarks.server import MockNotesServer
 from nextcloud_notes_api import (
     InsufficientNextcloudStorage,
     InvalidNextcloudCredentials,
     InvalidNoteId,
     Note,
+    NoteConflict,
     NoteNotFound,
     NotesApi,
+    UnexpectedStatusCode,
 )
 
 
@@ -87,8 +92,32 @@ def test_notes_api_get_all_notes_etag_cache(
         assert list(notes) == example_note_list
 
 
+def test_notes_api_get_all_notes_etag_cache_not_shared(
+    example_note: Note, notes_api: NotesApi, requests_mock: RequestsMocker
+):
+    requests_mock.get(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes',
+        [
+            {'json': [example_note.to_dict()], 'headers': {'ETag': 'some hash'}},
+            {'status_code': 304},
+        ],
+    )
+
+    notes = notes_api.get_all_notes()
+    notes[0].title = 'Eggs'
+
+    assert isinstance(notes, list) and notes[0] is notes[0]
+    assert notes[0].title == 'Eggs'
+    assert list(notes_api.get_all_notes()) == [example_note]
+
+
 @pytest.mark.parametrize(
-    'status_code, expectation', [(401, pytest.raises(InvalidNextcloudCredentials))]
+    'status_code, expectation',
+    [
+        (401, pytest.raises(InvalidNextcloudCredentials)),
+        (403, pytest.raises(UnexpectedStatusCode)),
+        (500, pytest.raises(UnexpectedStatusCode)),
+    ],
 )
 def test_notes_api_get_all_notes_response_status_exceptions(
     status_code: int,
@@ -105,6 +134,74 @@ def test_notes_api_get_all_notes_response_status_exceptions(
         notes_api.get_all_notes()
 
 
+def test_notes_api_get_all_notes_chunked(
+    notes_api: NotesApi, requests_mock: RequestsMocker
+):
+    url = f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes'
+    requests_mock.get(
+        f'{url}?chunkSize=2',
+        complete_qs=True,
+        json=[Note(id=1).to_dict(), Note(id=2).to_dict()],
+        headers={'X-Notes-Chunk-Cursor': 'cursor'},
+    )
+    requests_mock.get(
+        f'{url}?chunkSize=2&chunkCursor=cursor',
+        complete_qs=True,
+        json=[Note(id=3).to_dict()],
+    )
+
+    notes = notes_api.get_all_notes(chunk_size=2)
+    # Only the first chunk is fetched until the iterator is consumed
+    assert requests_mock.call_count == 1
+
+    assert [note.id for note in notes] == [1, 2, 3]
+    assert requests_mock.call_count == 2
+
+
+def test_notes_api_get_all_notes_chunked_invalid_credentials(
+    notes_api: NotesApi, requests_mock: RequestsMocker
+):
+    requests_mock.get(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes',
+        status_code=401,
+    )
+
+    with pytest.raises(InvalidNextcloudCredentials):
+        notes_api.get_all_notes(chunk_size=2)
+
+
+def test_notes_api_get_all_notes_exclude(
+    example_note: Note, notes_api: NotesApi, requests_mock: RequestsMocker
+):
+    url = f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes'
+    listed = example_note.to_dict()
+    del listed['content']
+    requests_mock.get(f'{url}?exclude=content', complete_qs=True, json=[listed])
+    requests_mock.get(f'{url}/1337', json=example_note.to_dict())
+
+    notes = list(notes_api.get_all_notes(exclude=['content']))
+    assert requests_mock.call_count == 1
+    assert notes[0].title == example_note.title
+
+    assert notes[0].content == example_note.content
+    assert requests_mock.call_count == 2
+
+
+def test_notes_api_get_all_notes_exclude_chunked(
+    notes_api: NotesApi, requests_mock: RequestsMocker
+):
+    requests_mock.get(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes?exclude=content,category&chunkSize=5',  # noqa: E501
+        complete_qs=True,
+        json=[{'id': 1, 'title': 'Spam'}],
+    )
+
+    notes = list(notes_api.get_all_notes(chunk_size=5, exclude=['content', 'category']))
+
+    assert [(note.id, note.category) for note in notes] == [(1, None)]
+    assert not notes[0].content_loaded
+
+
 def test_notes_api_get_single_note(
     example_note: Note, notes_api: NotesApi, requests_mock: RequestsMocker
 ):
@@ -161,6 +258,7 @@ def test_notes_api_create_note(
     'status_code, expectation',
     [
         (401, pytest.raises(InvalidNextcloudCredentials)),
+        (500, pytest.raises(UnexpectedStatusCode)),
         (507, pytest.raises(InsufficientNextcloudStorage)),
     ],
 )
@@ -275,3 +373,195 @@ def test_notes_api_repr():
     api = NotesApi('coma64', 'pass', 'horse.agency')
 
     assert repr(api) == '<NotesApi [horse.agency]>'
+
+
+def test_notes_api_session_reused(notes_api: NotesApi, requests_mock: RequestsMocker):
+    requests_mock.get(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes/1337',
+        json=Note(id=1337).to_dict(),
+    )
+    session = notes_api._session
+
+    notes_api.get_single_note(1337)
+    notes_api.get_single_note(1337)
+
+    assert notes_api._session is session
+    assert all(
+        request.headers['OCS-APIRequest'] == 'true'
+        for request in requests_mock.request_history
+    )
+
+
+def test_notes_api_timeout(requests_mock: RequestsMocker):
+    notes_api = NotesApi('coma64', 'pass', 'horse.agency', timeout=(3.05, 27))
+    requests_mock.delete(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes/1337'
+    )
+
+    notes_api.delete_note(1337)
+
+    assert requests_mock.last_request.timeout == (3.05, 27)
+
+
+def test_notes_api_pool_config():
+    notes_api = NotesApi(
+        'coma64', 'pass', 'horse.agency', pool_maxsize=32, pool_block=True
+    )
+    adapter = notes_api._session.get_adapter(f'https://{notes_api.hostname}')
+
+    assert adapter._pool_maxsize == 32
+    assert adapter._pool_block
+
+
+def test_notes_api_context_manager(monkeypatch):
+    closed = []
+
+    with NotesApi('coma64', 'pass', 'horse.agency') as notes_api:
+        monkeypatch.setattr(notes_api._session, 'close', lambda: closed.append(True))
+
+    assert closed == [True]
+
+
+def test_notes_api_etag_header_not_shared(
+    notes_api: NotesApi, requests_mock: RequestsMocker
+):
+    requests_mock.get(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes',
+        json=[],
+        headers={'ETag': 'some hash'},
+    )
+    requests_mock.delete(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes/1337'
+    )
+
+    notes_api.get_all_notes()
+    notes_api.delete_note(1337)
+
+    assert 'If-None-Match' not in requests_mock.last_request.headers
+
+
+def test_notes_api_update_note_if_match(
+    example_note: Note, notes_api: NotesApi, requests_mock: RequestsMocker
+):
+    example_note.etag = 'some hash'
+    requests_mock.put(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes/1337',
+        request_headers={'If-Match': '"some hash"'},
+        json={**example_note.to_dict(), 'etag': 'new hash'},
+    )
+
+    assert notes_api.update_note(example_note, if_match=True).etag == 'new hash'
+
+
+def test_notes_api_update_note_if_match_conflict(
+    example_note: Note, notes_api: NotesApi, requests_mock: RequestsMocker
+):
+    example_note.etag = 'some hash'
+    requests_mock.put(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes/1337',
+        status_code=412,
+    )
+
+    with pytest.raises(NoteConflict):
+        notes_api.update_note(example_note, if_match=True)
+
+
+def test_notes_api_update_note_if_match_etag_not_set(
+    example_note: Note, notes_api: NotesApi
+):
+    with pytest.raises(ValueError):
+        notes_api.update_note(example_note, if_match=True)
+
+
+def test_notes_api_get_single_note_etag(
+    example_note: Note, notes_api: NotesApi, requests_mock: RequestsMocker
+):
+    requests_mock.get(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes/1337',
+        json=example_note.to_dict(),
+        headers={'ETag': '"some hash"'},
+    )
+
+    assert notes_api.get_single_note(1337).etag == 'some hash'
+
+
+def test_notes_api_bind_notes(example_note: Note, requests_mock: RequestsMocker):
+    notes_api = NotesApi('coma64', 'pass', 'horse.agency', bind_notes=True)
+    requests_mock.get(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes/1337',
+        json=example_note.to_dict(),
+    )
+
+    note = notes_api.get_single_note(1337)
+    assert note.api is notes_api
+    assert note.dirty_fields == frozenset()
+
+
+def test_notes_api_flush(
+    example_note: Note, notes_api: NotesApi, requests_mock: RequestsMocker
+):
+    url = f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes'
+    first = notes_api.bind(example_note)
+    second = notes_api.bind(copy(example_note))
+    clean = notes_api.bind(Note('Clean', id=1))
+    new = notes_api.bind(Note('New'))
+
+    first.title = 'Eggs'
+    first.title = 'Ham'
+    second.favorite = False
+    server_note = Note('Ham', 'Bacon', category='Todo', favorite=False, id=1337)
+    requests_mock.put(f'{url}/1337', json=server_note.to_dict())
+    requests_mock.post(url, json=Note('New', id=2).to_dict())
+
+    result = notes_api.flush().wait()
+
+    assert len(result.items) == 2
+    assert all(item.ok for item in result.items)
+    puts = [r for r in requests_mock.request_history if r.method == 'PUT']
+    assert len(puts) == 1
+    assert sorted(puts[0].text.split('&')) == ['favorite=False', 'title=Ham']
+    assert first == second == server_note
+    assert not first.dirty_fields and not second.dirty_fields
+    assert new.id == 2
+    assert clean.id == 1
+
+    assert notes_api.flush().wait().items == []
+
+
+def test_notes_api_flush_unreferenced_notes():
+    with MockNotesServer(5, content_size=10) as server:
+        notes_api = NotesApi('coma64', 'pass', server.url, bind_notes=True)
+        for note in notes_api.get_all_notes():
+            note.category = 'Archive'
+        notes_api.bind(Note('New'))
+        del note
+        gc.collect()
+
+        assert len(notes_api.flush().wait().succeeded) == 6
+        assert {note['category'] for note in server.store.notes.values()} == {
+            'Archive',
+            '',
+        }
+        assert notes_api._changed_notes == {}
+
+
+def test_note_save_refresh_delete(
+    example_note: Note, notes_api: NotesApi, requests_mock: RequestsMocker
+):
+    url = f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes/1337'
+    note = notes_api.bind(example_note)
+    server_dict = note.to_dict()
+
+    note.content = 'Ham'
+    requests_mock.put(url, status_code=404)
+    with pytest.raises(NoteNotFound):
+        note.save()
+    assert note.dirty_fields == {'content'}
+
+    requests_mock.get(url, json=server_dict)
+    assert note.refresh().content == 'Bacon'
+    assert not note.dirty_fields
+
+    requests_mock.delete(url)
+    note.delete()
+    assert note.api is None
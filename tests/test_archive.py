@@ -0,0 +1,77 @@
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+
+from benchmarks.server import MockNotesServer
+from nextcloud_notes_api import (
+    ImportCheckpoint,
+    Note,
+    NoteArchive,
+    NoteArchiveWriter,
+    NotesApi,
+)
+
+
+def _notes(count: int):
+    return [Note(f'Note {i}', 'x' * i, id=i, modified=i) for i in range(1, count + 1)]
+
+
+def test_note_archive_roundtrip(tmp_path: Path):
+    path = tmp_path / 'notes.jsonl.gz'
+    with NoteArchiveWriter(path, block_size=4) as writer:
+        assert writer.write_all(_notes(10)) == 10
+
+    archive = NoteArchive(path)
+
+    assert list(archive) == _notes(10)
+    assert len(archive) == 10 and 7 in archive
+    assert archive.get(7) == _notes(10)[6]
+    assert len(set(archive.offsets.values())) == 3
+    with pytest.raises(KeyError):
+        archive.get(11)
+
+    # A plain gzip compressed JSON lines file
+    with gzip.open(path, 'rt') as file:
+        assert [json.loads(line)['id'] for line in file] == list(range(1, 11))
+
+
+def test_import_checkpoint(tmp_path: Path):
+    path = tmp_path / 'checkpoint'
+    ImportCheckpoint(path).record(1, 101)
+    with open(path, 'a') as file:
+        file.write('2\t1')
+
+    checkpoint = ImportCheckpoint(path)
+
+    assert 1 in checkpoint and 2 not in checkpoint
+    assert checkpoint.imported == {1: 101}
+
+    checkpoint.record(2, 102)
+    assert ImportCheckpoint(path).imported == {1: 101, 2: 102}
+
+
+def test_notes_api_export_import(tmp_path: Path):
+    path = tmp_path / 'notes.jsonl.gz'
+    with MockNotesServer(30, content_size=10) as source:
+        api = NotesApi('coma64', 'pass', source.url)
+        assert api.export_notes(path, chunk_size=7, block_size=8) == 30
+
+    archive = NoteArchive(path)
+    assert archive.get(12).title == 'Note 12'
+
+    with MockNotesServer(0) as target:
+        api = NotesApi('coma64', 'pass', target.url)
+        checkpoint = tmp_path / 'checkpoint'
+        ImportCheckpoint(checkpoint).record(1, 1)
+
+        result = api.import_notes(path, max_workers=4, checkpoint=checkpoint).wait()
+
+        assert len(result.succeeded) == 29
+        assert {item.item.id for item in result.items} == set(range(2, 31))
+        assert len(target.store.notes) == 29
+        assert len(ImportCheckpoint(checkpoint).imported) == 30
+
+        # Everything has been imported already
+        assert not api.import_notes(path, checkpoint=checkpoint).wait().items
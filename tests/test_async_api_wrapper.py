@@ -0,0 +1,182 @@
+import asyncio
+from typing import Callable, ContextManager
+from urllib.parse import parse_qs
+
+import pytest
+
+from nextcloud_notes_api import (
+    AsyncNotesApi,
+    InsufficientNextcloudStorage,
+    InvalidNextcloudCredentials,
+    InvalidNoteId,
+    Note,
+    NoteNotFound,
+)
+
+httpx = pytest.importorskip('httpx')
+
+
+def _mock_api(handler: Callable, **kwargs) -> AsyncNotesApi:
+    api = AsyncNotesApi('coma64', 'pass', 'horse.agency', **kwargs)
+    api._client._transport = httpx.MockTransport(handler)
+    return api
+
+
+def test_async_notes_api_get_api_version():
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == '/ocs/v2.php/cloud/capabilities'
+        return httpx.Response(
+            200,
+            json={
+                'ocs': {
+                    'data': {'capabilities': {'notes': {'api_version': ['0.2', '1.0']}}}
+                }
+            },
+        )
+
+    api = _mock_api(handler)
+
+    assert asyncio.run(api.get_api_version()) == '1.0'
+
+
+def test_async_notes_api_get_all_notes_etag_cache(example_note: Note):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.headers['If-None-Match'] == 'some hash':
+            return httpx.Response(304)
+        return httpx.Response(
+            200, json=[example_note.to_dict()], headers={'ETag': 'some hash'}
+        )
+
+    api = _mock_api(handler)
+
+    async def fetch_twice():
+        return list(await api.get_all_notes()), list(await api.get_all_notes())
+
+    first, second = asyncio.run(fetch_twice())
+
+    assert first == second == [example_note]
+    assert [request.headers['If-None-Match'] for request in requests] == [
+        '',
+        'some hash',
+    ]
+
+
+def test_async_notes_api_get_single_note(example_note: Note):
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == '/index.php/apps/notes/api/v1/notes/1337'
+        assert request.headers['OCS-APIRequest'] == 'true'
+        return httpx.Response(200, json=example_note.to_dict())
+
+    api = _mock_api(handler)
+
+    assert asyncio.run(api.get_single_note(1337)) == example_note
+
+
+def test_async_notes_api_create_note(example_note: Note):
+    server_note = example_note.to_dict()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.method == 'POST'
+        assert 'id' not in parse_qs(request.content.decode())
+        return httpx.Response(200, json=server_note)
+
+    api = _mock_api(handler)
+    example_note.id = None
+
+    created = asyncio.run(api.create_note(example_note))
+
+    assert created.id == 1337
+
+
+def test_async_notes_api_update_note(example_note: Note):
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.method == 'PUT'
+        assert request.url.path == '/index.php/apps/notes/api/v1/notes/1337'
+        return httpx.Response(200, json=example_note.to_dict())
+
+    api = _mock_api(handler)
+
+    assert asyncio.run(api.update_note(example_note)) == example_note
+
+
+def test_async_notes_api_update_note_id_not_set(example_note: Note):
+    api = _mock_api(lambda _: httpx.Response(200))
+    example_note.id = None
+
+    with pytest.raises(ValueError):
+        asyncio.run(api.update_note(example_note))
+
+
+def test_async_notes_api_delete_note():
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.method == 'DELETE'
+        return httpx.Response(200)
+
+    api = _mock_api(handler)
+
+    asyncio.run(api.delete_note(1337))
+
+
+@pytest.mark.parametrize(
+    'status_code, expectation',
+    [
+        (400, pytest.raises(InvalidNoteId)),
+        (401, pytest.raises(InvalidNextcloudCredentials)),
+        (404, pytest.raises(NoteNotFound)),
+        (507, pytest.raises(InsufficientNextcloudStorage)),
+    ],
+)
+def test_async_notes_api_update_note_response_status_exceptions(
+    status_code: int, expectation: ContextManager, example_note: Note
+):
+    api = _mock_api(lambda _: httpx.Response(status_code))
+
+    with expectation:
+        asyncio.run(api.update_note(example_note))
+
+
+def test_async_notes_api_max_concurrency(example_note: Note):
+    in_flight = 0
+    max_in_flight = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, json=example_note.to_dict())
+
+    api = _mock_api(handler, max_concurrency=3)
+
+    async def fan_out():
+        return await asyncio.gather(*(api.get_single_note(1337) for _ in range(12)))
+
+    notes = asyncio.run(fan_out())
+
+    assert len(notes) == 12
+    assert max_in_flight == 3
+
+
+def test_async_notes_api_context_manager():
+    async def use():
+        async with _mock_api(lambda _: httpx.Response(200)) as api:
+            pass
+        return api._client.is_closed
+
+    assert asyncio.run(use())
+
+
+def test_async_notes_api_timeout():
+    api = AsyncNotesApi('coma64', 'pass', 'horse.agency', timeout=(3.05, 27))
+
+    assert api._httpx_timeout() == httpx.Timeout(27, connect=3.05)
+
+
+def test_async_notes_api_repr():
+    api = AsyncNotesApi('coma64', 'pass', 'horse.agency')
+
+    assert repr(api) == '<AsyncNotesApi [horse.agency]>'
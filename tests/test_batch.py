@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pytest
+from requests_mock.mocker import Mocker as RequestsMocker
+
+from nextcloud_notes_api import (
+    BatchResult,
+    InsufficientNextcloudStorage,
+    Note,
+    NoteNotFound,
+    NotesApi,
+)
+from nextcloud_notes_api.batch import run_batch
+
+
+@pytest.fixture
+def notes_api():
+    return NotesApi('coma64', 'pass', 'horse.agency')
+
+
+def test_run_batch_limits_concurrency():
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    def operation(note_id: int) -> Note:
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        return Note(id=note_id)
+
+    result = run_batch(operation, range(20), 4)
+
+    assert sorted(item.result.id for item in result) == list(range(20))
+    assert max_in_flight == 4
+
+
+def test_run_batch_invalid_max_workers():
+    with pytest.raises(ValueError):
+        run_batch(lambda note_id: None, [1], 0)
+
+
+def test_run_batch_starts_right_away():
+    started = threading.Event()
+
+    def operation(note_id: int) -> Note:
+        started.set()
+        return Note(id=note_id)
+
+    result = run_batch(operation, [1], 1)
+
+    assert started.wait(5)
+    assert [item.result.id for item in result] == [1]
+
+
+def test_run_batch_unexpected_error():
+    def operation(note_id: int) -> Note:
+        raise RuntimeError(note_id)
+
+    result = run_batch(operation, [1], 1)
+
+    with pytest.raises(RuntimeError):
+        result.wait()
+
+
+def test_batch_result_replays_items():
+    result = run_batch(lambda note_id: Note(id=note_id), [1, 2, 3], 2)
+    first = list(result)
+
+    assert list(result) == first
+    assert len(result.succeeded) == 3
+    assert result.failed == []
+
+
+def test_notes_api_create_notes(notes_api: NotesApi, requests_mock: RequestsMocker):
+    requests_mock.post(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes',
+        [
+            {'json': Note('Spam', id=1).to_dict()},
+            {'status_code': 507},
+            {'json': Note('Spam', id=2).to_dict()},
+        ],
+    )
+
+    result = notes_api.create_notes(
+        (Note('Spam') for _ in range(3)), max_workers=1
+    ).wait()
+
+    assert isinstance(result, BatchResult)
+    assert [item.result.id for item in result.succeeded] == [1, 2]
+    assert [type(item.error) for item in result.failed] == [
+        InsufficientNextcloudStorage
+    ]
+
+
+def test_notes_api_update_notes(notes_api: NotesApi, requests_mock: RequestsMocker):
+    for note_id in (1, 2):
+        requests_mock.put(
+            f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes/{note_id}',  # noqa: E501
+            json=Note('Spam', id=note_id).to_dict(),
+        )
+
+    result = notes_api.update_notes([Note('Spam', id=1), Note('Spam', id=2), Note()])
+
+    assert sorted(item.result.id for item in result.succeeded) == [1, 2]
+    assert [type(item.error) for item in result.failed] == [ValueError]
+
+
+def test_notes_api_delete_notes(notes_api: NotesApi, requests_mock: RequestsMocker):
+    requests_mock.delete(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes/1'
+    )
+    requests_mock.delete(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes/2',
+        status_code=404,
+    )
+
+    result = notes_api.delete_notes([1, 2])
+
+    assert [item.item for item in result.succeeded] == [1]
+    assert [item.item for item in result.failed] == [2]
+    assert isinstance(result.failed[0].error, NoteNotFound)
+
+
+def test_notes_api_delete_notes_not_iterated(
+    notes_api: NotesApi, requests_mock: RequestsMocker
+):
+    requests_mock.delete(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes/1'
+    )
+
+    notes_api.delete_notes([1])
+
+    deadline = time.monotonic() + 5
+    while not requests_mock.called and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert requests_mock.call_count == 1
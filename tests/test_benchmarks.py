@@ -0,0 +1,32 @@
+import json
+
+from benchmarks.run import run
+from benchmarks.server import MockNotesServer
+from nextcloud_notes_api import Note, NotesApi
+
+
+def test_mock_notes_server():
+    with MockNotesServer(30, content_size=10) as server:
+        api = NotesApi('coma64', 'pass', server.url)
+
+        assert api.get_api_version() == '1.2'
+        assert len(api.get_all_notes()) == 30
+        assert len(list(api.get_all_notes(chunk_size=7))) == 30
+        assert len(list(api.get_all_notes(stream=True, chunk_size=7))) == 30
+        assert api.get_single_note(3).content == 'x' * 10
+
+        note = api.create_note(Note('Spam', 'Bacon', favorite=True))
+        assert note.id == 31 and note.favorite
+        note.content = 'Eggs'
+        assert api.update_note(note).content == 'Eggs'
+        api.delete_note(note.id)
+        assert len(api.get_all_notes()) == 30
+
+
+def test_benchmarks_run():
+    report = run([20], suites=['list', 'single'], rounds=1)
+
+    json.dumps(report)
+    names = {result['name'] for result in report['results']}
+    assert {'get_all_notes', 'get_single_note_etag_hit', 'create_note'} <= names
+    assert all(result['notes'] == 20 for result in report['results'])
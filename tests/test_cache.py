@@ -0,0 +1,154 @@
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from requests_mock.mocker import Mocker as RequestsMocker
+
+from nextcloud_notes_api import (
+    CacheEntry,
+    MemoryNoteCache,
+    Note,
+    NotesApi,
+    SqliteNoteCache,
+)
+
+
+@pytest.fixture
+def sqlite_cache(tmp_path: Path) -> SqliteNoteCache:
+    return SqliteNoteCache(tmp_path / 'notes.db')
+
+
+def test_memory_note_cache_lru_eviction():
+    cache = MemoryNoteCache(2)
+    for note_id in (1, 2):
+        cache.set_note(CacheEntry('hash', Note(id=note_id)))
+
+    # Touch note 1, so note 2 is evicted next
+    cache.get_note(1)
+    cache.set_note(CacheEntry('hash', Note(id=3)))
+
+    assert cache.get_note(2) is None
+    assert [cache.get_note(note_id).value.id for note_id in (1, 3)] == [1, 3]
+    assert len(cache) == 2
+
+
+def test_memory_note_cache_copies(example_note: Note):
+    cache = MemoryNoteCache()
+    cache.set_note(CacheEntry('hash', example_note))
+
+    example_note.title = 'Eggs'
+    cache.get_note(1337).value.content = 'Eggs'
+
+    assert cache.get_note(1337).value.title == 'Spam'
+    assert cache.get_note(1337).value.content == 'Bacon'
+
+
+def test_memory_note_cache_disabled(example_note: Note):
+    cache = MemoryNoteCache(0)
+    cache.set_note(CacheEntry('hash', example_note))
+
+    assert cache.get_note(1337) is None
+
+
+def test_sqlite_note_cache_notes(example_note: Note, sqlite_cache: SqliteNoteCache):
+    assert sqlite_cache.get_notes() is None
+
+    synced = datetime.fromtimestamp(100_000)
+    sqlite_cache.set_notes(CacheEntry('some hash', [example_note], synced))
+
+    assert sqlite_cache.get_notes() == CacheEntry('some hash', [example_note], synced)
+
+
+def test_sqlite_note_cache_note(example_note: Note, sqlite_cache: SqliteNoteCache):
+    assert sqlite_cache.get_note(1337) is None
+
+    sqlite_cache.set_note(CacheEntry('some hash', example_note))
+    entry = sqlite_cache.get_note(1337)
+    assert (entry.etag, entry.value) == ('some hash', example_note)
+
+    sqlite_cache.delete_note(1337)
+    assert sqlite_cache.get_note(1337) is None
+
+
+def test_sqlite_note_cache_keeps_note_etag(
+    example_note: Note, sqlite_cache: SqliteNoteCache
+):
+    example_note.etag = 'note hash'
+    sqlite_cache.set_note(CacheEntry('some hash', example_note))
+
+    assert sqlite_cache.get_note(1337).value.etag == 'note hash'
+
+
+def test_sqlite_note_cache_persists(example_note: Note, tmp_path: Path):
+    SqliteNoteCache(tmp_path / 'notes.db').set_note(CacheEntry('hash', example_note))
+
+    assert SqliteNoteCache(tmp_path / 'notes.db').get_note(1337).value == example_note
+
+
+def test_notes_api_get_all_notes_persistent_cache(
+    example_note: Note, sqlite_cache: SqliteNoteCache, requests_mock: RequestsMocker
+):
+    url = 'https://horse.agency/index.php/apps/notes/api/v1/notes'
+    requests_mock.get(url, json=[example_note.to_dict()], headers={'ETag': 'some hash'})
+    NotesApi('coma64', 'pass', 'horse.agency', cache=sqlite_cache).get_all_notes()
+
+    # A new instance revalidates the persisted notes instead of downloading them
+    requests_mock.get(
+        url, request_headers={'If-None-Match': 'some hash'}, status_code=304
+    )
+    api = NotesApi('coma64', 'pass', 'horse.agency', cache=sqlite_cache)
+
+    assert list(api.get_all_notes()) == [example_note]
+
+
+def test_notes_api_get_single_note_persistent_cache(
+    example_note: Note, sqlite_cache: SqliteNoteCache, requests_mock: RequestsMocker
+):
+    url = 'https://horse.agency/index.php/apps/notes/api/v1/notes/1337'
+    api = NotesApi('coma64', 'pass', 'horse.agency', cache=sqlite_cache)
+    requests_mock.get(url, json=example_note.to_dict(), headers={'ETag': 'some hash'})
+    api.get_single_note(1337)
+
+    requests_mock.get(
+        url, request_headers={'If-None-Match': 'some hash'}, status_code=304
+    )
+
+    assert api.get_single_note(1337) == example_note
+
+
+def test_notes_api_delete_note_invalidates_cache(
+    example_note: Note, sqlite_cache: SqliteNoteCache, requests_mock: RequestsMocker
+):
+    sqlite_cache.set_note(CacheEntry('some hash', example_note))
+    requests_mock.delete('https://horse.agency/index.php/apps/notes/api/v1/notes/1337')
+
+    NotesApi('coma64', 'pass', 'horse.agency', cache=sqlite_cache).delete_note(1337)
+
+    assert sqlite_cache.get_note(1337) is None
+
+
+def test_notes_api_get_single_note_memory_cache(
+    example_note: Note, requests_mock: RequestsMocker
+):
+    url = 'https://horse.agency/index.php/apps/notes/api/v1/notes/1337'
+    api = NotesApi('coma64', 'pass', 'horse.agency', note_cache_size=1)
+    requests_mock.get(url, json=example_note.to_dict(), headers={'ETag': 'some hash'})
+    api.get_single_note(1337)
+
+    requests_mock.get(
+        url, request_headers={'If-None-Match': 'some hash'}, status_code=304
+    )
+
+    assert api.get_single_note(1337) == example_note
+
+
+def test_notes_api_get_single_note_etag_caching_disabled(
+    example_note: Note, requests_mock: RequestsMocker
+):
+    url = 'https://horse.agency/index.php/apps/notes/api/v1/notes/1337'
+    api = NotesApi('coma64', 'pass', 'horse.agency', etag_caching=False)
+    requests_mock.get(url, json=example_note.to_dict(), headers={'ETag': 'some hash'})
+    api.get_single_note(1337)
+    api.get_single_note(1337)
+
+    assert 'If-None-Match' not in requests_mock.last_request.headers
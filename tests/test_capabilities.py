@@ -0,0 +1,200 @@
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+import pytest
+from requests_mock.mocker import Mocker as RequestsMocker
+
+from nextcloud_notes_api import (
+    AsyncNotesApi,
+    Capabilities,
+    Note,
+    NoteConflict,
+    NotesApi,
+    SqliteNoteCache,
+)
+
+_NOTES_URL = 'https://horse.agency/index.php/apps/notes/api/v1/notes'
+_CAPABILITIES_URL = 'https://horse.agency/ocs/v2.php/cloud/capabilities'
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+requires_httpx = pytest.mark.skipif(httpx is None, reason='requires httpx')
+
+
+def _capabilities_json(api_versions: List[str]):
+    return {
+        'ocs': {
+            'data': {
+                'capabilities': {
+                    'notes': {'api_version': api_versions, 'version': '4.0.0'}
+                }
+            }
+        }
+    }
+
+
+def _negotiating_api(requests_mock: RequestsMocker, api_versions: List[str]):
+    requests_mock.get(_CAPABILITIES_URL, json=_capabilities_json(api_versions))
+    return NotesApi('coma64', 'pass', 'horse.agency', negotiate=True)
+
+
+def test_capabilities_features():
+    assert Capabilities(('0.2',)).features == frozenset()
+    assert Capabilities(('0.2', '1.0')).features == {'exclude', 'prune_before'}
+    assert Capabilities(('1.2',)).features == {'exclude', 'prune_before', 'chunking'}
+    assert 'if_match' in Capabilities(('0.2', '1.3')).features
+
+    capabilities = Capabilities(('1.10', '1.2', '0.2'))
+    assert capabilities.api_version == '1.10'
+    assert capabilities.supports('1.3')
+    assert not capabilities.supports('2.0')
+    assert Capabilities(()).api_version is None
+
+
+def test_capabilities_from_response():
+    capabilities = Capabilities.from_response(_capabilities_json(['0.2', '1.0']))
+
+    assert capabilities.api_versions == ('0.2', '1.0')
+    assert capabilities.version == '4.0.0'
+    assert Capabilities.from_dict(capabilities.to_dict()) == capabilities
+
+
+def test_capabilities_is_stale():
+    old = Capabilities(('1.0',), fetched=datetime.now() - timedelta(hours=2))
+
+    assert old.is_stale(3600)
+    assert not old.is_stale(None)
+    assert not Capabilities(('1.0',)).is_stale(3600)
+
+
+def test_notes_api_capabilities_cached(requests_mock: RequestsMocker):
+    requests_mock.get(_CAPABILITIES_URL, json=_capabilities_json(['0.2', '1.2']))
+    notes_api = NotesApi('coma64', 'pass', 'horse.agency')
+
+    assert notes_api.get_api_version() == '1.2'
+    assert notes_api.capabilities().features >= {'chunking'}
+    assert requests_mock.call_count == 1
+
+    notes_api.capabilities(refresh=True)
+    assert requests_mock.call_count == 2
+
+
+def test_notes_api_capabilities_ttl(requests_mock: RequestsMocker):
+    requests_mock.get(_CAPABILITIES_URL, json=_capabilities_json(['1.0']))
+    notes_api = NotesApi('coma64', 'pass', 'horse.agency', capabilities_ttl=0)
+
+    notes_api.capabilities()
+    notes_api.capabilities()
+
+    assert requests_mock.call_count == 2
+
+
+def test_notes_api_capabilities_persisted(
+    requests_mock: RequestsMocker, tmp_path: Path
+):
+    requests_mock.get(_CAPABILITIES_URL, json=_capabilities_json(['0.2', '1.3']))
+    NotesApi(
+        'coma64', 'pass', 'horse.agency', cache=SqliteNoteCache(tmp_path / 'notes.db')
+    ).capabilities()
+
+    notes_api = NotesApi(
+        'coma64', 'pass', 'horse.agency', cache=SqliteNoteCache(tmp_path / 'notes.db')
+    )
+
+    assert notes_api.get_api_version() == '1.3'
+    assert requests_mock.call_count == 1
+
+
+def test_notes_api_negotiate_list_params(requests_mock: RequestsMocker):
+    notes_api = _negotiating_api(requests_mock, ['0.2', '1.2'])
+    requests_mock.get(_NOTES_URL, json=[{'id': 1, 'content': 'Spam'}])
+
+    list(notes_api.get_all_notes(chunk_size=10, exclude=('content',)))
+
+    query = requests_mock.last_request.qs
+    assert query == {'chunksize': ['10'], 'exclude': ['content']}
+
+
+def test_notes_api_negotiate_unsupported_list_params(requests_mock: RequestsMocker):
+    notes_api = _negotiating_api(requests_mock, ['0.2'])
+    requests_mock.get(
+        _NOTES_URL, json=[{'id': 1, 'content': 'Spam'}], headers={'ETag': '"hash"'}
+    )
+
+    notes = notes_api.get_all_notes(exclude=('content',), prune_before=100)
+
+    assert not requests_mock.last_request.qs
+    assert notes[0].content == 'Spam'
+
+
+def test_notes_api_negotiate_chunking_uses_etag_cache(requests_mock: RequestsMocker):
+    notes_api = _negotiating_api(requests_mock, ['0.2', '1.0'])
+    requests_mock.get(
+        _NOTES_URL, json=[{'id': 1, 'content': 'Spam'}], headers={'ETag': '"hash"'}
+    )
+
+    notes = notes_api.get_all_notes(chunk_size=10)
+
+    assert not isinstance(notes, list)
+    assert [note.id for note in notes] == [1]
+    assert not requests_mock.last_request.qs
+    assert notes_api._etag_cache.etag == '"hash"'
+
+
+def test_notes_api_negotiate_if_match(requests_mock: RequestsMocker):
+    notes_api = _negotiating_api(requests_mock, ['0.2', '1.3'])
+    requests_mock.put(f'{_NOTES_URL}/1', json={'id': 1}, headers={'ETag': '"new"'})
+
+    notes_api.update_note(Note(id=1, etag='old'), if_match=True)
+
+    assert requests_mock.last_request.headers['If-Match'] == '"old"'
+
+
+def test_notes_api_negotiate_if_match_unsupported(requests_mock: RequestsMocker):
+    notes_api = _negotiating_api(requests_mock, ['0.2', '1.0'])
+    requests_mock.get(f'{_NOTES_URL}/1', json={'id': 1}, headers={'ETag': '"old"'})
+    requests_mock.put(f'{_NOTES_URL}/1', json={'id': 1}, headers={'ETag': '"new"'})
+
+    notes_api.update_note(Note(id=1, etag='old'), if_match=True)
+
+    assert 'If-Match' not in requests_mock.last_request.headers
+    with pytest.raises(NoteConflict):
+        notes_api.update_note(Note(id=1, etag='older'), if_match=True)
+    assert requests_mock.last_request.method == 'GET'
+
+
+def test_notes_api_negotiate_if_match_no_etag(requests_mock: RequestsMocker):
+    notes_api = _negotiating_api(requests_mock, ['0.2', '1.0'])
+    requests_mock.get(f'{_NOTES_URL}/1', json={'id': 1, 'modified': 100})
+    requests_mock.put(f'{_NOTES_URL}/1', json={'id': 1, 'modified': 200})
+
+    notes_api.update_note(Note(id=1, modified=100, etag='old'), if_match=True)
+
+    assert requests_mock.last_request.method == 'PUT'
+    with pytest.raises(NoteConflict):
+        notes_api.update_note(Note(id=1, modified=50, etag='old'), if_match=True)
+    with pytest.raises(NoteConflict):
+        notes_api.update_note(Note(id=1, etag='old'), if_match=True)
+
+
+@requires_httpx
+def test_async_notes_api_capabilities_cached():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json=_capabilities_json(['0.2', '1.0']))
+
+    async def main():
+        async with AsyncNotesApi('coma64', 'pass', 'horse.agency') as api:
+            api._client._transport = httpx.MockTransport(handler)
+            assert await api.get_api_version() == '1.0'
+            assert (await api.capabilities()).version == '4.0.0'
+
+    asyncio.run(main())
+    assert len(requests) == 1
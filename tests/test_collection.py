@@ -0,0 +1,91 @@
+from datetime import datetime
+
+import pytest
+from requests_mock.mocker import Mocker as RequestsMocker
+
+from nextcloud_notes_api import Note, NoteCollection, NotesApi, NoteSnapshot
+
+
+@pytest.fixture
+def collection() -> NoteCollection:
+    return NoteCollection(
+        [
+            {'id': 1, 'title': 'b', 'category': 'Todo', 'favorite': True},
+            {'id': 2, 'title': 'a', 'category': '', 'modified': 100_000},
+            {'id': 3, 'title': 'c', 'category': 'Todo', 'modified': 200_000},
+            {'id': 4, 'title': 'd', 'category': 'Work', 'favorite': True},
+        ]
+    )
+
+
+def test_note_collection_sequence(collection: NoteCollection):
+    assert len(collection) == 4
+    assert collection[-1] == Note('d', category='Work', favorite=True, id=4)
+    assert list(collection[1:3].ids) == [2, 3]
+    assert [note.id for note in collection] == [1, 2, 3, 4]
+
+
+def test_note_collection_columns(collection: NoteCollection):
+    assert list(collection.ids) == [1, 2, 3, 4]
+    assert collection.titles == ('b', 'a', 'c', 'd')
+    assert collection.categories == ('Todo', '', 'Todo', 'Work')
+    assert list(collection.favorites) == [1, 0, 0, 1]
+    assert list(collection.modified) == [0, 100_000, 200_000, 0]
+
+
+def test_note_collection_filter(collection: NoteCollection):
+    assert list(collection.filter(category='Todo').ids) == [1, 3]
+    assert list(collection.filter(category='Todo', favorite=True).ids) == [1]
+    assert list(collection.filter(category='Spam').ids) == []
+    assert list(collection.filter(favorite=False).ids) == [2, 3]
+    assert list(collection.filter(modified_after=150_000).ids) == [3]
+    assert list(
+        collection.filter(modified_before=datetime.fromtimestamp(150_000)).ids
+    ) == [1, 2, 4]
+    assert list(collection.filter(title=lambda title: title > 'b').ids) == [3, 4]
+
+
+def test_note_collection_sort(collection: NoteCollection):
+    assert list(collection.sort('title').ids) == [2, 1, 3, 4]
+    assert list(collection.sort('category').ids) == [2, 1, 3, 4]
+    assert list(collection.sort('modified', reverse=True).ids) == [3, 2, 1, 4]
+    assert list(collection.sort('favorite').ids) == [2, 3, 1, 4]
+
+    with pytest.raises(ValueError):
+        collection.sort('content')
+
+
+def test_note_collection_group_by_category(collection: NoteCollection):
+    groups = collection.group_by_category()
+
+    assert {category: list(notes.ids) for category, notes in groups.items()} == {
+        'Todo': [1, 3],
+        '': [2],
+        'Work': [4],
+    }
+    # Filtering a group keeps working with the shared category table
+    assert list(groups['Todo'].filter(category='Todo').ids) == [1, 3]
+
+
+def test_note_collection_from_notes(example_note: Note):
+    from_notes = NoteCollection.from_notes([example_note])
+    from_snapshot = NoteCollection.from_notes(NoteSnapshot.from_notes([example_note]))
+
+    assert list(from_notes) == list(from_snapshot) == [example_note]
+    assert NoteCollection.from_notes(from_notes) is from_notes
+
+
+def test_notes_api_get_all_notes_as_collection(
+    example_note: Note, requests_mock: RequestsMocker
+):
+    api = NotesApi('coma64', 'pass', 'horse.agency')
+    requests_mock.get(
+        'https://horse.agency/index.php/apps/notes/api/v1/notes',
+        json=[example_note.to_dict()],
+        headers={'ETag': 'some hash'},
+    )
+
+    notes = api.get_all_notes(as_collection=True)
+
+    assert isinstance(notes, NoteCollection)
+    assert list(notes) == [example_note]
@@ -0,0 +1,133 @@
+import asyncio
+import json
+from typing import List
+
+import pytest
+from requests import ConnectionError as RequestsConnectionError
+from requests_mock.mocker import Mocker as RequestsMocker
+
+from nextcloud_notes_api import (
+    AsyncNotesApi,
+    Histogram,
+    MetricsCollector,
+    Note,
+    NotesApi,
+    NotesApiHooks,
+    RequestEvent,
+)
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+requires_httpx = pytest.mark.skipif(httpx is None, reason='requires httpx')
+
+
+class RecordingHooks(NotesApiHooks):
+    def __init__(self):
+        self.events: List[object] = []
+
+    def on_request(self, event):
+        self.events.append(event)
+
+    def on_cache(self, event):
+        self.events.append(event)
+
+    def on_decode(self, event):
+        self.events.append(event)
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for value in range(1, 101):
+        histogram.record(value / 1000)
+
+    assert histogram.count == 100
+    assert histogram.mean == pytest.approx(0.0505)
+    assert histogram.percentile(50) == pytest.approx(0.050, rel=0.02)
+    assert histogram.percentile(99) == pytest.approx(0.099, rel=0.02)
+    assert histogram.percentile(100) == 0.1
+    assert Histogram().percentile(50) == 0
+
+
+def test_request_event_endpoint():
+    event = RequestEvent('GET', '/index.php/apps/notes/api/v1/notes/42', 200, 0, 0, 1)
+
+    assert event.endpoint == '/index.php/apps/notes/api/v1/notes/{id}'
+    assert event.download_time is None
+    event.response_time = 0.25
+    assert event.download_time == 0.75
+
+
+def test_notes_api_hooks(example_note: Note, requests_mock: RequestsMocker):
+    hooks = RecordingHooks()
+    metrics = MetricsCollector()
+    notes_api = NotesApi('coma64', 'pass', 'horse.agency', hooks=[hooks, metrics])
+    url = f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes'
+    requests_mock.get(
+        url,
+        [
+            {'json': [example_note.to_dict()], 'headers': {'ETag': '"a"'}},
+            {'status_code': 304},
+        ],
+    )
+
+    notes_api.get_all_notes()
+    notes_api.get_all_notes()
+
+    request, cache, decode = hooks.events[:3]
+    assert request.method == 'GET'
+    assert request.status_code == 200
+    assert request.response_bytes == len(json.dumps([example_note.to_dict()]))
+    assert request.duration >= 0
+    assert cache.cache == 'notes' and not cache.hit
+    assert decode.notes == 1
+    assert hooks.events[4].hit
+
+    assert metrics.hit_ratio() == 0.5
+    assert metrics.hit_ratio('note') == 0
+    summary = metrics.summary()
+    assert summary['requests']['GET /index.php/apps/notes/api/v1/notes']['count'] == 2
+    assert summary['statuses'] == {'200': 1, '304': 1}
+    assert summary['cache'] == {'notes': {'hits': 1, 'misses': 1}}
+    json.dumps(summary)
+
+    metrics.reset()
+    assert metrics.summary()['requests'] == {}
+
+
+def test_notes_api_hooks_request_error(requests_mock: RequestsMocker):
+    hooks = RecordingHooks()
+    notes_api = NotesApi('coma64', 'pass', 'horse.agency', hooks=[hooks])
+    requests_mock.delete(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes/1',
+        exc=RequestsConnectionError,
+    )
+
+    with pytest.raises(RequestsConnectionError):
+        notes_api.delete_note(1)
+
+    (event,) = hooks.events
+    assert event.status_code is None
+    assert isinstance(event.error, RequestsConnectionError)
+
+
+@requires_httpx
+def test_async_notes_api_hooks(example_note: Note):
+    metrics = MetricsCollector()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=example_note.to_dict(), headers={'ETag': 'a'})
+
+    api = AsyncNotesApi('coma64', 'pass', 'horse.agency', hooks=[metrics])
+    api._client._transport = httpx.MockTransport(handler)
+
+    asyncio.run(api.get_single_note(1337))
+
+    summary = metrics.summary()
+    assert (
+        summary['requests']['GET /index.php/apps/notes/api/v1/notes/{id}']['count'] == 1
+    )
+    assert summary['cache'] == {'note': {'hits': 0, 'misses': 1}}
+    assert summary['parse_time']['count'] == 1
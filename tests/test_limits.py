@@ -0,0 +1,81 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from time import monotonic
+
+import pytest
+from requests_mock.mocker import Mocker as RequestsMocker
+
+from nextcloud_notes_api import NotesApi, RequestLimiter
+
+
+def test_request_limiter_invalid():
+    with pytest.raises(ValueError):
+        RequestLimiter(0)
+    with pytest.raises(ValueError):
+        RequestLimiter(burst=0)
+    with pytest.raises(ValueError):
+        RequestLimiter(max_in_flight=0)
+
+
+def test_request_limiter_rate():
+    limiter = RequestLimiter(50, burst=2)
+
+    started = monotonic()
+    for _ in range(6):
+        with limiter.slot():
+            pass
+
+    # 2 requests pass right away, the others are spaced 1/50s apart
+    assert monotonic() - started >= 4 / 50 * 0.9
+    assert limiter.requests == 6
+    assert limiter.max_wait > 0
+    assert limiter.total_wait >= limiter.max_wait
+    assert limiter.mean_wait == limiter.total_wait / 6
+
+
+def test_request_limiter_max_in_flight():
+    limiter = RequestLimiter(max_in_flight=2)
+    release = Event()
+    most_in_flight = 0
+
+    def request():
+        nonlocal most_in_flight
+        with limiter.slot():
+            most_in_flight = max(most_in_flight, limiter.in_flight)
+            release.wait(1)
+
+    with ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(request) for _ in range(4)]
+        release.set()
+        for future in futures:
+            future.result()
+
+    assert most_in_flight <= 2
+    assert limiter.in_flight == 0
+
+
+def test_request_limiter_for_host():
+    limiter = RequestLimiter.for_host('limits.horse.agency', rate=10)
+
+    assert RequestLimiter.for_host('limits.horse.agency', rate=99) is limiter
+    assert limiter.rate == 10
+    assert RequestLimiter.for_host('other.horse.agency') is not limiter
+
+
+def test_notes_api_limiter(requests_mock: RequestsMocker):
+    limiter = RequestLimiter(max_in_flight=1)
+    apis = [
+        NotesApi(username, 'pass', 'horse.agency', limiter=limiter)
+        for username in ('coma64', 'spam')
+    ]
+    requests_mock.get(
+        'https://horse.agency/index.php/apps/notes/api/v1/notes',
+        json=[],
+        headers={'ETag': '"a"'},
+    )
+
+    for api in apis:
+        api.get_all_notes()
+
+    assert limiter.requests == 2
+    assert limiter.in_flight == 0
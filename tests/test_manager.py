@@ -0,0 +1,98 @@
+from pathlib import Path
+
+import pytest
+
+from benchmarks.server import MockNotesServer
+from nextcloud_notes_api import Account, AccountResult, AccountStatus, NotesSyncManager
+
+
+@pytest.fixture(scope='module')
+def server():
+    with MockNotesServer(20, content_size=10) as server:
+        yield server
+
+
+def _accounts(server: MockNotesServer, count: int):
+    return [Account(f'user{i}', 'pass', server.url) for i in range(count)]
+
+
+def test_account_status_update():
+    status = AccountStatus()
+    status.update(AccountResult('a', added=5), 3600)
+    assert status.synced == 3600 and status.change_rate == 0
+
+    status.update(AccountResult('a', changed=4), 7200)
+    assert status.change_rate == 2
+
+    status.update(AccountResult('a', error='Spam'), 7300)
+    assert status.errors == 1 and status.last_error == 'Spam'
+    assert status.synced == 7200
+
+
+def test_notes_sync_manager_schedule(tmp_path: Path):
+    accounts = [Account(name, 'pass', 'horse.agency') for name in 'abc']
+    manager = NotesSyncManager(accounts, tmp_path, processes=1)
+    manager.status['a@horse.agency'] = AccountStatus(synced=0, change_rate=1)
+    manager.status['b@horse.agency'] = AccountStatus(synced=3600, change_rate=10)
+
+    assert [a.username for a in manager.schedule(7200)] == ['c', 'a', 'b']
+
+    manager.priority = 'changes'
+    assert [a.username for a in manager.schedule(7200)] == ['c', 'b', 'a']
+
+
+def test_notes_sync_manager_processes_capped(tmp_path: Path):
+    manager = NotesSyncManager([], tmp_path, processes=16, max_connections_per_host=4)
+
+    assert manager.processes == 4
+
+
+def test_notes_sync_manager_invalid_args(tmp_path: Path):
+    with pytest.raises(ValueError):
+        NotesSyncManager([], tmp_path, priority='spam')
+    with pytest.raises(ValueError):
+        NotesSyncManager([], tmp_path, workers=0)
+
+
+def test_notes_sync_manager_sync_all(server: MockNotesServer, tmp_path: Path):
+    accounts = _accounts(server, 5)
+    broken = Account('broken', 'pass', 'http://127.0.0.1:1')
+    manager = NotesSyncManager([*accounts, broken], tmp_path, processes=1, workers=3)
+
+    results = {result.account: result for result in manager.sync_all()}
+
+    assert len(results) == 6
+    assert all(results[a.key].added == 20 for a in accounts)
+    assert 'ConnectionError' in results[broken.key].error
+    assert not manager.running
+
+    restored = NotesSyncManager([*accounts, broken], tmp_path, processes=1)
+    assert restored.status[accounts[0].key].synced
+    assert restored.status[broken.key].errors == 1
+    # The broken account has never been synced, so it comes first
+    assert restored.schedule()[0] == broken
+
+    # Notes are kept, so nothing changed since
+    assert all(
+        result.ok and not result.changes and result.notes == 20
+        for result in restored.sync_all()
+        if result.account != broken.key
+    )
+
+
+def test_notes_sync_manager_processes(server: MockNotesServer, tmp_path: Path):
+    manager = NotesSyncManager(_accounts(server, 6), tmp_path, processes=2, workers=2)
+
+    results = list(manager.sync_all())
+
+    assert len(results) == 6
+    assert all(result.ok and result.notes == 20 for result in results)
+
+
+def test_notes_sync_manager_stop_early(server: MockNotesServer, tmp_path: Path):
+    manager = NotesSyncManager(_accounts(server, 20), tmp_path, processes=1, workers=2)
+
+    for _ in manager.sync_all():
+        break
+
+    assert len(manager.status) < 20
@@ -0,0 +1,198 @@
+from pathlib import Path
+from time import time
+
+import pytest
+
+from benchmarks.server import MockNotesServer
+from nextcloud_notes_api import MirrorChanges, NotesApi, NotesMirror
+
+
+@pytest.fixture
+def server():
+    with MockNotesServer(3, content_size=10) as server:
+        yield server
+
+
+@pytest.fixture
+def mirror(server: MockNotesServer, tmp_path: Path) -> NotesMirror:
+    mirror = NotesMirror(NotesApi('coma64', 'pass', server.url), tmp_path)
+    mirror.sync()
+    return mirror
+
+
+def _edit_remote(server: MockNotesServer, note_id: int, **fields):
+    note = server.store.notes[note_id]
+    server.store.notes[note_id] = {**note, **fields, 'modified': int(time()) + 10}
+
+
+def test_notes_mirror_initial(server: MockNotesServer, tmp_path: Path):
+    mirror = NotesMirror(NotesApi('coma64', 'pass', server.url), tmp_path)
+
+    changes = mirror.sync()
+
+    assert changes == MirrorChanges(downloaded={1, 2, 3})
+    assert mirror.path(1) == tmp_path / 'Category 1' / 'Note 1.md'
+    assert mirror.path(1).read_text() == 'x' * 10
+    assert not mirror.sync()
+
+
+def test_notes_mirror_state_persisted(
+    server: MockNotesServer, mirror: NotesMirror, tmp_path: Path
+):
+    reopened = NotesMirror(mirror.api, tmp_path)
+
+    assert reopened.path(2) == mirror.path(2)
+    assert not reopened.sync()
+
+
+def test_notes_mirror_local_edit(server: MockNotesServer, mirror: NotesMirror):
+    mirror.path(1).write_text('Bacon and eggs')
+
+    assert mirror.sync() == MirrorChanges(uploaded={1})
+    assert server.store.notes[1]['content'] == 'Bacon and eggs'
+    assert not mirror.sync()
+
+
+def test_notes_mirror_local_touch(server: MockNotesServer, mirror: NotesMirror):
+    mirror.path(1).write_text('x' * 10)
+
+    assert not mirror.sync()
+
+
+def test_notes_mirror_local_edit_keeps_title(
+    server: MockNotesServer, mirror: NotesMirror, tmp_path: Path
+):
+    _edit_remote(server, 1, title='Meeting 10:30', category='Work:Home')
+    _edit_remote(server, 2, title='Meeting 10:30', category='Work:Home')
+    mirror.sync()
+    assert mirror.path(1) == tmp_path / 'Work_Home' / 'Meeting 10_30.md'
+    assert mirror.path(2) == tmp_path / 'Work_Home' / 'Meeting 10_30 (2).md'
+
+    mirror.path(1).write_text('Bacon')
+    mirror.path(2).write_text('Eggs')
+
+    assert mirror.sync() == MirrorChanges(uploaded={1, 2})
+    for note_id in (1, 2):
+        assert server.store.notes[note_id]['title'] == 'Meeting 10:30'
+        assert server.store.notes[note_id]['category'] == 'Work:Home'
+
+
+def test_notes_mirror_local_rename(
+    server: MockNotesServer, mirror: NotesMirror, tmp_path: Path
+):
+    (tmp_path / 'Work').mkdir()
+    mirror.path(2).rename(tmp_path / 'Work' / 'Spam.md')
+
+    assert mirror.sync() == MirrorChanges(uploaded={2})
+    assert server.store.notes[2]['title'] == 'Spam'
+    assert server.store.notes[2]['category'] == 'Work'
+    assert mirror.path(2) == tmp_path / 'Work' / 'Spam.md'
+    assert not (tmp_path / 'Category 2').exists()
+
+
+def test_notes_mirror_local_create_delete(
+    server: MockNotesServer, mirror: NotesMirror, tmp_path: Path
+):
+    mirror.path(3).unlink()
+    (tmp_path / 'Eggs.md').write_text('Bacon')
+
+    changes = mirror.sync()
+
+    assert changes.deleted_remote == {3} and 3 not in server.store.notes
+    (note_id,) = changes.created
+    assert server.store.notes[note_id]['title'] == 'Eggs'
+    assert server.store.notes[note_id]['content'] == 'Bacon'
+    assert mirror.path(note_id) == tmp_path / 'Eggs.md'
+
+
+def test_notes_mirror_local_delete_same_content(
+    server: MockNotesServer, mirror: NotesMirror
+):
+    # All notes of the server have the same content
+    for note_id in (1, 2):
+        mirror.path(note_id).unlink()
+
+    assert mirror.sync() == MirrorChanges(deleted_remote={1, 2})
+    assert set(server.store.notes) == {3}
+
+
+def test_notes_mirror_remote_changes(
+    server: MockNotesServer, mirror: NotesMirror, tmp_path: Path
+):
+    _edit_remote(server, 1, content='Eggs')
+    _edit_remote(server, 2, title='Ham', category='')
+    server.store.delete(3)
+
+    changes = mirror.sync()
+
+    assert changes == MirrorChanges(downloaded={1, 2}, deleted_local={3})
+    assert mirror.path(1).read_text() == 'Eggs'
+    assert mirror.path(2) == tmp_path / 'Ham.md'
+    assert not (tmp_path / 'Category 2').exists()
+    assert not (tmp_path / 'Category 3').exists()
+
+
+def test_notes_mirror_remote_rename_same_path(
+    server: MockNotesServer, mirror: NotesMirror, tmp_path: Path
+):
+    _edit_remote(server, 1, title='Note 1 ', category='Category 1 ')
+    assert not mirror.sync()
+    assert mirror.path(1) == tmp_path / 'Category 1' / 'Note 1.md'
+
+    mirror.path(1).write_text('Bacon')
+
+    assert mirror.sync() == MirrorChanges(uploaded={1})
+    assert server.store.notes[1]['title'] == 'Note 1 '
+    assert server.store.notes[1]['category'] == 'Category 1 '
+
+
+def test_notes_mirror_remote_old_note(server: MockNotesServer, mirror: NotesMirror):
+    note = server.store.save(None, {'title': 'Old', 'content': 'Spam'})
+    note['modified'] = 0
+
+    assert mirror.sync() == MirrorChanges(downloaded={note['id']})
+    assert mirror.path(note['id']).read_text() == 'Spam'
+
+
+def test_notes_mirror_conflict(server: MockNotesServer, mirror: NotesMirror):
+    _edit_remote(server, 1, content='Eggs')
+    mirror.path(1).write_text('Bacon')
+
+    changes = mirror.sync()
+
+    assert changes.downloaded == {1} and not changes.uploaded
+    assert mirror.path(1).read_text() == 'Eggs'
+    (conflict,) = changes.conflicts
+    assert conflict.read_text() == 'Bacon'
+    assert conflict.parent == mirror.path(1).parent
+
+
+def test_notes_mirror_title_collision(
+    server: MockNotesServer, mirror: NotesMirror, tmp_path: Path
+):
+    _edit_remote(server, 2, title='Note 1', category='Category 1')
+
+    mirror.sync()
+
+    assert mirror.path(1) == tmp_path / 'Category 1' / 'Note 1.md'
+    assert mirror.path(2) == tmp_path / 'Category 1' / 'Note 1 (2).md'
+    assert not mirror.sync()
+
+
+def test_notes_mirror_changed_paths(
+    server: MockNotesServer, mirror: NotesMirror, tmp_path: Path
+):
+    mirror.path(1).write_text('Bacon')
+    mirror.path(2).write_text('Eggs')
+
+    assert mirror.sync([mirror.path(1)]) == MirrorChanges(uploaded={1})
+    assert server.store.notes[2]['content'] == 'x' * 10
+
+    assert mirror.sync(['Category 2/Note 2.md']) == MirrorChanges(uploaded={2})
+
+
+def test_notes_mirror_ignores_other_files(mirror: NotesMirror, tmp_path: Path):
+    (tmp_path / 'image.png').write_bytes(b'')
+    (tmp_path / '.hidden.md').write_text('Spam')
+
+    assert not mirror.sync()
@@ -1,7 +1,10 @@
+from copy import copy
 from datetime import datetime
 
+import pytest
+
 import nextcloud_notes_api
-from nextcloud_notes_api import Note
+from nextcloud_notes_api import Note, NotesApi
 
 
 class DatetimeNowMock:
@@ -69,6 +72,70 @@ def test_note_init_unused_kwargs():
     assert note_dict == note.to_dict()
 
 
+def test_note_content_loader():
+    calls = []
+
+    def load() -> str:
+        calls.append(True)
+        return 'Bacon'
+
+    note = Note('Spam', content_loader=load)
+    assert not note.content_loaded
+
+    assert note.content == 'Bacon'
+    assert note.content == 'Bacon'
+    assert note.content_loaded
+    assert calls == [True]
+
+
+def test_note_content_loader_overridden():
+    note = Note('Spam', content_loader=lambda: 'Bacon')
+    note.content = 'Eggs'
+
+    assert note.content == 'Eggs'
+    assert Note('Spam', 'Eggs', content_loader=lambda: 'Bacon').content == 'Eggs'
+
+
+def test_note_etag_not_in_dict():
+    note = Note('Spam', etag='some hash')
+
+    assert note.etag == 'some hash'
+    assert 'etag' not in note.to_dict()
+    assert note == Note('Spam')
+
+
+def test_note_from_dict():
+    note_dict = {
+        'title': 'Spam',
+        'content': 'Bacon',
+        'category': 'Todo',
+        'favorite': True,
+        'id': 1337,
+        'modified': 90_000,
+    }
+
+    note = Note.from_dict({**note_dict, 'etag': 'some hash', 'readonly': False})
+
+    assert note == Note(**note_dict)
+    assert note.etag == 'some hash'
+    assert note.modified == datetime.fromtimestamp(90_000)
+
+
+def test_note_modified_converted_lazily(monkeypatch):
+    note = Note(modified=90_000)
+    # Converting to datetime would fail now
+    monkeypatch.setattr(nextcloud_notes_api.note, 'datetime', None)
+
+    assert note.to_dict()['modified'] == 90_000
+
+
+def test_note_slots(example_note: Note):
+    with pytest.raises(AttributeError):
+        example_note.spam = 'bacon'
+
+    assert copy(example_note) == example_note
+
+
 def test_note_to_dict():
     note_dict = {
         'title': 'todo',
@@ -127,3 +194,37 @@ def test_note_str_empty_note():
         str(note)
         == "Note[{'title': None, 'content': None, 'category': None, 'favorite': None, 'id': None, 'modified': None}]"  # noqa: E501
     )
+
+
+def test_note_dirty_fields_unbound(example_note: Note):
+    example_note.title = 'Eggs'
+    assert example_note.dirty_fields == frozenset()
+
+
+def test_note_dirty_fields(example_note: Note):
+    NotesApi('coma64', 'pass', 'horse.agency').bind(example_note)
+    assert example_note.dirty_fields == frozenset()
+
+    example_note.title = 'Eggs'
+    example_note.content = 'Ham'
+    assert example_note.dirty_fields == {'title', 'content'}
+
+    example_note.title = 'Spam'
+    assert example_note.dirty_fields == {'content'}
+
+
+def test_note_dirty_fields_lazy_content():
+    note = Note('Spam', id=1, content_loader=lambda: 'Bacon')
+    NotesApi('coma64', 'pass', 'horse.agency').bind(note)
+
+    assert note.content == 'Bacon'
+    assert note.dirty_fields == frozenset()
+    note.content = 'Ham'
+    assert note.dirty_fields == {'content'}
+
+
+def test_note_not_bound(example_note: Note):
+    with pytest.raises(ValueError):
+        example_note.save()
+    with pytest.raises(ValueError):
+        example_note.delete()
@@ -0,0 +1,225 @@
+from pathlib import Path
+from time import monotonic, sleep
+
+import pytest
+from requests import ConnectTimeout, ReadTimeout
+from requests_mock.mocker import Mocker as RequestsMocker
+
+from nextcloud_notes_api import (
+    Note,
+    NoteNotFound,
+    NotesApi,
+    NotesOutbox,
+    ServerUnavailable,
+)
+
+_NOTES_URL = 'https://horse.agency/index.php/apps/notes/api/v1/notes'
+
+
+@pytest.fixture
+def outbox() -> NotesOutbox:
+    return NotesOutbox(NotesApi('coma64', 'pass', 'horse.agency'), max_workers=1)
+
+
+def _created(request, context):
+    return {**dict(pair.split('=') for pair in request.text.split('&')), 'id': 7}
+
+
+def test_notes_outbox_create(outbox: NotesOutbox, requests_mock: RequestsMocker):
+    requests_mock.post(_NOTES_URL, json=_created)
+
+    note = outbox.create_note(Note('Spam', 'Bacon'))
+
+    assert note.id < 0 and note.title == 'Spam'
+    assert outbox.pending == 1
+    assert outbox.resolve(note.id) is None
+    assert not requests_mock.called
+
+    items = outbox.flush()
+
+    assert [item.result.id for item in items] == [7]
+    assert items[0].item.id == note.id
+    assert outbox.resolve(note.id) == 7
+    assert outbox.pending == 0
+
+
+def test_notes_outbox_update_then_delete(
+    outbox: NotesOutbox, requests_mock: RequestsMocker
+):
+    requests_mock.delete(f'{_NOTES_URL}/3')
+
+    outbox.update_note(Note('Spam', id=3))
+    outbox.update_note(Note('Eggs', id=3))
+    outbox.delete_note(3)
+    outbox.flush()
+
+    assert [request.method for request in requests_mock.request_history] == ['DELETE']
+
+
+def test_notes_outbox_updates_coalesced(
+    outbox: NotesOutbox, requests_mock: RequestsMocker
+):
+    requests_mock.put(f'{_NOTES_URL}/3', json={'id': 3, 'title': 'Eggs'})
+
+    outbox.update_note(Note('Spam', id=3))
+    outbox.update_note(Note('Eggs', id=3))
+
+    assert outbox.pending == 1
+    outbox.flush()
+    assert requests_mock.call_count == 1
+    assert 'title=Eggs' in requests_mock.last_request.text
+
+
+def test_notes_outbox_create_coalesced(
+    outbox: NotesOutbox, requests_mock: RequestsMocker
+):
+    requests_mock.post(_NOTES_URL, json=_created)
+
+    note = outbox.create_note(Note('Spam'))
+    note.title = 'Eggs'
+    outbox.update_note(note)
+    outbox.flush()
+
+    assert requests_mock.call_count == 1
+    assert 'title=Eggs' in requests_mock.last_request.text
+
+    deleted = outbox.create_note(Note('Ham'))
+    outbox.delete_note(deleted.id)
+    assert outbox.pending == 0
+
+
+def test_notes_outbox_temp_id_after_create(
+    outbox: NotesOutbox, requests_mock: RequestsMocker
+):
+    requests_mock.post(_NOTES_URL, json=_created)
+    requests_mock.put(f'{_NOTES_URL}/7', json={'id': 7})
+    requests_mock.delete(f'{_NOTES_URL}/7')
+
+    note = outbox.create_note(Note('Spam'))
+    outbox.flush()
+    outbox.update_note(note)
+    outbox.delete_note(note.id)
+    outbox.flush()
+
+    assert [request.method for request in requests_mock.request_history] == [
+        'POST',
+        'DELETE',
+    ]
+
+
+def test_notes_outbox_replays_in_order(
+    outbox: NotesOutbox, requests_mock: RequestsMocker
+):
+    for note_id in (3, 1, 2):
+        requests_mock.put(f'{_NOTES_URL}/{note_id}', json={'id': note_id})
+        outbox.update_note(Note(id=note_id))
+
+    outbox.flush()
+
+    assert [request.path[-1] for request in requests_mock.request_history] == [
+        '3',
+        '1',
+        '2',
+    ]
+
+
+def test_notes_outbox_transient_failure(
+    outbox: NotesOutbox, requests_mock: RequestsMocker
+):
+    requests_mock.put(f'{_NOTES_URL}/3', status_code=503)
+
+    outbox.update_note(Note(id=3))
+
+    assert outbox.flush() == []
+    assert isinstance(outbox.last_error, ServerUnavailable)
+    assert outbox.pending == 1
+
+    requests_mock.put(f'{_NOTES_URL}/3', json={'id': 3})
+    assert [item.ok for item in outbox.flush()] == [True]
+    assert outbox.last_error is None
+    assert outbox.pending == 0
+
+
+def test_notes_outbox_permanent_failure(
+    outbox: NotesOutbox, requests_mock: RequestsMocker
+):
+    requests_mock.put(f'{_NOTES_URL}/3', status_code=404)
+
+    outbox.update_note(Note(id=3))
+    outbox.flush()
+
+    assert outbox.pending == 0
+    assert isinstance(outbox.failed[0].error, NoteNotFound)
+
+
+def test_notes_outbox_create_not_repeated(
+    outbox: NotesOutbox, requests_mock: RequestsMocker
+):
+    requests_mock.post(_NOTES_URL, exc=ReadTimeout)
+    outbox.create_note(Note('Spam'))
+    outbox.flush()
+
+    # The server may have created the note
+    assert outbox.pending == 0
+    assert isinstance(outbox.failed[0].error, ReadTimeout)
+
+    requests_mock.post(_NOTES_URL, exc=ConnectTimeout)
+    outbox.create_note(Note('Spam'))
+    outbox.flush()
+
+    assert outbox.pending == 1
+    assert isinstance(outbox.last_error, ConnectTimeout)
+
+
+def test_notes_outbox_unexpected_error(
+    outbox: NotesOutbox, requests_mock: RequestsMocker, monkeypatch
+):
+    requests_mock.put(f'{_NOTES_URL}/3', json={'id': 3})
+
+    def update_note(*_, **__):
+        raise RuntimeError('Spam')
+
+    monkeypatch.setattr(outbox.api, 'update_note', update_note)
+    outbox.update_note(Note(id=3))
+
+    assert outbox.flush() == []
+    assert isinstance(outbox.last_error, RuntimeError)
+    assert outbox.pending == 1
+
+    monkeypatch.undo()
+    assert [item.ok for item in outbox.flush()] == [True]
+    assert outbox.pending == 0
+
+
+def test_notes_outbox_persistent(requests_mock: RequestsMocker, tmp_path: Path):
+    requests_mock.post(_NOTES_URL, json=_created)
+    api = NotesApi('coma64', 'pass', 'horse.agency')
+
+    first = NotesOutbox(api, tmp_path / 'outbox.db')
+    note = first.create_note(Note('Spam'))
+    first.close()
+
+    second = NotesOutbox(api, tmp_path / 'outbox.db')
+    assert second.pending == 1
+    second.flush()
+    assert second.resolve(note.id) == 7
+    assert second.create_note(Note('Eggs')).id != note.id
+
+
+def test_notes_outbox_background(requests_mock: RequestsMocker):
+    requests_mock.post(_NOTES_URL, json=_created)
+
+    with NotesOutbox(NotesApi('coma64', 'pass', 'horse.agency')) as outbox:
+        note = outbox.create_note(Note('Spam'))
+        deadline = monotonic() + 5
+        while outbox.pending and monotonic() < deadline:
+            sleep(0.01)
+
+        assert outbox.resolve(note.id) == 7
+
+
+def test_notes_outbox_update_note_id_not_set(outbox: NotesOutbox):
+    with pytest.raises(ValueError):
+        outbox.update_note(Note('Spam'))
+    with pytest.raises(ValueError):
+        outbox.update_note(Note('Spam', id=3), if_match=True)
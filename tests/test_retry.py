@@ -0,0 +1,184 @@
+import asyncio
+import socket
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import List
+
+import pytest
+from requests import ConnectionError as RequestsConnectionError
+from requests import ConnectTimeout
+from requests_mock.mocker import Mocker as RequestsMocker
+
+import nextcloud_notes_api.api_wrapper
+import nextcloud_notes_api.async_api_wrapper
+from nextcloud_notes_api import (
+    AsyncNotesApi,
+    Note,
+    NotesApi,
+    RetryPolicy,
+    ServerUnavailable,
+)
+from nextcloud_notes_api.retry import parse_retry_after
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+requires_httpx = pytest.mark.skipif(httpx is None, reason='requires httpx')
+
+
+@pytest.fixture
+def sleeps(monkeypatch) -> List[float]:
+    sleeps: List[float] = []
+    monkeypatch.setattr(nextcloud_notes_api.api_wrapper, 'sleep', sleeps.append)
+    return sleeps
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('spam') is None
+    assert parse_retry_after('3') == 3
+    assert parse_retry_after('-3') == 0
+
+    later = datetime.now(timezone.utc) + timedelta(seconds=100)
+    assert 90 < parse_retry_after(format_datetime(later, usegmt=True)) <= 100
+
+
+def test_retry_policy_retries():
+    policy = RetryPolicy()
+
+    assert policy.retries('GET', 503)
+    assert policy.retries('PUT', None)
+    assert not policy.retries('GET', 500)
+    assert policy.retries('POST', 429)
+    assert not policy.retries('POST', 503)
+    assert not policy.retries('POST', None)
+    assert policy.retries('POST', None, connect_error=True)
+
+
+def test_retry_policy_backoff():
+    policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+
+    assert [policy.backoff(retry) for retry in range(5)] == [1, 2, 4, 5, 5]
+    assert policy.backoff(0, '10') == 10
+    assert 0 <= RetryPolicy(backoff_factor=1).backoff(2) <= 4
+
+
+def test_notes_api_retry(sleeps: List[float], requests_mock: RequestsMocker):
+    notes_api = NotesApi(
+        'coma64', 'pass', 'horse.agency', retry=RetryPolicy(jitter=False)
+    )
+    requests_mock.get(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes/1',
+        [
+            {'status_code': 503},
+            {'status_code': 429, 'headers': {'Retry-After': '7'}},
+            {'exc': RequestsConnectionError},
+            {'json': Note('Spam', id=1).to_dict()},
+        ],
+    )
+
+    assert notes_api.get_single_note(1) == Note('Spam', id=1)
+    assert sleeps == [0.5, 7, 2]
+
+
+def test_notes_api_retry_gives_up(sleeps: List[float], requests_mock: RequestsMocker):
+    notes_api = NotesApi(
+        'coma64', 'pass', 'horse.agency', retry=RetryPolicy(max_retries=2)
+    )
+    requests_mock.get(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes',
+        status_code=503,
+    )
+
+    with pytest.raises(ServerUnavailable):
+        notes_api.get_all_notes()
+    assert len(sleeps) == 2
+
+
+def test_notes_api_retry_max_elapsed(
+    sleeps: List[float], requests_mock: RequestsMocker
+):
+    notes_api = NotesApi(
+        'coma64', 'pass', 'horse.agency', retry=RetryPolicy(max_elapsed=5)
+    )
+    requests_mock.get(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes',
+        status_code=429,
+        headers={'Retry-After': '10'},
+    )
+
+    with pytest.raises(ServerUnavailable):
+        notes_api.get_all_notes()
+    assert sleeps == []
+
+
+def test_notes_api_retry_post_not_repeated(
+    sleeps: List[float], requests_mock: RequestsMocker
+):
+    notes_api = NotesApi('coma64', 'pass', 'horse.agency', retry=RetryPolicy())
+    url = f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes'
+
+    requests_mock.post(url, status_code=503)
+    with pytest.raises(ServerUnavailable):
+        notes_api.create_note(Note('Spam'))
+
+    requests_mock.post(url, exc=RequestsConnectionError)
+    with pytest.raises(RequestsConnectionError):
+        notes_api.create_note(Note('Spam'))
+    assert sleeps == []
+
+    requests_mock.post(
+        url, [{'exc': ConnectTimeout}, {'json': Note('Spam', id=1).to_dict()}]
+    )
+    assert notes_api.create_note(Note('Spam')).id == 1
+    assert len(sleeps) == 1
+
+
+def test_notes_api_retry_post_connection_refused(sleeps: List[float]):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    notes_api = NotesApi(
+        'coma64', 'pass', f'http://127.0.0.1:{port}', retry=RetryPolicy(max_retries=2)
+    )
+
+    with pytest.raises(RequestsConnectionError):
+        notes_api.create_note(Note('Spam'))
+    assert len(sleeps) == 2
+
+
+def test_notes_api_no_retry_by_default(requests_mock: RequestsMocker):
+    notes_api = NotesApi('coma64', 'pass', 'horse.agency')
+    requests_mock.get(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes',
+        [{'status_code': 503}, {'json': []}],
+    )
+
+    with pytest.raises(ServerUnavailable):
+        notes_api.get_all_notes()
+
+
+@requires_httpx
+def test_async_notes_api_retry(monkeypatch):
+    sleeps: List[float] = []
+
+    async def sleep(delay: float):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(nextcloud_notes_api.async_api_wrapper, 'sleep', sleep)
+    responses = iter(
+        [httpx.Response(503), httpx.Response(200, json=[], headers={'ETag': '"a"'})]
+    )
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return next(responses)
+
+    api = AsyncNotesApi(
+        'coma64', 'pass', 'horse.agency', retry=RetryPolicy(jitter=False)
+    )
+    api._client._transport = httpx.MockTransport(handler)
+
+    assert list(asyncio.run(api.get_all_notes())) == []
+    assert sleeps == [0.5]
@@ -0,0 +1,82 @@
+from pathlib import Path
+
+import pytest
+from requests_mock.mocker import Mocker as RequestsMocker
+
+from nextcloud_notes_api import Note, NoteIndex, NotesApi
+
+
+@pytest.fixture
+def index() -> NoteIndex:
+    index = NoteIndex()
+    index.add_all(
+        [
+            Note('Groceries', 'milk, eggs and bread', category='Home', id=1),
+            Note('Meeting notes', 'discuss the budget', category='Work', id=2),
+            Note('Budget', 'rent and groceries', category='Home', id=3),
+        ]
+    )
+    return index
+
+
+def test_note_index_search(index: NoteIndex):
+    assert [result.note_id for result in index.search('budget')] == [3, 2]
+    assert [result.note_id for result in index.search('Groceries')] == [1, 3]
+    assert {result.note_id for result in index.search('eggs rent')} == {1, 3}
+    assert index.search('home', limit=1)[0].note_id in (1, 3)
+    assert index.search('nothing') == []
+
+
+def test_note_index_fuzzy_title(index: NoteIndex):
+    results = index.fuzzy_title('grocerys')
+    assert results[0].note_id == 1
+    assert results[0].title == 'Groceries'
+    assert index.fuzzy_title('meting')[0].note_id == 2
+    assert index.fuzzy_title('xyz') == []
+
+
+def test_note_index_update_and_remove(index: NoteIndex):
+    index.add(Note('Shopping', 'apples', id=1))
+    assert [result.note_id for result in index.search('groceries')] == [3]
+    assert [result.note_id for result in index.search('apples')] == [1]
+
+    index.remove(1)
+    index.remove(1)
+    assert 1 not in index
+    assert len(index) == 2
+    assert index.search('apples') == []
+    assert index.fuzzy_title('Shopping') == []
+
+
+def test_note_index_id_not_set(index: NoteIndex):
+    with pytest.raises(ValueError):
+        index.add(Note('No id'))
+
+
+def test_note_index_save_load(index: NoteIndex, tmp_path: Path):
+    path = tmp_path / 'index.json'
+    index.save(path)
+    restored = NoteIndex.load(path)
+
+    assert len(restored) == len(index)
+    assert restored.search('budget') == index.search('budget')
+    assert restored.fuzzy_title('grocerys') == index.fuzzy_title('grocerys')
+
+
+def test_notes_api_keeps_index_up_to_date(requests_mock: RequestsMocker):
+    index = NoteIndex()
+    notes_api = NotesApi('coma64', 'pass', 'horse.agency', index=index)
+    url = f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes'
+
+    requests_mock.post(url, json=Note('Todo', 'feed the cat', id=1).to_dict())
+    notes_api.create_note(Note('Todo', 'feed the cat'))
+    assert [result.note_id for result in index.search('cat')] == [1]
+
+    requests_mock.put(f'{url}/1', json=Note('Todo', 'feed the dog', id=1).to_dict())
+    notes_api.update_note(Note('Todo', 'feed the dog', id=1))
+    assert index.search('cat') == []
+    assert [result.note_id for result in index.search('dog')] == [1]
+
+    requests_mock.delete(f'{url}/1')
+    notes_api.delete_note(1)
+    assert 1 not in index
@@ -0,0 +1,109 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier, Event
+from time import sleep
+from typing import List
+
+import pytest
+
+from benchmarks.server import MockNotesServer
+from nextcloud_notes_api import MetricsCollector, NotesApi
+from nextcloud_notes_api.singleflight import SingleFlight
+
+_THREADS = 10
+
+
+def test_single_flight_shares_result():
+    flight: SingleFlight[int] = SingleFlight()
+    started, release = Event(), Event()
+    calls: List[int] = []
+
+    def slow() -> int:
+        calls.append(1)
+        started.set()
+        release.wait()
+        return 42
+
+    with ThreadPoolExecutor(_THREADS) as executor:
+        leader = executor.submit(flight.do, 'key', slow)
+        started.wait()
+        followers = [executor.submit(flight.do, 'key', slow) for _ in range(5)]
+        # Give the followers time to join the call in flight
+        sleep(0.1)
+        release.set()
+
+        assert leader.result() == 42
+        assert [follower.result() for follower in followers] == [42] * 5
+
+    assert len(calls) == 1
+    assert len(flight) == 0
+    # Nothing in flight anymore, so the next call runs again
+    assert flight.do('key', lambda: 7) == 7
+
+
+def test_single_flight_shares_exception():
+    flight: SingleFlight[int] = SingleFlight()
+    started, release = Event(), Event()
+
+    def fail() -> int:
+        started.set()
+        release.wait()
+        raise ValueError('spam')
+
+    with ThreadPoolExecutor(2) as executor:
+        leader = executor.submit(flight.do, 'key', fail)
+        started.wait()
+        follower = executor.submit(flight.do, 'key', fail)
+        sleep(0.1)
+        release.set()
+
+        for future in (leader, follower):
+            with pytest.raises(ValueError):
+                future.result()
+
+    assert len(flight) == 0
+
+
+def test_single_flight_keys_independent():
+    flight: SingleFlight[str] = SingleFlight()
+
+    assert flight.do('a', lambda: 'a') == 'a'
+    assert flight.do('b', lambda: 'b') == 'b'
+
+
+@pytest.mark.parametrize('etag_caching', [True, False])
+def test_notes_api_get_all_notes_concurrent(etag_caching: bool):
+    metrics = MetricsCollector()
+    with MockNotesServer(50, latency=0.2) as server:
+        api = NotesApi(
+            'coma64', 'pass', server.url, etag_caching=etag_caching, hooks=[metrics]
+        )
+        barrier = Barrier(_THREADS)
+
+        def get_all_notes():
+            barrier.wait()
+            return list(api.get_all_notes())
+
+        with ThreadPoolExecutor(_THREADS) as executor:
+            results = list(executor.map(lambda _: get_all_notes(), range(_THREADS)))
+
+    assert all(len(notes) == 50 for notes in results)
+    assert sum(metrics.statuses.values()) < _THREADS
+
+
+def test_notes_api_get_single_note_concurrent():
+    metrics = MetricsCollector()
+    with MockNotesServer(5, latency=0.2) as server:
+        api = NotesApi('coma64', 'pass', server.url, hooks=[metrics])
+        barrier = Barrier(_THREADS)
+
+        def get_single_note():
+            barrier.wait()
+            return api.get_single_note(3)
+
+        with ThreadPoolExecutor(_THREADS) as executor:
+            notes = list(executor.map(lambda _: get_single_note(), range(_THREADS)))
+
+    assert sum(metrics.statuses.values()) < _THREADS
+    assert all(note == notes[0] for note in notes)
+    # Every caller gets its own note
+    assert len({id(note) for note in notes}) == _THREADS
@@ -0,0 +1,32 @@
+from nextcloud_notes_api import Note, NoteSnapshot
+
+
+def test_note_snapshot_sequence(example_note: Note):
+    snapshot = NoteSnapshot([example_note.to_dict(), Note('Eggs', id=1).to_dict()])
+
+    assert len(snapshot) == 2
+    assert snapshot[0] == example_note
+    assert [note.id for note in snapshot] == [1337, 1]
+    assert list(snapshot[1:]) == [Note('Eggs', id=1)]
+    assert isinstance(snapshot[1:], NoteSnapshot)
+
+
+def test_note_snapshot_is_immutable(example_note: Note):
+    snapshot = NoteSnapshot([example_note.to_dict()])
+
+    snapshot[0].title = 'Eggs'
+
+    assert snapshot[0].title == 'Spam'
+
+
+def test_note_snapshot_from_notes(example_note: Note):
+    example_note.etag = 'some hash'
+    snapshot = NoteSnapshot.from_notes([example_note])
+
+    assert list(snapshot) == [example_note]
+    assert snapshot[0].etag == 'some hash'
+    assert NoteSnapshot.from_notes(snapshot) is snapshot
+
+
+def test_note_snapshot_repr():
+    assert repr(NoteSnapshot([{'id': 1}])) == '<NoteSnapshot [1 notes]>'
@@ -0,0 +1,104 @@
+import json
+from typing import List
+
+import pytest
+from requests_mock.mocker import Mocker as RequestsMocker
+
+from nextcloud_notes_api import InvalidNextcloudCredentials, Note, NotesApi
+from nextcloud_notes_api.stream import iter_json_array
+
+
+@pytest.fixture
+def notes_api() -> NotesApi:
+    return NotesApi('coma64', 'pass', 'horse.agency')
+
+
+def _chunks(raw: bytes, size: int) -> List[bytes]:
+    return [raw[i : i + size] for i in range(0, len(raw), size)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 64, 1 << 20])
+def test_iter_json_array(chunk_size: int):
+    elements = [
+        {'id': 1, 'content': 'Bäcon ' * 100, 'tags': [1.5, None, True]},
+        12345,
+        -1e10,
+        'spam',
+        [],
+    ]
+    raw = json.dumps(elements, ensure_ascii=False).encode()
+
+    assert list(iter_json_array(_chunks(raw, chunk_size))) == elements
+
+
+def test_iter_json_array_empty():
+    assert list(iter_json_array([b' [', b' ] \n'])) == []
+
+
+@pytest.mark.parametrize(
+    'raw', [b'', b'[1, 2', b'{"id": 1}', b'[1, 2] spam', b'[{"id": ]']
+)
+def test_iter_json_array_invalid(raw: bytes):
+    with pytest.raises(ValueError):
+        list(iter_json_array(_chunks(raw, 2)))
+
+
+@pytest.mark.parametrize(
+    'chunks, elements',
+    [
+        ([b'[2500.', b'5]'], [2500.5]),
+        ([b'[1e', b'5, 2E', b'+3]'], [1e5, 2e3]),
+        ([b'[-', b'1, 2', b'5', b'0 ]'], [-1, 250]),
+    ],
+)
+def test_iter_json_array_split_numbers(chunks: List[bytes], elements: List[float]):
+    assert list(iter_json_array(chunks)) == elements
+
+
+@pytest.mark.parametrize('raw', [b'[1 2]', b'[1,,2]', b'[,1]', b'[1,]', b'[1.]'])
+@pytest.mark.parametrize('chunk_size', [1, 64])
+def test_iter_json_array_malformed(raw: bytes, chunk_size: int):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(_chunks(raw, chunk_size)))
+
+
+def test_iter_json_array_lazy():
+    def chunks():
+        yield b'[{"id": 1}, '
+        raise AssertionError('Read too far')
+
+    assert next(iter_json_array(chunks())) == {'id': 1}
+
+
+def test_notes_api_get_all_notes_stream(
+    example_note: Note, notes_api: NotesApi, requests_mock: RequestsMocker
+):
+    url = f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes'
+    requests_mock.get(
+        url,
+        [
+            {
+                'json': [example_note.to_dict()] * 2,
+                'headers': {'X-Notes-Chunk-Cursor': 'next'},
+            },
+            {'json': [example_note.to_dict()]},
+        ],
+    )
+
+    notes = notes_api.get_all_notes(stream=True, chunk_size=2)
+
+    assert list(notes) == [example_note] * 3
+    assert requests_mock.request_history[1].qs['chunkcursor'] == ['next']
+    assert 'If-None-Match' not in requests_mock.request_history[0].headers
+
+
+def test_notes_api_get_all_notes_stream_invalid_credentials(
+    notes_api: NotesApi, requests_mock: RequestsMocker
+):
+    requests_mock.get(
+        f'https://{notes_api.hostname}/index.php/apps/notes/api/v1/notes',
+        status_code=401,
+    )
+
+    with pytest.raises(InvalidNextcloudCredentials):
+        notes_api.get_all_notes(stream=True)
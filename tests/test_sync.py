@@ -0,0 +1,94 @@
+from pathlib import Path
+
+import pytest
+from requests_mock.mocker import Mocker as RequestsMocker
+
+from nextcloud_notes_api import Note, NotesApi, NotesSync, SyncChanges
+
+URL = 'https://horse.agency/index.php/apps/notes/api/v1/notes'
+
+
+@pytest.fixture
+def notes_api():
+    return NotesApi('coma64', 'pass', 'horse.agency')
+
+
+def _note_dict(note_id: int, modified: int, content: str = 'Bacon') -> dict:
+    return Note('Spam', content, id=note_id, modified=modified).to_dict()
+
+
+def test_notes_sync_initial(notes_api: NotesApi, requests_mock: RequestsMocker):
+    requests_mock.get(
+        f'{URL}?pruneBefore=0',
+        complete_qs=True,
+        json=[_note_dict(1, 100_000), _note_dict(2, 100_100)],
+    )
+    sync = NotesSync(notes_api)
+
+    changes = sync.sync()
+
+    assert changes == SyncChanges(added={1, 2})
+    assert set(sync.notes) == {1, 2}
+
+
+def test_notes_sync_delta(notes_api: NotesApi, requests_mock: RequestsMocker):
+    sync = NotesSync(
+        notes_api,
+        {
+            1: Note(**_note_dict(1, 100_000)),
+            2: Note(**_note_dict(2, 100_100)),
+            3: Note(**_note_dict(3, 100_050)),
+        },
+    )
+    requests_mock.get(
+        f'{URL}?pruneBefore=100100',
+        complete_qs=True,
+        json=[
+            {'id': 1},
+            _note_dict(2, 100_200, 'Eggs'),
+            _note_dict(4, 100_300),
+        ],
+    )
+
+    changes = sync.sync()
+
+    assert changes == SyncChanges(added={4}, changed={2}, deleted={3})
+    assert sync.notes[2].content == 'Eggs'
+    assert set(sync.notes) == {1, 2, 4}
+
+
+def test_notes_sync_unknown_pruned(notes_api: NotesApi, requests_mock: RequestsMocker):
+    sync = NotesSync(notes_api, {1: Note(**_note_dict(1, 100_000))})
+    requests_mock.get(
+        f'{URL}?pruneBefore=100000',
+        complete_qs=True,
+        json=[_note_dict(1, 100_000), {'id': 2}, {'id': 3}],
+    )
+    # Uploaded with an old modification time
+    requests_mock.get(f'{URL}/2', json=_note_dict(2, 50_000))
+    # Deleted in the meantime
+    requests_mock.get(f'{URL}/3', status_code=404)
+
+    changes = sync.sync()
+
+    assert changes == SyncChanges(added={2})
+    assert set(sync.notes) == {1, 2}
+
+
+def test_notes_sync_unchanged(notes_api: NotesApi, requests_mock: RequestsMocker):
+    sync = NotesSync(notes_api, {1: Note(**_note_dict(1, 100_000))})
+    requests_mock.get(URL, json=[_note_dict(1, 100_000)])
+
+    assert not sync.sync()
+
+
+def test_notes_sync_save_load(notes_api: NotesApi, tmp_path: Path):
+    path = tmp_path / 'sync.json'
+    sync = NotesSync(notes_api, {1: Note(**_note_dict(1, 100_000))})
+
+    sync.save(path)
+    loaded = NotesSync.load(notes_api, path, chunk_size=10)
+
+    assert loaded.notes == sync.notes
+    assert loaded.chunk_size == 10
+    assert NotesSync.load(notes_api, tmp_path / 'missing.json').notes == {}